@@ -0,0 +1,66 @@
+"""
+Parser throughput on pathological inputs.
+
+    python -m benchmarks.bench_parser [--scale N]
+
+Each scenario is parsed at doubling sizes; lines/s should stay roughly flat
+as the input grows (linear time). A quadratic step shows up as throughput
+halving with every row.
+"""
+import argparse
+import time
+
+from flashmd.parser.md_parser import parse
+
+
+def huge_back(n: int) -> str:
+    """One card whose back has n leading blank lines and n text lines."""
+    return "# Deck\n**1. FOO — Foo**\n" + "\n" * n + "word word word\n" * n
+
+
+def unclosed_bold(n: int) -> str:
+    """n long lines that open a card front but never close the bold marker."""
+    return "# Deck\n" + ("**1. " + "x * " * 250 + "\n") * n
+
+
+def many_cards(n: int) -> str:
+    """A regular deck of n lines: heading, front, two back lines, blank."""
+    out = ["# Deck"]
+    for i in range(n // 5):
+        out.append(f"## Category {i // 100}")
+        out.append(f"**{i}. TERM{i} — Full Term Name**")
+        out.append("Definition paragraph for the card.")
+        out.append("Second line of the same paragraph.")
+        out.append("")
+    return "\n".join(out) + "\n"
+
+
+SCENARIOS = {
+    "huge back": (huge_back, 125_000),
+    "unclosed bold": (unclosed_bold, 12_500),
+    "many cards": (many_cards, 125_000),
+}
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    ap.add_argument("--scale", type=int, default=4,
+                    help="number of doublings per scenario (default 4, "
+                         "which reaches 1M lines for 'many cards')")
+    args = ap.parse_args()
+
+    print(f"{'scenario':<15}{'lines':>10}{'MB':>8}{'seconds':>10}{'Mlines/s':>10}{'MB/s':>8}")
+    for name, (make, base) in SCENARIOS.items():
+        for step in range(args.scale):
+            text = make(base << step)
+            lines = text.count("\n")
+            mb = len(text) / 1e6
+            t0 = time.perf_counter()
+            parse(text, "bench.md")
+            dt = time.perf_counter() - t0
+            print(f"{name:<15}{lines:>10}{mb:>8.1f}{dt:>10.3f}"
+                  f"{lines / dt / 1e6:>10.2f}{mb / dt:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
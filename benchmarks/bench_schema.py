@@ -0,0 +1,118 @@
+"""
+Database size and query time, UUID text keys (schema v3) vs integer keys.
+
+    python -m benchmarks.bench_schema [--cards N] [--decks N]
+
+Builds a collection at schema v3, measures it, migrates it in place to the
+current schema and measures again. Sizes are taken after VACUUM.
+"""
+import argparse
+import random
+import sqlite3
+import tempfile
+import time
+from pathlib import Path
+
+from flashmd.db import card_repo, progress_repo
+from flashmd.db.database import SCHEMA_VERSION, migrate
+
+# Random version-4 UUID, as the v3 schema stored them
+_UUID4 = (
+    "lower(hex(randomblob(4)) || '-' || hex(randomblob(2)) || '-4' || "
+    "substr(hex(randomblob(2)), 2) || '-' || "
+    "substr('89ab', 1 + (abs(random()) % 4), 1) || "
+    "substr(hex(randomblob(2)), 2) || '-' || hex(randomblob(6)))"
+)
+
+
+def build_v3(conn: sqlite3.Connection, cards: int, decks: int) -> None:
+    migrate(conn, target=3)
+    per_deck = cards // decks
+    conn.execute("BEGIN")
+    conn.execute(f"""
+        WITH RECURSIVE n(i) AS (SELECT 0 UNION ALL SELECT i + 1 FROM n WHERE i < {decks - 1})
+        INSERT INTO deck (id, title, source_file, created_at)
+        SELECT {_UUID4}, 'Deck ' || i, 'deck' || i || '.md', '2025-01-01T00:00:00+00:00'
+        FROM n
+    """)
+    conn.execute(f"""
+        WITH RECURSIVE n(i) AS (SELECT 0 UNION ALL SELECT i + 1 FROM n WHERE i < 9)
+        INSERT INTO category (id, deck_id, name, order_index)
+        SELECT {_UUID4}, deck.id, 'Category ' || i, i FROM deck, n
+    """)
+    conn.execute(f"""
+        WITH RECURSIVE n(i) AS (SELECT 0 UNION ALL SELECT i + 1 FROM n WHERE i < {per_deck - 1})
+        INSERT INTO card (id, deck_id, category_id, front, back, created_at)
+        SELECT {_UUID4}, deck.id,
+               (SELECT id FROM category WHERE deck_id = deck.id AND order_index = i % 10),
+               'TERM' || i || ' — Full Term Name',
+               'Definition paragraph for the card.',
+               '2025-01-01T00:00:00+00:00'
+        FROM deck, n
+    """)
+    conn.execute(f"""
+        INSERT INTO card_progress (id, card_id, easiness, interval, repetitions, due_date)
+        SELECT {_UUID4}, id, 2.5, 0, 0, date('now', '+' || (abs(random()) % 30) || ' days')
+        FROM card
+    """)
+    conn.commit()
+
+
+def measure(conn: sqlite3.Connection, path: Path, per_deck: int) -> dict:
+    conn.execute("VACUUM")
+    conn.execute("ANALYZE")
+    deck_ids = [r[0] for r in conn.execute("SELECT id FROM deck")]
+    rng = random.Random(0)
+    lookups = [(rng.choice(deck_ids), f"TERM{rng.randrange(per_deck)} — Full Term Name")
+               for _ in range(20_000)]
+
+    t0 = time.perf_counter()
+    for deck_id in deck_ids:
+        progress_repo.get_due_page(conn, deck_id)
+        progress_repo.get_stats(conn, deck_id)
+    t_decks = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    for deck_id, front in lookups:
+        card = card_repo.get_card_by_front(conn, deck_id, front)
+        progress_repo.get_progress(conn, card["id"])
+    t_lookups = time.perf_counter() - t0
+
+    return {
+        "size_mb": path.stat().st_size / 1e6,
+        "decks_s": t_decks,
+        "lookups_s": t_lookups,
+    }
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    ap.add_argument("--cards", type=int, default=1_000_000)
+    ap.add_argument("--decks", type=int, default=100)
+    args = ap.parse_args()
+    per_deck = args.cards // args.decks
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "bench.db"
+        conn = sqlite3.connect(path)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA foreign_keys = ON")
+
+        t0 = time.perf_counter()
+        build_v3(conn, args.cards, args.decks)
+        print(f"built {args.cards:,} cards in {time.perf_counter() - t0:.1f}s")
+        before = measure(conn, path, per_deck)
+
+        t0 = time.perf_counter()
+        migrate(conn)
+        print(f"migrated v3 → v{SCHEMA_VERSION} in {time.perf_counter() - t0:.1f}s")
+        after = measure(conn, path, per_deck)
+        conn.close()
+
+    print(f"\n{'':<10}{'DB MB':>10}{'all decks s':>14}{'20k lookups s':>16}")
+    for label, m in (("text keys", before), ("int keys", after)):
+        print(f"{label:<10}{m['size_mb']:>10.1f}{m['decks_s']:>14.3f}{m['lookups_s']:>16.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Full-text card search latency, FTS5 index vs the LIKE fallback.
+
+    python -m benchmarks.bench_search [--cards N] [--decks N]
+
+Builds a collection of cards whose backs are drawn from a Zipf-like
+vocabulary, so queries range from rare words to words on most cards, and
+times search_cards for each. The LIKE column drops the index and repeats
+the same queries.
+"""
+import argparse
+import itertools
+import random
+import sqlite3
+import tempfile
+import time
+from pathlib import Path
+
+from flashmd.db import search_repo
+from flashmd.db.database import init_db
+
+VOCABULARY = 5000
+QUERIES = ("w1", "w10 w20", "w100", "w4000", "w12", "w1 w2 w3", "w4")
+
+
+def build(conn: sqlite3.Connection, cards: int, decks: int) -> None:
+    rng = random.Random(0)
+    words = [f"w{i}" for i in range(VOCABULARY)]
+    cum = list(itertools.accumulate(1 / (i + 1) for i in range(VOCABULARY)))
+    conn.execute("BEGIN")
+    conn.executemany(
+        "INSERT INTO deck (title, source_file, created_at) VALUES (?, ?, 0)",
+        ((f"Deck {i}", f"deck{i}.md") for i in range(decks)),
+    )
+    conn.executemany(
+        "INSERT INTO card (deck_id, front, back, created_at) VALUES (?, ?, ?, 0)",
+        (
+            (1 + i % decks,
+             f"TERM{i} " + " ".join(rng.choices(words, cum_weights=cum, k=2)),
+             " ".join(rng.choices(words, cum_weights=cum, k=20)))
+            for i in range(cards)
+        ),
+    )
+    conn.commit()
+
+
+def time_queries(conn: sqlite3.Connection) -> dict[str, float]:
+    times = {}
+    for q in QUERIES:
+        t0 = time.perf_counter()
+        search_repo.search_cards(conn, q)
+        times[q] = time.perf_counter() - t0
+    return times
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    ap.add_argument("--cards", type=int, default=1_000_000)
+    ap.add_argument("--decks", type=int, default=100)
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = sqlite3.connect(Path(tmp) / "bench.db")
+        conn.row_factory = sqlite3.Row
+        init_db(conn)
+
+        t0 = time.perf_counter()
+        build(conn, args.cards, args.decks)
+        print(f"built and indexed {args.cards:,} cards in {time.perf_counter() - t0:.1f}s")
+        fts = time_queries(conn)
+
+        conn.executescript("""
+            DROP TRIGGER card_fts_ai; DROP TRIGGER card_fts_ad; DROP TRIGGER card_fts_au;
+            DROP TABLE card_fts;
+        """)
+        like = time_queries(conn)
+        conn.close()
+
+    print(f"\n{'query':<12}{'FTS5 ms':>10}{'LIKE ms':>12}")
+    for q in QUERIES:
+        print(f"{q:<12}{fts[q] * 1000:>10.1f}{like[q] * 1000:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""
+SM-2 throughput: calculate() per card vs calculate_batch().
+
+    python -m benchmarks.bench_sm2 [--cards N]
+
+Runs one scheduling step for N random card states with each implementation
+and reports cards/s and the speed-up over the per-card loop. The NumPy row
+is skipped when NumPy is not installed.
+"""
+import argparse
+import random
+import time
+
+from flashmd.sm2 import batch
+from flashmd.sm2.algorithm import SM2Progress, calculate
+
+
+def random_states(n: int) -> tuple[list, list, list, list]:
+    rng = random.Random(0)
+    return (
+        [round(rng.uniform(1.3, 3.5), 6) for _ in range(n)],
+        [rng.randrange(400) for _ in range(n)],
+        [rng.randrange(12) for _ in range(n)],
+        [rng.randint(1, 5) for _ in range(n)],
+    )
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    ap.add_argument("--cards", type=int, default=1_000_000)
+    args = ap.parse_args()
+    ef, interval, reps, rating = random_states(args.cards)
+
+    t0 = time.perf_counter()
+    for e, i, r, q in zip(ef, interval, reps, rating):
+        calculate(SM2Progress(e, i, r), q)
+    scalar = time.perf_counter() - t0
+    rows = [("calculate() loop", scalar)]
+
+    t0 = time.perf_counter()
+    batch.calculate_batch(ef, interval, reps, rating, use_numpy=False)
+    rows.append(("batch, array", time.perf_counter() - t0))
+
+    if batch.USING_NUMPY:
+        import numpy as np
+        arrays = (np.array(ef), np.array(interval), np.array(reps), np.array(rating))
+        t0 = time.perf_counter()
+        batch.calculate_batch(*arrays, use_numpy=True)
+        rows.append(("batch, NumPy", time.perf_counter() - t0))
+
+    print(f"{args.cards:,} cards\n")
+    print(f"{'':<18}{'s':>8}{'cards/s':>14}{'speed-up':>10}")
+    for label, secs in rows:
+        print(f"{label:<18}{secs:>8.3f}{args.cards / secs:>14,.0f}{scalar / secs:>9.1f}×")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,35 +1,45 @@
 import sqlite3
-import uuid
-from datetime import datetime, timezone
+from collections.abc import Iterable
 
-from flashmd.parser.md_parser import ParsedDeck
+from flashmd.db.timeutil import epoch_now
+from flashmd.parser.md_parser import ParsedCard
 
 
-def _now() -> str:
-    return datetime.now(timezone.utc).isoformat()
+def _now() -> int:
+    return epoch_now()
 
 
 # ── Category ──────────────────────────────────────────────────────────────────
 
 def insert_category(
-    conn: sqlite3.Connection, deck_id: str, name: str, order_index: int
-) -> str:
-    cat_id = str(uuid.uuid4())
-    conn.execute(
-        "INSERT INTO category (id, deck_id, name, order_index) VALUES (?, ?, ?, ?)",
-        (cat_id, deck_id, name, order_index),
+    conn: sqlite3.Connection, deck_id: int, name: str, order_index: int
+) -> int:
+    cur = conn.execute(
+        "INSERT INTO category (deck_id, name, order_index) VALUES (?, ?, ?)",
+        (deck_id, name, order_index),
     )
-    return cat_id
+    return cur.lastrowid
 
 
-def get_categories(conn: sqlite3.Connection, deck_id: str) -> list[sqlite3.Row]:
+def get_categories(conn: sqlite3.Connection, deck_id: int) -> list[sqlite3.Row]:
     return conn.execute(
         "SELECT * FROM category WHERE deck_id = ? ORDER BY order_index",
         (deck_id,),
     ).fetchall()
 
 
-def delete_categories(conn: sqlite3.Connection, deck_id: str) -> None:
+def get_category_names(
+    conn: sqlite3.Connection, category_ids: Iterable[int]
+) -> dict[int, str]:
+    """Return {category_id: name} for the given categories that exist."""
+    ids = list(category_ids)
+    rows = conn.execute(
+        f"SELECT id, name FROM category WHERE id IN ({', '.join('?' * len(ids))})", ids
+    ).fetchall()
+    return {r["id"]: r["name"] for r in rows}
+
+
+def delete_categories(conn: sqlite3.Connection, deck_id: int) -> None:
     conn.execute("DELETE FROM category WHERE deck_id = ?", (deck_id,))
 
 
@@ -37,29 +47,29 @@ def delete_categories(conn: sqlite3.Connection, deck_id: str) -> None:
 
 def insert_card(
     conn: sqlite3.Connection,
-    deck_id: str,
-    category_id: str | None,
+    deck_id: int,
+    category_id: int | None,
     front: str,
     back: str,
-) -> str:
-    card_id = str(uuid.uuid4())
-    conn.execute(
-        "INSERT INTO card (id, deck_id, category_id, front, back, created_at) "
+    back_rich: str | None = None,
+) -> int:
+    cur = conn.execute(
+        "INSERT INTO card (deck_id, category_id, front, back, back_rich, created_at) "
         "VALUES (?, ?, ?, ?, ?, ?)",
-        (card_id, deck_id, category_id, front, back, _now()),
+        (deck_id, category_id, front, back, back_rich, _now()),
     )
-    return card_id
+    return cur.lastrowid
 
 
-def get_cards(conn: sqlite3.Connection, deck_id: str) -> list[sqlite3.Row]:
+def get_cards(conn: sqlite3.Connection, deck_id: int) -> list[sqlite3.Row]:
     return conn.execute(
-        "SELECT * FROM card WHERE deck_id = ? ORDER BY rowid",
+        "SELECT * FROM card WHERE deck_id = ? ORDER BY id",
         (deck_id,),
     ).fetchall()
 
 
 def get_card_by_front(
-    conn: sqlite3.Connection, deck_id: str, front: str
+    conn: sqlite3.Connection, deck_id: int, front: str
 ) -> sqlite3.Row | None:
     return conn.execute(
         "SELECT * FROM card WHERE deck_id = ? AND front = ?",
@@ -67,70 +77,121 @@ def get_card_by_front(
     ).fetchone()
 
 
-def update_card_back(conn: sqlite3.Connection, card_id: str, back: str) -> None:
-    conn.execute("UPDATE card SET back = ? WHERE id = ?", (back, card_id))
+def get_rich_backs(
+    conn: sqlite3.Connection, card_ids: Iterable[int]
+) -> dict[int, tuple[str, str | None]]:
+    """Return {card_id: (back, back_rich)} for the given cards that exist."""
+    ids = list(card_ids)
+    cur = conn.cursor()
+    cur.row_factory = None
+    cur.execute(
+        f"SELECT id, back, back_rich FROM card WHERE id IN ({', '.join('?' * len(ids))})", ids
+    )
+    return {card_id: (back, back_rich) for card_id, back, back_rich in cur}
 
 
-def delete_cards_not_in(
-    conn: sqlite3.Connection, deck_id: str, keep_fronts: list[str]
-) -> list[str]:
-    """Delete cards whose front is not in keep_fronts. Returns deleted card IDs."""
-    placeholders = ",".join("?" * len(keep_fronts))
-    rows = conn.execute(
-        f"SELECT id FROM card WHERE deck_id = ? AND front NOT IN ({placeholders})",
-        [deck_id, *keep_fronts],
-    ).fetchall()
-    deleted_ids = [r["id"] for r in rows]
-    if deleted_ids:
-        id_placeholders = ",".join("?" * len(deleted_ids))
-        conn.execute(
-            f"DELETE FROM card WHERE id IN ({id_placeholders})", deleted_ids
-        )
-    return deleted_ids
+def update_card_back(
+    conn: sqlite3.Connection, card_id: int, back: str, back_rich: str | None = None
+) -> None:
+    conn.execute(
+        "UPDATE card SET back = ?, back_rich = ? WHERE id = ?", (back, back_rich, card_id)
+    )
 
 
 # ── Import (upsert deck contents) ─────────────────────────────────────────────
 
 def upsert_deck_contents(
-    conn: sqlite3.Connection, deck_id: str, parsed: ParsedDeck
-) -> dict[str, str]:
+    conn: sqlite3.Connection,
+    deck_id: int,
+    cards: Iterable[ParsedCard],
+) -> list[int]:
     """
-    Synchronise parsed deck into the DB for an existing deck_id.
+    Synchronise parsed cards into the DB for an existing deck_id.
 
-    Returns a dict mapping card front → card_id for all cards now in the deck.
-    Cards whose back changed have their CardProgress reset (done in progress_repo).
-    The caller is responsible for committing.
+    Cards are streamed into a temp staging table with executemany and then
+    diffed against the deck with a fixed number of set-based statements, so
+    the cost is linear in deck size and `cards` may be a lazy iterator.
+    Duplicate fronts keep their first position and category and last back.
 
-    Returns: {front: card_id, ...}, and a set of fronts whose back changed.
+    Returns the IDs of existing cards whose back changed; their CardProgress
+    must be reset (done in progress_repo). New cards have no progress yet.
+    The caller is responsible for committing.
     """
-    # Rebuild categories (order may have changed)
+    _stage_cards(conn, cards)
+
+    # Rebuild categories (order may have changed), in order of first use
     delete_categories(conn, deck_id)
-    category_map: dict[str | None, str | None] = {None: None}
-    seen_categories: dict[str, str] = {}
-    for idx, card in enumerate(parsed.cards):
-        cat = card.category
-        if cat and cat not in seen_categories:
-            cat_id = insert_category(conn, deck_id, cat, len(seen_categories))
-            seen_categories[cat] = cat_id
-        category_map[cat] = seen_categories.get(cat)
-
-    new_fronts = [c.front for c in parsed.cards]
-    delete_cards_not_in(conn, deck_id, new_fronts)
-
-    result: dict[str, str] = {}
-    changed_fronts: set[str] = set()
-
-    for card in parsed.cards:
-        existing = get_card_by_front(conn, deck_id, card.front)
-        cat_id = category_map.get(card.category)
-        if existing is None:
-            card_id = insert_card(conn, deck_id, cat_id, card.front, card.back)
-            changed_fronts.add(card.front)  # new card, needs progress init
-        else:
-            card_id = existing["id"]
-            if existing["back"] != card.back:
-                update_card_back(conn, card_id, card.back)
-                changed_fronts.add(card.front)
-        result[card.front] = card_id
-
-    return result, changed_fronts
+    conn.execute("""
+        INSERT INTO category (deck_id, name, order_index)
+        SELECT ?, category, ROW_NUMBER() OVER (ORDER BY MIN(seq)) - 1
+        FROM import_stage WHERE category IS NOT NULL
+        GROUP BY category
+        ORDER BY MIN(seq)
+    """, (deck_id,))
+    conn.execute(
+        "INSERT INTO import_category (name, id) "
+        "SELECT name, id FROM category WHERE deck_id = ?",
+        (deck_id,),
+    )
+
+    conn.execute(
+        "DELETE FROM card WHERE deck_id = ? "
+        "AND front NOT IN (SELECT front FROM import_stage)",
+        (deck_id,),
+    )
+    changed_ids = [r[0] for r in conn.execute(
+        "SELECT c.id FROM card c JOIN import_stage ON import_stage.front = c.front "
+        "WHERE c.deck_id = ? AND c.back != import_stage.back",
+        (deck_id,),
+    )]
+    # Every surviving card is rewritten: its category row was just recreated
+    conn.execute("""
+        UPDATE card SET
+            (back, back_rich) = (
+                SELECT back, back_rich FROM import_stage WHERE front = card.front
+            ),
+            category_id = (
+                SELECT import_category.id FROM import_stage
+                JOIN import_category ON import_category.name = import_stage.category
+                WHERE import_stage.front = card.front
+            )
+        WHERE deck_id = ?
+    """, (deck_id,))
+    conn.execute("""
+        INSERT INTO card (deck_id, category_id, front, back, back_rich, created_at)
+        SELECT ?, import_category.id, front, back, back_rich, ?
+        FROM import_stage
+        LEFT JOIN import_category ON import_category.name = import_stage.category
+        WHERE front NOT IN (SELECT front FROM card WHERE deck_id = ?)
+        ORDER BY seq
+    """, (deck_id, _now(), deck_id))
+
+    conn.execute("DELETE FROM import_stage")
+    conn.execute("DELETE FROM import_category")
+    return changed_ids
+
+
+def _stage_cards(conn: sqlite3.Connection, cards: Iterable[ParsedCard]) -> None:
+    """Load cards into import_stage, one row per distinct front."""
+    conn.execute("""
+        CREATE TEMP TABLE IF NOT EXISTS import_stage (
+            seq       INTEGER PRIMARY KEY,
+            front     TEXT NOT NULL UNIQUE,
+            back      TEXT NOT NULL,
+            back_rich TEXT,
+            category  TEXT
+        )
+    """)
+    conn.execute("""
+        CREATE TEMP TABLE IF NOT EXISTS import_category (
+            name TEXT PRIMARY KEY,
+            id   INTEGER NOT NULL
+        )
+    """)
+    conn.execute("DELETE FROM import_stage")
+    conn.execute("DELETE FROM import_category")
+    conn.executemany(
+        "INSERT INTO import_stage (front, back, back_rich, category) VALUES (?, ?, ?, ?) "
+        "ON CONFLICT(front) DO UPDATE SET back = excluded.back, back_rich = excluded.back_rich",
+        ((c.front, c.back, c.back_rich, c.category or None) for c in cards),
+    )
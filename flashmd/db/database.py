@@ -1,4 +1,8 @@
+import queue
 import sqlite3
+import threading
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
 from pathlib import Path
 
 
@@ -17,7 +21,132 @@ def get_connection(db_path: Path | None = None) -> sqlite3.Connection:
 
 
 def init_db(conn: sqlite3.Connection) -> None:
-    conn.executescript("""
+    """Create the schema, or upgrade an existing database in place."""
+    migrate(conn)
+
+
+# ── Connection manager ────────────────────────────────────────────────────────
+
+# Applied to every managed connection. NORMAL is durable in WAL mode except
+# for the last transactions before a power loss; cache_size is in KiB when
+# negative.
+_TUNING_PRAGMAS = (
+    "PRAGMA foreign_keys = ON",
+    "PRAGMA busy_timeout = 5000",
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA cache_size = -16384",
+    "PRAGMA temp_store = MEMORY",
+)
+
+
+class ConnectionManager:
+    """
+    Owns the connections to one database file in WAL mode: a single writer
+    serialised by a lock, and a small pool of read-only connections. Readers
+    see the last committed state and never block, or get blocked by, the
+    writer, so stats queries and imports can run alongside a study session.
+
+    Connections are created with check_same_thread=False; the writer lock
+    and the pool make sure each one is used by one thread at a time.
+    """
+
+    def __init__(self, db_path: Path | None = None, readers: int = 3):
+        self.path = Path(db_path or get_db_path()).resolve()
+        self._writer = self._open(self.path.as_uri())
+        self._writer.execute("PRAGMA journal_mode = WAL")
+        init_db(self._writer)
+        self._write_lock = threading.RLock()
+        self._write_depth = 0
+
+        self._max_readers = readers
+        self._readers: queue.LifoQueue[sqlite3.Connection] = queue.LifoQueue()
+        self._all_readers: list[sqlite3.Connection] = []
+        self._readers_lock = threading.Lock()
+        self._closed = False
+
+    @staticmethod
+    def _open(uri: str) -> sqlite3.Connection:
+        conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        for pragma in _TUNING_PRAGMAS:
+            conn.execute(pragma)
+        return conn
+
+    @contextmanager
+    def writer(self) -> Iterator[sqlite3.Connection]:
+        """
+        Exclusive use of the writer. The outermost block commits on success
+        and rolls back on error; nested blocks join the outer transaction.
+        """
+        with self._write_lock:
+            if self._closed:
+                raise sqlite3.ProgrammingError("ConnectionManager is closed")
+            self._write_depth += 1
+            try:
+                yield self._writer
+                if self._write_depth == 1:
+                    self._writer.commit()
+            except BaseException:
+                if self._write_depth == 1:
+                    self._writer.rollback()
+                raise
+            finally:
+                self._write_depth -= 1
+
+    @contextmanager
+    def reader(self, timeout: float | None = None) -> Iterator[sqlite3.Connection]:
+        """
+        Borrow a read-only connection from the pool; blocks (up to `timeout`
+        seconds) when all of them are in use.
+        """
+        conn = self._acquire_reader(timeout)
+        try:
+            yield conn
+        finally:
+            if conn.in_transaction:
+                conn.rollback()
+            self._readers.put(conn)
+
+    def _acquire_reader(self, timeout: float | None) -> sqlite3.Connection:
+        if self._closed:
+            raise sqlite3.ProgrammingError("ConnectionManager is closed")
+        try:
+            return self._readers.get_nowait()
+        except queue.Empty:
+            pass
+        with self._readers_lock:
+            if len(self._all_readers) < self._max_readers:
+                conn = self._open(f"{self.path.as_uri()}?mode=ro")
+                self._all_readers.append(conn)
+                return conn
+        try:
+            return self._readers.get(timeout=timeout)
+        except queue.Empty:
+            raise TimeoutError("No read connection available") from None
+
+    def close(self) -> None:
+        """Close every connection. Callers must have returned their readers."""
+        with self._write_lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._writer.execute("PRAGMA optimize")
+            self._writer.close()
+        with self._readers_lock:
+            for conn in self._all_readers:
+                conn.close()
+            self._all_readers.clear()
+
+
+# ── Migrations ────────────────────────────────────────────────────────────────
+#
+# The schema version lives in PRAGMA user_version. MIGRATIONS[n] upgrades a
+# database from version n to n + 1; each runs in its own transaction together
+# with the version bump. Databases created before versioning report 0 and
+# already have the v1 tables, so early migrations must be idempotent.
+
+def _m1_base_schema(conn: sqlite3.Connection) -> None:
+    _run_script(conn, """
         CREATE TABLE IF NOT EXISTS deck (
             id          TEXT PRIMARY KEY,
             title       TEXT NOT NULL,
@@ -53,4 +182,682 @@ def init_db(conn: sqlite3.Connection) -> None:
             last_rating   INTEGER
         );
     """)
+
+
+def _m2_source_fingerprint(conn: sqlite3.Connection) -> None:
+    # Unversioned databases may already have these columns
+    _ensure_columns(conn, "deck", {
+        "source_path": "TEXT",
+        "source_size": "INTEGER",
+        "source_mtime_ns": "INTEGER",
+        "source_hash": "TEXT",
+    })
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_deck_source_path ON deck(source_path)"
+    )
+
+
+def _m3_indexes(conn: sqlite3.Connection) -> None:
+    _run_script(conn, """
+        -- Covering, so a bulk re-sync reads fingerprints from the index alone
+        DROP INDEX IF EXISTS idx_deck_source_path;
+        CREATE INDEX idx_deck_source_path
+            ON deck(source_path, source_size, source_mtime_ns, source_hash)
+            WHERE source_path IS NOT NULL;
+        CREATE INDEX idx_deck_title ON deck(title);
+        CREATE INDEX idx_category_deck ON category(deck_id, order_index);
+        CREATE INDEX idx_card_deck_front ON card(deck_id, front);
+        CREATE INDEX idx_card_category ON card(category_id);
+        CREATE INDEX idx_progress_due ON card_progress(due_date, card_id);
+    """)
+
+
+def _m4_integer_keys(conn: sqlite3.Connection) -> None:
+    """
+    Rebuild every table with INTEGER PRIMARY KEY (rowid) keys instead of
+    UUID text. Old rowids become the new IDs, so references are remapped
+    with joins on the old keys. Deck and card UUIDs are kept in a nullable
+    `uuid` column as an external ID; card_progress is keyed by card_id.
+    """
+    _run_script(conn, """
+        CREATE TABLE deck_new (
+            id              INTEGER PRIMARY KEY,
+            uuid            TEXT UNIQUE,
+            title           TEXT NOT NULL,
+            source_file     TEXT NOT NULL,
+            created_at      TEXT NOT NULL,
+            last_studied    TEXT,
+            source_path     TEXT,
+            source_size     INTEGER,
+            source_mtime_ns INTEGER,
+            source_hash     TEXT
+        );
+        INSERT INTO deck_new
+        SELECT rowid, id, title, source_file, created_at, last_studied,
+               source_path, source_size, source_mtime_ns, source_hash
+        FROM deck;
+
+        CREATE TABLE category_new (
+            id          INTEGER PRIMARY KEY,
+            deck_id     INTEGER NOT NULL REFERENCES deck(id) ON DELETE CASCADE,
+            name        TEXT NOT NULL,
+            order_index INTEGER NOT NULL DEFAULT 0
+        );
+        INSERT INTO category_new
+        SELECT cat.rowid, d.rowid, cat.name, cat.order_index
+        FROM category cat JOIN deck d ON d.id = cat.deck_id;
+
+        CREATE TABLE card_new (
+            id          INTEGER PRIMARY KEY,
+            uuid        TEXT UNIQUE,
+            deck_id     INTEGER NOT NULL REFERENCES deck(id) ON DELETE CASCADE,
+            category_id INTEGER REFERENCES category(id) ON DELETE SET NULL,
+            front       TEXT NOT NULL,
+            back        TEXT NOT NULL,
+            created_at  TEXT NOT NULL
+        );
+        INSERT INTO card_new
+        SELECT c.rowid, c.id, d.rowid, cat.rowid, c.front, c.back, c.created_at
+        FROM card c
+        JOIN deck d ON d.id = c.deck_id
+        LEFT JOIN category cat ON cat.id = c.category_id;
+
+        CREATE TABLE card_progress_new (
+            card_id       INTEGER PRIMARY KEY REFERENCES card(id) ON DELETE CASCADE,
+            easiness      REAL NOT NULL DEFAULT 2.5,
+            interval      INTEGER NOT NULL DEFAULT 0,
+            repetitions   INTEGER NOT NULL DEFAULT 0,
+            due_date      TEXT NOT NULL,
+            last_reviewed TEXT,
+            last_rating   INTEGER
+        );
+        INSERT INTO card_progress_new
+        SELECT c.rowid, cp.easiness, cp.interval, cp.repetitions, cp.due_date,
+               cp.last_reviewed, cp.last_rating
+        FROM card_progress cp JOIN card c ON c.id = cp.card_id;
+
+        DROP TABLE card_progress;
+        DROP TABLE card;
+        DROP TABLE category;
+        DROP TABLE deck;
+        ALTER TABLE deck_new RENAME TO deck;
+        ALTER TABLE category_new RENAME TO category;
+        ALTER TABLE card_new RENAME TO card;
+        ALTER TABLE card_progress_new RENAME TO card_progress;
+
+        CREATE INDEX idx_deck_source_path
+            ON deck(source_path, source_size, source_mtime_ns, source_hash)
+            WHERE source_path IS NOT NULL;
+        CREATE INDEX idx_deck_title ON deck(title);
+        CREATE INDEX idx_category_deck ON category(deck_id, order_index);
+        CREATE INDEX idx_card_deck_front ON card(deck_id, front);
+        CREATE INDEX idx_card_category ON card(category_id);
+        CREATE INDEX idx_progress_due ON card_progress(due_date, card_id);
+    """)
+
+
+def _m5_deck_counters(conn: sqlite3.Connection) -> None:
+    """
+    Per-deck counters kept current by triggers, so dashboard stats cost
+    O(decks) instead of O(cards): card totals, cards due per date and cards
+    per last rating. card_progress gets a denormalised deck_id so its
+    triggers never look up a card that an ON DELETE CASCADE already removed.
+    Decrements are plain UPDATEs: once a deck's counters are deleted, the
+    cascaded row deletes that follow leave nothing behind.
+    """
+    _run_script(conn, """
+        ALTER TABLE card_progress
+            ADD COLUMN deck_id INTEGER REFERENCES deck(id) ON DELETE CASCADE;
+        UPDATE card_progress
+        SET deck_id = (SELECT deck_id FROM card WHERE card.id = card_progress.card_id);
+        CREATE INDEX idx_progress_deck_due ON card_progress(deck_id, due_date);
+
+        CREATE TABLE deck_counter (
+            deck_id INTEGER PRIMARY KEY,
+            cards   INTEGER NOT NULL DEFAULT 0
+        );
+        CREATE TABLE deck_due_counter (
+            deck_id  INTEGER NOT NULL,
+            due_date TEXT NOT NULL,
+            n        INTEGER NOT NULL,
+            PRIMARY KEY (deck_id, due_date)
+        ) WITHOUT ROWID;
+        CREATE TABLE deck_rating_counter (
+            deck_id INTEGER NOT NULL,
+            rating  INTEGER NOT NULL,
+            n       INTEGER NOT NULL,
+            PRIMARY KEY (deck_id, rating)
+        ) WITHOUT ROWID;
+
+        INSERT INTO deck_counter (deck_id, cards)
+        SELECT deck_id, COUNT(*) FROM card GROUP BY deck_id;
+        INSERT INTO deck_due_counter (deck_id, due_date, n)
+        SELECT deck_id, due_date, COUNT(*) FROM card_progress GROUP BY deck_id, due_date;
+        INSERT INTO deck_rating_counter (deck_id, rating, n)
+        SELECT deck_id, last_rating, COUNT(*) FROM card_progress
+        WHERE last_rating IS NOT NULL GROUP BY deck_id, last_rating;
+
+        CREATE TRIGGER card_counter_ai AFTER INSERT ON card BEGIN
+            INSERT INTO deck_counter (deck_id, cards) VALUES (NEW.deck_id, 1)
+            ON CONFLICT (deck_id) DO UPDATE SET cards = cards + 1;
+        END;
+        CREATE TRIGGER card_counter_ad AFTER DELETE ON card BEGIN
+            UPDATE deck_counter SET cards = cards - 1 WHERE deck_id = OLD.deck_id;
+        END;
+
+        CREATE TRIGGER progress_counter_ai AFTER INSERT ON card_progress BEGIN
+            INSERT INTO deck_due_counter (deck_id, due_date, n)
+            VALUES (NEW.deck_id, NEW.due_date, 1)
+            ON CONFLICT (deck_id, due_date) DO UPDATE SET n = n + 1;
+            INSERT INTO deck_rating_counter (deck_id, rating, n)
+            SELECT NEW.deck_id, NEW.last_rating, 1 WHERE NEW.last_rating IS NOT NULL
+            ON CONFLICT (deck_id, rating) DO UPDATE SET n = n + 1;
+        END;
+        CREATE TRIGGER progress_counter_ad AFTER DELETE ON card_progress BEGIN
+            UPDATE deck_due_counter SET n = n - 1
+            WHERE deck_id = OLD.deck_id AND due_date = OLD.due_date;
+            DELETE FROM deck_due_counter
+            WHERE deck_id = OLD.deck_id AND due_date = OLD.due_date AND n <= 0;
+            UPDATE deck_rating_counter SET n = n - 1
+            WHERE deck_id = OLD.deck_id AND rating = OLD.last_rating;
+            DELETE FROM deck_rating_counter
+            WHERE deck_id = OLD.deck_id AND rating = OLD.last_rating AND n <= 0;
+        END;
+        CREATE TRIGGER progress_counter_au
+        AFTER UPDATE OF deck_id, due_date, last_rating ON card_progress
+        WHEN OLD.deck_id IS NOT NEW.deck_id
+          OR OLD.due_date IS NOT NEW.due_date
+          OR OLD.last_rating IS NOT NEW.last_rating
+        BEGIN
+            UPDATE deck_due_counter SET n = n - 1
+            WHERE deck_id = OLD.deck_id AND due_date = OLD.due_date;
+            DELETE FROM deck_due_counter
+            WHERE deck_id = OLD.deck_id AND due_date = OLD.due_date AND n <= 0;
+            INSERT INTO deck_due_counter (deck_id, due_date, n)
+            VALUES (NEW.deck_id, NEW.due_date, 1)
+            ON CONFLICT (deck_id, due_date) DO UPDATE SET n = n + 1;
+            UPDATE deck_rating_counter SET n = n - 1
+            WHERE deck_id = OLD.deck_id AND rating = OLD.last_rating;
+            DELETE FROM deck_rating_counter
+            WHERE deck_id = OLD.deck_id AND rating = OLD.last_rating AND n <= 0;
+            INSERT INTO deck_rating_counter (deck_id, rating, n)
+            SELECT NEW.deck_id, NEW.last_rating, 1 WHERE NEW.last_rating IS NOT NULL
+            ON CONFLICT (deck_id, rating) DO UPDATE SET n = n + 1;
+        END;
+
+        CREATE TRIGGER deck_counter_ad AFTER DELETE ON deck BEGIN
+            DELETE FROM deck_counter WHERE deck_id = OLD.id;
+            DELETE FROM deck_due_counter WHERE deck_id = OLD.id;
+            DELETE FROM deck_rating_counter WHERE deck_id = OLD.id;
+        END;
+    """)
+
+
+def _m6_review_log(conn: sqlite3.Connection) -> None:
+    """
+    Append-only review history plus a daily per-deck rollup, maintained by
+    an insert trigger so history stats never scan the log. card_id has no
+    foreign key: history outlives cards removed by a re-import.
+    """
+    _run_script(conn, """
+        CREATE TABLE review_log (
+            id            INTEGER PRIMARY KEY,
+            card_id       INTEGER NOT NULL,
+            deck_id       INTEGER NOT NULL REFERENCES deck(id) ON DELETE CASCADE,
+            reviewed_at   TEXT NOT NULL,
+            day           TEXT NOT NULL,
+            rating        INTEGER NOT NULL,
+            prev_interval INTEGER NOT NULL,
+            interval      INTEGER NOT NULL,
+            easiness      REAL NOT NULL,
+            duration_ms   INTEGER
+        );
+        CREATE INDEX idx_review_log_card ON review_log(card_id, id);
+        CREATE INDEX idx_review_log_deck ON review_log(deck_id);
+
+        CREATE TABLE review_daily (
+            deck_id     INTEGER NOT NULL,
+            day         TEXT NOT NULL,
+            reviews     INTEGER NOT NULL,
+            correct     INTEGER NOT NULL,
+            recalls     INTEGER NOT NULL,
+            recalled    INTEGER NOT NULL,
+            duration_ms INTEGER NOT NULL,
+            PRIMARY KEY (deck_id, day)
+        ) WITHOUT ROWID;
+
+        CREATE TRIGGER review_log_append_only BEFORE UPDATE ON review_log BEGIN
+            SELECT RAISE(ABORT, 'review_log is append-only');
+        END;
+        CREATE TRIGGER review_log_rollup AFTER INSERT ON review_log BEGIN
+            INSERT INTO review_daily
+                (deck_id, day, reviews, correct, recalls, recalled, duration_ms)
+            VALUES (
+                NEW.deck_id, NEW.day, 1,
+                NEW.rating >= 3,
+                NEW.prev_interval > 0,
+                NEW.prev_interval > 0 AND NEW.rating >= 3,
+                COALESCE(NEW.duration_ms, 0)
+            )
+            ON CONFLICT (deck_id, day) DO UPDATE SET
+                reviews     = reviews + 1,
+                correct     = correct + excluded.correct,
+                recalls     = recalls + excluded.recalls,
+                recalled    = recalled + excluded.recalled,
+                duration_ms = duration_ms + excluded.duration_ms;
+        END;
+        CREATE TRIGGER deck_review_daily_ad AFTER DELETE ON deck BEGIN
+            DELETE FROM review_daily WHERE deck_id = OLD.id;
+        END;
+    """)
+
+
+_PROGRESS_COUNTER_TRIGGERS = """
+    CREATE TRIGGER progress_counter_ai AFTER INSERT ON card_progress BEGIN
+        INSERT INTO deck_due_counter (deck_id, due_day, n)
+        VALUES (NEW.deck_id, NEW.due_day, 1)
+        ON CONFLICT (deck_id, due_day) DO UPDATE SET n = n + 1;
+        INSERT INTO deck_rating_counter (deck_id, rating, n)
+        SELECT NEW.deck_id, NEW.last_rating, 1 WHERE NEW.last_rating IS NOT NULL
+        ON CONFLICT (deck_id, rating) DO UPDATE SET n = n + 1;
+    END;
+    CREATE TRIGGER progress_counter_ad AFTER DELETE ON card_progress BEGIN
+        UPDATE deck_due_counter SET n = n - 1
+        WHERE deck_id = OLD.deck_id AND due_day = OLD.due_day;
+        DELETE FROM deck_due_counter
+        WHERE deck_id = OLD.deck_id AND due_day = OLD.due_day AND n <= 0;
+        UPDATE deck_rating_counter SET n = n - 1
+        WHERE deck_id = OLD.deck_id AND rating = OLD.last_rating;
+        DELETE FROM deck_rating_counter
+        WHERE deck_id = OLD.deck_id AND rating = OLD.last_rating AND n <= 0;
+    END;
+    CREATE TRIGGER progress_counter_au
+    AFTER UPDATE OF deck_id, due_day, last_rating ON card_progress
+    WHEN OLD.deck_id IS NOT NEW.deck_id
+      OR OLD.due_day IS NOT NEW.due_day
+      OR OLD.last_rating IS NOT NEW.last_rating
+    BEGIN
+        UPDATE deck_due_counter SET n = n - 1
+        WHERE deck_id = OLD.deck_id AND due_day = OLD.due_day;
+        DELETE FROM deck_due_counter
+        WHERE deck_id = OLD.deck_id AND due_day = OLD.due_day AND n <= 0;
+        INSERT INTO deck_due_counter (deck_id, due_day, n)
+        VALUES (NEW.deck_id, NEW.due_day, 1)
+        ON CONFLICT (deck_id, due_day) DO UPDATE SET n = n + 1;
+        UPDATE deck_rating_counter SET n = n - 1
+        WHERE deck_id = OLD.deck_id AND rating = OLD.last_rating;
+        DELETE FROM deck_rating_counter
+        WHERE deck_id = OLD.deck_id AND rating = OLD.last_rating AND n <= 0;
+        INSERT INTO deck_rating_counter (deck_id, rating, n)
+        SELECT NEW.deck_id, NEW.last_rating, 1 WHERE NEW.last_rating IS NOT NULL
+        ON CONFLICT (deck_id, rating) DO UPDATE SET n = n + 1;
+    END;
+"""
+
+_REVIEW_LOG_TRIGGERS = """
+    CREATE TRIGGER review_log_append_only BEFORE UPDATE ON review_log BEGIN
+        SELECT RAISE(ABORT, 'review_log is append-only');
+    END;
+    CREATE TRIGGER review_log_rollup AFTER INSERT ON review_log BEGIN
+        INSERT INTO review_daily
+            (deck_id, day, reviews, correct, recalls, recalled, duration_ms)
+        VALUES (
+            NEW.deck_id, NEW.day, 1,
+            NEW.rating >= 3,
+            NEW.prev_interval > 0,
+            NEW.prev_interval > 0 AND NEW.rating >= 3,
+            COALESCE(NEW.duration_ms, 0)
+        )
+        ON CONFLICT (deck_id, day) DO UPDATE SET
+            reviews     = reviews + 1,
+            correct     = correct + excluded.correct,
+            recalls     = recalls + excluded.recalls,
+            recalled    = recalled + excluded.recalled,
+            duration_ms = duration_ms + excluded.duration_ms;
+    END;
+"""
+
+_DECK_DELETE_TRIGGERS = """
+    CREATE TRIGGER deck_counter_ad AFTER DELETE ON deck BEGIN
+        DELETE FROM deck_counter WHERE deck_id = OLD.id;
+        DELETE FROM deck_due_counter WHERE deck_id = OLD.id;
+        DELETE FROM deck_rating_counter WHERE deck_id = OLD.id;
+    END;
+    CREATE TRIGGER deck_review_daily_ad AFTER DELETE ON deck BEGIN
+        DELETE FROM review_daily WHERE deck_id = OLD.id;
+    END;
+"""
+
+# ISO text → integer conversions used by _m7_integer_time
+_SQL_DAY = "CAST(julianday({}) - 2440587.5 AS INTEGER)"
+_SQL_EPOCH = "CAST(strftime('%s', {}) AS INTEGER)"
+
+
+def _m7_integer_time(conn: sqlite3.Connection) -> None:
+    """
+    Store calendar days as integer day numbers (days since 1970-01-01) and
+    instants as Unix epoch seconds instead of ISO strings. due_date becomes
+    due_day. The four tables with converted columns are rebuilt along with
+    their triggers and indexes, and so are the per-day tables, which get
+    integer keys.
+    """
+    _run_script(conn, """
+        DROP TRIGGER progress_counter_ai;
+        DROP TRIGGER progress_counter_ad;
+        DROP TRIGGER progress_counter_au;
+        DROP TRIGGER review_log_append_only;
+        DROP TRIGGER review_log_rollup;
+        DROP TRIGGER deck_counter_ad;
+        DROP TRIGGER deck_review_daily_ad;
+        DROP INDEX idx_progress_due;
+        DROP INDEX idx_progress_deck_due;
+    """)
+    day, epoch = _SQL_DAY.format, _SQL_EPOCH.format
+    _run_script(conn, f"""
+        CREATE TABLE deck_new (
+            id              INTEGER PRIMARY KEY,
+            uuid            TEXT UNIQUE,
+            title           TEXT NOT NULL,
+            source_file     TEXT NOT NULL,
+            source_path     TEXT,
+            source_size     INTEGER,
+            source_mtime_ns INTEGER,
+            source_hash     TEXT,
+            created_at      INTEGER NOT NULL DEFAULT 0,
+            last_studied    INTEGER
+        );
+        INSERT INTO deck_new
+        SELECT id, uuid, title, source_file, source_path, source_size,
+               source_mtime_ns, source_hash, {epoch("created_at")}, {epoch("last_studied")}
+        FROM deck;
+
+        CREATE TABLE card_new (
+            id          INTEGER PRIMARY KEY,
+            uuid        TEXT UNIQUE,
+            deck_id     INTEGER NOT NULL REFERENCES deck(id) ON DELETE CASCADE,
+            category_id INTEGER REFERENCES category(id) ON DELETE SET NULL,
+            front       TEXT NOT NULL,
+            back        TEXT NOT NULL,
+            created_at  INTEGER NOT NULL DEFAULT 0
+        );
+        INSERT INTO card_new
+        SELECT id, uuid, deck_id, category_id, front, back, {epoch("created_at")}
+        FROM card;
+
+        CREATE TABLE card_progress_new (
+            card_id       INTEGER PRIMARY KEY REFERENCES card(id) ON DELETE CASCADE,
+            easiness      REAL NOT NULL DEFAULT 2.5,
+            interval      INTEGER NOT NULL DEFAULT 0,
+            repetitions   INTEGER NOT NULL DEFAULT 0,
+            last_rating   INTEGER,
+            deck_id       INTEGER REFERENCES deck(id) ON DELETE CASCADE,
+            due_day       INTEGER NOT NULL DEFAULT 0,
+            last_reviewed INTEGER
+        );
+        INSERT INTO card_progress_new
+        SELECT card_id, easiness, interval, repetitions, last_rating, deck_id,
+               {day("due_date")}, {epoch("last_reviewed")}
+        FROM card_progress;
+
+        CREATE TABLE review_log_new (
+            id            INTEGER PRIMARY KEY,
+            card_id       INTEGER NOT NULL,
+            deck_id       INTEGER NOT NULL REFERENCES deck(id) ON DELETE CASCADE,
+            rating        INTEGER NOT NULL,
+            prev_interval INTEGER NOT NULL,
+            interval      INTEGER NOT NULL,
+            easiness      REAL NOT NULL,
+            duration_ms   INTEGER,
+            reviewed_at   INTEGER NOT NULL DEFAULT 0,
+            day           INTEGER NOT NULL DEFAULT 0
+        );
+        INSERT INTO review_log_new
+        SELECT id, card_id, deck_id, rating, prev_interval, interval, easiness,
+               duration_ms, {epoch("reviewed_at")}, {day("day")}
+        FROM review_log;
+
+        DROP TABLE review_log;
+        DROP TABLE card_progress;
+        DROP TABLE card;
+        DROP TABLE deck;
+        ALTER TABLE deck_new RENAME TO deck;
+        ALTER TABLE card_new RENAME TO card;
+        ALTER TABLE card_progress_new RENAME TO card_progress;
+        ALTER TABLE review_log_new RENAME TO review_log;
+
+        CREATE INDEX idx_deck_source_path
+            ON deck(source_path, source_size, source_mtime_ns, source_hash)
+            WHERE source_path IS NOT NULL;
+        CREATE INDEX idx_deck_title ON deck(title);
+        CREATE INDEX idx_card_deck_front ON card(deck_id, front);
+        CREATE INDEX idx_card_category ON card(category_id);
+        CREATE INDEX idx_review_log_card ON review_log(card_id, id);
+        CREATE INDEX idx_review_log_deck ON review_log(deck_id);
+
+        CREATE TRIGGER card_counter_ai AFTER INSERT ON card BEGIN
+            INSERT INTO deck_counter (deck_id, cards) VALUES (NEW.deck_id, 1)
+            ON CONFLICT (deck_id) DO UPDATE SET cards = cards + 1;
+        END;
+        CREATE TRIGGER card_counter_ad AFTER DELETE ON card BEGIN
+            UPDATE deck_counter SET cards = cards - 1 WHERE deck_id = OLD.deck_id;
+        END;
+    """)
+
+    _run_script(conn, f"""
+        CREATE INDEX idx_progress_due ON card_progress(due_day, card_id);
+        CREATE INDEX idx_progress_deck_due ON card_progress(deck_id, due_day);
+
+        DROP TABLE deck_due_counter;
+        CREATE TABLE deck_due_counter (
+            deck_id INTEGER NOT NULL,
+            due_day INTEGER NOT NULL,
+            n       INTEGER NOT NULL,
+            PRIMARY KEY (deck_id, due_day)
+        ) WITHOUT ROWID;
+        INSERT INTO deck_due_counter (deck_id, due_day, n)
+        SELECT deck_id, due_day, COUNT(*) FROM card_progress GROUP BY deck_id, due_day;
+
+        CREATE TABLE review_daily_new (
+            deck_id     INTEGER NOT NULL,
+            day         INTEGER NOT NULL,
+            reviews     INTEGER NOT NULL,
+            correct     INTEGER NOT NULL,
+            recalls     INTEGER NOT NULL,
+            recalled    INTEGER NOT NULL,
+            duration_ms INTEGER NOT NULL,
+            PRIMARY KEY (deck_id, day)
+        ) WITHOUT ROWID;
+        INSERT INTO review_daily_new
+        SELECT deck_id, {day("day")}, reviews, correct, recalls, recalled,
+               duration_ms
+        FROM review_daily;
+        DROP TABLE review_daily;
+        ALTER TABLE review_daily_new RENAME TO review_daily;
+    """)
+    _run_script(conn, _PROGRESS_COUNTER_TRIGGERS)
+    _run_script(conn, _REVIEW_LOG_TRIGGERS)
+    _run_script(conn, _DECK_DELETE_TRIGGERS)
+
+
+def _m8_card_search(conn: sqlite3.Connection) -> None:
+    """
+    Full-text index over card front and back. It is an external-content FTS5
+    table (the text lives only in card), kept in step by triggers, and ranks
+    front hits above back hits. SQLite builds without FTS5 skip it;
+    search_repo then falls back to LIKE.
+    """
+    if not conn.execute("SELECT sqlite_compileoption_used('ENABLE_FTS5')").fetchone()[0]:
+        return
+    _run_script(conn, """
+        CREATE VIRTUAL TABLE card_fts USING fts5(
+            front, back,
+            content = 'card', content_rowid = 'id',
+            tokenize = 'unicode61 remove_diacritics 2',
+            prefix = '2 3'
+        );
+        INSERT INTO card_fts (card_fts, rank) VALUES ('rank', 'bm25(4.0, 1.0)');
+        INSERT INTO card_fts (card_fts) VALUES ('rebuild');
+
+        CREATE TRIGGER card_fts_ai AFTER INSERT ON card BEGIN
+            INSERT INTO card_fts (rowid, front, back) VALUES (NEW.id, NEW.front, NEW.back);
+        END;
+        CREATE TRIGGER card_fts_ad AFTER DELETE ON card BEGIN
+            INSERT INTO card_fts (card_fts, rowid, front, back)
+            VALUES ('delete', OLD.id, OLD.front, OLD.back);
+        END;
+        CREATE TRIGGER card_fts_au AFTER UPDATE OF front, back ON card BEGIN
+            INSERT INTO card_fts (card_fts, rowid, front, back)
+            VALUES ('delete', OLD.id, OLD.front, OLD.back);
+            INSERT INTO card_fts (rowid, front, back) VALUES (NEW.id, NEW.front, NEW.back);
+        END;
+    """)
+
+
+def _m9_deck_params(conn: sqlite3.Connection) -> None:
+    """
+    SM-2 constants fitted per deck by tuning_service, with the score they
+    were chosen on. Decks without a row use the defaults. The review log
+    index gains card_id so a deck's history reads back in card order.
+    """
+    _run_script(conn, """
+        CREATE TABLE deck_params (
+            deck_id           INTEGER PRIMARY KEY REFERENCES deck(id) ON DELETE CASCADE,
+            first_interval    INTEGER NOT NULL,
+            second_interval   INTEGER NOT NULL,
+            ef_base           REAL NOT NULL,
+            ef_linear         REAL NOT NULL,
+            ef_quadratic      REAL NOT NULL,
+            min_easiness      REAL NOT NULL,
+            interval_modifier REAL NOT NULL,
+            loss              REAL,
+            scored            INTEGER,
+            fitted_at         INTEGER NOT NULL
+        );
+        DROP INDEX idx_review_log_deck;
+        CREATE INDEX idx_review_log_deck ON review_log(deck_id, card_id);
+    """)
+
+
+def _m10_deck_title_nocase(conn: sqlite3.Connection) -> None:
+    """Case-insensitive title index for the paged, filtered deck list."""
+    conn.execute("CREATE INDEX idx_deck_title_nocase ON deck(title COLLATE NOCASE)")
+
+
+def _m11_card_back_rich(conn: sqlite3.Connection) -> None:
+    """
+    Pre-tokenized rich text of each back (flashmd.parser.rich), written at
+    import. NULL shows the plain back. Source fingerprints are cleared so the
+    next import or folder scan re-reads every deck and fills the column in.
+    """
+    _run_script(conn, """
+        ALTER TABLE card ADD COLUMN back_rich TEXT;
+        UPDATE deck SET source_size = NULL, source_mtime_ns = NULL, source_hash = NULL;
+    """)
+
+
+def _m12_card_fts_update_when(conn: sqlite3.Connection) -> None:
+    """
+    Reindex a card only when its front or back actually changed. Re-imports
+    rewrite every surviving card (its category is rebuilt), which fired the
+    update trigger for the whole deck even when nothing searchable moved.
+    """
+    if conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE name = 'card_fts_au'"
+    ).fetchone() is None:
+        return      # built without FTS5; see _m8_card_search
+    _run_script(conn, """
+        DROP TRIGGER card_fts_au;
+        CREATE TRIGGER card_fts_au AFTER UPDATE OF front, back ON card
+        WHEN OLD.front IS NOT NEW.front OR OLD.back IS NOT NEW.back BEGIN
+            INSERT INTO card_fts (card_fts, rowid, front, back)
+            VALUES ('delete', OLD.id, OLD.front, OLD.back);
+            INSERT INTO card_fts (rowid, front, back) VALUES (NEW.id, NEW.front, NEW.back);
+        END;
+    """)
+
+
+def _m13_due_counter_day_index(conn: sqlite3.Connection) -> None:
+    """
+    Cards due across all decks (the "Study all due" count, the load that
+    flatten_due_days balances) read deck_due_counter by due_day alone; its
+    (deck_id, due_day) key can't serve that range. Covering, so SUM(n) never
+    touches the table.
+    """
+    conn.execute("CREATE INDEX idx_due_counter_day ON deck_due_counter(due_day, n)")
+
+
+MIGRATIONS: list[Callable[[sqlite3.Connection], None]] = [
+    _m1_base_schema,
+    _m2_source_fingerprint,
+    _m3_indexes,
+    _m4_integer_keys,
+    _m5_deck_counters,
+    _m6_review_log,
+    _m7_integer_time,
+    _m8_card_search,
+    _m9_deck_params,
+    _m10_deck_title_nocase,
+    _m11_card_back_rich,
+    _m12_card_fts_update_when,
+    _m13_due_counter_day_index,
+]
+SCHEMA_VERSION = len(MIGRATIONS)
+
+
+def get_schema_version(conn: sqlite3.Connection) -> int:
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(conn: sqlite3.Connection, target: int = SCHEMA_VERSION) -> None:
+    """Apply pending migrations up to `target`, one transaction each."""
+    version = get_schema_version(conn)
+    if version > SCHEMA_VERSION:
+        raise RuntimeError(
+            f"Database schema v{version} is newer than this FlashMD (v{SCHEMA_VERSION})"
+        )
     conn.commit()
+    # Table rebuilds need foreign keys off, which cannot be changed inside a
+    # transaction; integrity is checked before each migration commits.
+    foreign_keys = conn.execute("PRAGMA foreign_keys").fetchone()[0]
+    conn.execute("PRAGMA foreign_keys = OFF")
+    try:
+        for v in range(version, target):
+            conn.execute("BEGIN")
+            try:
+                MIGRATIONS[v](conn)
+                if conn.execute("PRAGMA foreign_key_check").fetchone() is not None:
+                    raise sqlite3.IntegrityError(
+                        f"Migration to v{v + 1} left dangling foreign keys"
+                    )
+                conn.execute(f"PRAGMA user_version = {v + 1}")
+            except BaseException:
+                conn.rollback()
+                raise
+            conn.commit()
+    finally:
+        conn.execute(f"PRAGMA foreign_keys = {foreign_keys}")
+
+
+def _run_script(conn: sqlite3.Connection, script: str) -> None:
+    """
+    Run several statements inside the current transaction. Unlike
+    executescript() this does not COMMIT first.
+    """
+    statement = ""
+    for line in script.splitlines(keepends=True):
+        statement += line
+        if sqlite3.complete_statement(statement):
+            conn.execute(statement)
+            statement = ""
+    if statement.strip():
+        conn.execute(statement)
+
+
+def _ensure_columns(
+    conn: sqlite3.Connection, table: str, columns: dict[str, str]
+) -> None:
+    """Add any of `columns` (name → type) missing from an existing table."""
+    existing = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+    for name, decl in columns.items():
+        if name not in existing:
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN {name} {decl}")
@@ -1,10 +1,12 @@
+import re
 import sqlite3
-import uuid
-from datetime import datetime, timezone
+from collections.abc import Iterable
 
+from flashmd.db.timeutil import epoch_now, today
 
-def _now() -> str:
-    return datetime.now(timezone.utc).isoformat()
+
+def _now() -> int:
+    return epoch_now()
 
 
 def get_all(conn: sqlite3.Connection) -> list[sqlite3.Row]:
@@ -13,33 +15,154 @@ def get_all(conn: sqlite3.Connection) -> list[sqlite3.Row]:
     ).fetchall()
 
 
-def get_by_id(conn: sqlite3.Connection, deck_id: str) -> sqlite3.Row | None:
+def _title_pattern(prefix: str) -> str:
+    return re.sub(r"([\\%_])", r"\\\1", prefix) + "%"
+
+
+def count_matching(conn: sqlite3.Connection, prefix: str = "") -> int:
+    """Decks whose title starts with `prefix`, ignoring (ASCII) case."""
+    return conn.execute(
+        "SELECT COUNT(*) FROM deck WHERE title LIKE ? ESCAPE '\\'",
+        (_title_pattern(prefix),),
+    ).fetchone()[0]
+
+
+# Deck list rows; the one parameter is today's day number
+_LIST_ROWS = """
+    SELECT d.id, d.title, d.last_studied,
+           COALESCE(dc.cards, 0) AS total,
+           (SELECT COALESCE(SUM(n), 0) FROM deck_due_counter
+            WHERE deck_id = d.id AND due_day <= ?) AS due
+    FROM deck d
+    LEFT JOIN deck_counter dc ON dc.deck_id = d.id
+"""
+
+
+def get_page(
+    conn: sqlite3.Connection, offset: int, limit: int, prefix: str = ""
+) -> list[sqlite3.Row]:
+    """
+    Rows offset..offset+limit of the deck list: decks whose title starts
+    with `prefix`, in title order ignoring case. Rows have id, title,
+    last_studied, total (cards) and due (cards due today), the counts read
+    from the counter tables. The filter and the order both come from
+    idx_deck_title_nocase, so a page costs its offset in index steps, not
+    a sort of every deck.
+    """
+    return conn.execute(
+        f"""
+        {_LIST_ROWS}
+        WHERE d.title LIKE ? ESCAPE '\\'
+        ORDER BY d.title COLLATE NOCASE, d.id
+        LIMIT ? OFFSET ?
+        """,
+        (today(), _title_pattern(prefix), limit, offset),
+    ).fetchall()
+
+
+def get_list_rows(
+    conn: sqlite3.Connection, deck_ids: Iterable[int]
+) -> dict[int, sqlite3.Row]:
+    """{deck_id: row} for the given decks that exist, rows as in get_page."""
+    ids = list(deck_ids)
+    rows = conn.execute(
+        f"{_LIST_ROWS} WHERE d.id IN ({', '.join('?' * len(ids))})", (today(), *ids)
+    ).fetchall()
+    return {r["id"]: r for r in rows}
+
+
+def get_position(
+    conn: sqlite3.Connection, deck_id: int, prefix: str = ""
+) -> int | None:
+    """Index of a deck in get_page order, or None if it is not listed."""
+    row = conn.execute(
+        "SELECT title FROM deck WHERE id = ? AND title LIKE ? ESCAPE '\\'",
+        (deck_id, _title_pattern(prefix)),
+    ).fetchone()
+    if row is None:
+        return None
+    return conn.execute(
+        "SELECT COUNT(*) FROM deck WHERE title LIKE ? ESCAPE '\\' "
+        "AND (title COLLATE NOCASE < ? OR (title COLLATE NOCASE = ? AND id < ?))",
+        (_title_pattern(prefix), row["title"], row["title"], deck_id),
+    ).fetchone()[0]
+
+
+def get_by_id(conn: sqlite3.Connection, deck_id: int) -> sqlite3.Row | None:
     return conn.execute(
         "SELECT * FROM deck WHERE id = ?", (deck_id,)
     ).fetchone()
 
 
+def get_titles(conn: sqlite3.Connection, deck_ids: Iterable[int]) -> dict[int, str]:
+    """Return {deck_id: title} for the given decks that exist."""
+    ids = list(deck_ids)
+    rows = conn.execute(
+        f"SELECT id, title FROM deck WHERE id IN ({', '.join('?' * len(ids))})", ids
+    ).fetchall()
+    return {r["id"]: r["title"] for r in rows}
+
+
 def get_by_title(conn: sqlite3.Connection, title: str) -> sqlite3.Row | None:
     return conn.execute(
         "SELECT * FROM deck WHERE title = ?", (title,)
     ).fetchone()
 
 
-def insert(conn: sqlite3.Connection, title: str, source_file: str) -> str:
-    deck_id = str(uuid.uuid4())
-    conn.execute(
-        "INSERT INTO deck (id, title, source_file, created_at) VALUES (?, ?, ?, ?)",
-        (deck_id, title, source_file, _now()),
+def get_by_source_path(conn: sqlite3.Connection, path: str) -> sqlite3.Row | None:
+    return conn.execute(
+        "SELECT * FROM deck WHERE source_path = ?", (path,)
+    ).fetchone()
+
+
+def get_fingerprints(conn: sqlite3.Connection) -> dict[str, sqlite3.Row]:
+    """Return {source_path: row} for every deck imported from a known path."""
+    rows = conn.execute(
+        "SELECT id, source_path, source_size, source_mtime_ns, source_hash "
+        "FROM deck WHERE source_path IS NOT NULL"
+    ).fetchall()
+    return {r["source_path"]: r for r in rows}
+
+
+def insert(conn: sqlite3.Connection, title: str, source_file: str) -> int:
+    cur = conn.execute(
+        "INSERT INTO deck (title, source_file, created_at) VALUES (?, ?, ?)",
+        (title, source_file, _now()),
     )
-    return deck_id
+    return cur.lastrowid
 
 
-def update_last_studied(conn: sqlite3.Connection, deck_id: str) -> None:
+def update_last_studied(
+    conn: sqlite3.Connection, deck_id: int, studied_at: int | None = None
+) -> None:
+    """studied_at is epoch seconds, default now."""
+    when = studied_at if studied_at is not None else _now()
     conn.execute(
         "UPDATE deck SET last_studied = ? WHERE id = ?",
-        (_now(), deck_id),
+        (when, deck_id),
+    )
+
+
+def set_fingerprint(
+    conn: sqlite3.Connection,
+    deck_id: int,
+    path: str,
+    size: int,
+    mtime_ns: int,
+    digest: str,
+) -> None:
+    """Record the source file a deck was last imported from."""
+    # A path belongs to one deck; clear it from any deck that had it before
+    conn.execute(
+        "UPDATE deck SET source_path = NULL WHERE source_path = ? AND id != ?",
+        (path, deck_id),
+    )
+    conn.execute(
+        "UPDATE deck SET source_path = ?, source_size = ?, source_mtime_ns = ?, "
+        "source_hash = ? WHERE id = ?",
+        (path, size, mtime_ns, digest, deck_id),
     )
 
 
-def delete(conn: sqlite3.Connection, deck_id: str) -> None:
+def delete(conn: sqlite3.Connection, deck_id: int) -> None:
     conn.execute("DELETE FROM deck WHERE id = ?", (deck_id,))
@@ -0,0 +1,52 @@
+"""
+Runs database work on a dedicated worker thread so UI threads never wait
+on SQLite.
+
+Calls return concurrent.futures.Future objects; aread()/awrite() wrap them
+for asyncio. There is exactly one worker, so work runs in submission order:
+a read submitted after a write (or after a RatingQueue flush) sees it.
+"""
+import asyncio
+from collections.abc import Callable
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, TypeVar
+
+from flashmd.db.database import ConnectionManager
+
+T = TypeVar("T")
+
+
+class DbExecutor:
+    def __init__(self, db: ConnectionManager) -> None:
+        self._db = db
+        self._pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="flashmd-db")
+
+    def submit(self, fn: Callable[..., T], *args: Any) -> "Future[T]":
+        """Run fn(*args) on the worker thread."""
+        return self._pool.submit(fn, *args)
+
+    def read(self, fn: Callable[..., T], *args: Any) -> "Future[T]":
+        """Run fn(conn, *args) with a pooled read-only connection."""
+        return self._pool.submit(self._with_reader, fn, args)
+
+    def write(self, fn: Callable[..., T], *args: Any) -> "Future[T]":
+        """Run fn(conn, *args) in a writer transaction, committed on return."""
+        return self._pool.submit(self._with_writer, fn, args)
+
+    async def aread(self, fn: Callable[..., T], *args: Any) -> T:
+        return await asyncio.wrap_future(self.read(fn, *args))
+
+    async def awrite(self, fn: Callable[..., T], *args: Any) -> T:
+        return await asyncio.wrap_future(self.write(fn, *args))
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Stop accepting work; with wait=True, finish what was submitted."""
+        self._pool.shutdown(wait=wait, cancel_futures=not wait)
+
+    def _with_reader(self, fn: Callable[..., T], args: tuple) -> T:
+        with self._db.reader() as conn:
+            return fn(conn, *args)
+
+    def _with_writer(self, fn: Callable[..., T], args: tuple) -> T:
+        with self._db.writer() as conn:
+            return fn(conn, *args)
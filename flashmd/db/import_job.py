@@ -0,0 +1,286 @@
+"""
+Cancellable imports that run on their own thread.
+
+ImportJob hashes and parses a single file through a memory map and stages
+the cards in a private scratch database with no lock held, then takes the
+writer only to stream them into import_deck in one transaction. The
+scratch database spills to a temporary file, so memory stays flat however
+large the file, and the writer is free for rating flushes and other writes
+while the file is parsed. cancel() is honoured between cards while parsing,
+before the database is touched, and through SQLite's progress handler
+inside long statements, where the writer transaction is rolled back and
+the database is left as it was.
+
+DirectoryImportJob runs import_directory's steps for a folder: files are
+parsed in a process pool with no lock held, and each batch of results is
+written in its own writer block. cancel() stops it between files; batches
+already written stay imported.
+"""
+import logging
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections.abc import Callable, Iterator
+from concurrent.futures import Future
+from contextlib import closing
+from dataclasses import dataclass, replace
+from pathlib import Path
+from typing import TypeVar
+
+from flashmd.db.database import ConnectionManager
+from flashmd.db.import_service import (
+    DirectoryImportReport, apply_parsed_file, import_deck, mapped_file,
+    parse_files, parse_pool, record_fingerprint, scan_directory,
+)
+from flashmd.parser.md_parser import ParsedCard, parse_stream
+
+log = logging.getLogger(__name__)
+
+
+class ImportCancelled(Exception):
+    """Raised by a cancelled ImportJob; nothing it did was committed."""
+
+
+@dataclass(frozen=True)
+class ImportProgress:
+    """Snapshot of an ImportJob. phase: parsing → writing → done."""
+    phase: str
+    bytes_total: int
+    bytes_parsed: int = 0
+    cards_parsed: int = 0
+    cards_written: int = 0      # handed to import_deck so far
+
+    @property
+    def fraction(self) -> float:
+        """Rough overall completion: parsing is most of the work."""
+        if self.phase == "done":
+            return 1.0
+        parsed = self.bytes_parsed / self.bytes_total if self.bytes_total else 1.0
+        if self.phase == "parsing":
+            return 0.8 * parsed
+        written = self.cards_written / self.cards_parsed if self.cards_parsed else 0.0
+        return 0.8 + 0.2 * written
+
+
+@dataclass(frozen=True)
+class DirectoryImportProgress:
+    """Snapshot of a DirectoryImportJob. phase: scanning → importing → done."""
+    phase: str
+    files_total: int = 0        # files that need parsing; unchanged ones don't count
+    files_done: int = 0
+    cards: int = 0
+
+    @property
+    def fraction(self) -> float:
+        if self.phase == "done":
+            return 1.0
+        return self.files_done / self.files_total if self.files_total else 0.0
+
+
+_Progress = ImportProgress | DirectoryImportProgress
+_J = TypeVar("_J", bound="_Job")
+
+
+class _Job(ABC):
+    """Thread, future and cancel flag shared by the import jobs."""
+
+    def __init__(
+        self,
+        db: ConnectionManager,
+        progress: _Progress,
+        on_progress: Callable[[_Progress], None] | None = None,
+    ) -> None:
+        self.future = Future()
+        self._db = db
+        self._on_progress = on_progress
+        self._cancel = threading.Event()
+        self._progress = progress
+        self._thread: threading.Thread | None = None
+
+    @property
+    def progress(self) -> _Progress:
+        return self._progress
+
+    def start(self: _J) -> _J:
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self._run, name="flashmd-import", daemon=True
+            )
+            self._thread.start()
+        return self
+
+    def cancel(self) -> None:
+        self._cancel.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel.is_set()
+
+    # ── Job thread ────────────────────────────────────────────────────────────
+
+    def _run(self) -> None:
+        if not self.future.set_running_or_notify_cancel():
+            return
+        try:
+            result = self._import()
+        except BaseException as e:
+            self.future.set_exception(e)
+        else:
+            self._report(phase="done")
+            self.future.set_result(result)
+
+    @abstractmethod
+    def _import(self):
+        """The job's work, run on its thread; returns the future's result."""
+
+    def _report(self, **changes) -> None:
+        self._progress = replace(self._progress, **changes)
+        if self._on_progress is not None:
+            try:
+                self._on_progress(self._progress)
+            except Exception:
+                log.exception("Import progress callback failed")
+
+
+class ImportJob(_Job):
+    REPORT_EVERY = 500          # cards between parsing progress events
+    CHECK_EVERY = 10_000        # SQLite VM steps between cancellation checks
+
+    def __init__(
+        self,
+        db: ConnectionManager,
+        path: str | Path,
+        on_progress: Callable[[ImportProgress], None] | None = None,
+    ) -> None:
+        super().__init__(db, ImportProgress("parsing", 0), on_progress)
+        self.path = Path(path).resolve()
+        self.future: Future[int]
+        self._written = 0
+
+    def result(self, timeout: float | None = None) -> int:
+        """The imported deck_id; raises ImportCancelled or the import's error."""
+        return self.future.result(timeout)
+
+    def _import(self) -> int:
+        with mapped_file(self.path) as (stream, fp):
+            self._report(bytes_total=fp.size)
+            deck = parse_stream(stream, self.path.name)
+            first = next(deck.cards, None)
+            if first is None:
+                raise ValueError(f"No flashcards found in {self.path.name}")
+            scratch = self._stage(self._tracked(first, deck.cards, stream))
+        with closing(scratch):
+            deck.cards = self._unstage(scratch)
+            with self._db.writer() as conn:
+                conn.set_progress_handler(self._on_sql_progress, self.CHECK_EVERY)
+                try:
+                    deck_id = import_deck(conn, deck, commit=False)
+                    self._report(cards_written=self._written)
+                    record_fingerprint(conn, deck_id, self.path, fp)
+                except sqlite3.OperationalError:
+                    if self._cancel.is_set():
+                        raise ImportCancelled(self.path.name) from None
+                    raise
+                finally:
+                    conn.set_progress_handler(None, 0)
+                if self._cancel.is_set():
+                    raise ImportCancelled(self.path.name)
+        return deck_id
+
+    @staticmethod
+    def _stage(cards: Iterator[ParsedCard]) -> sqlite3.Connection:
+        """Copy cards into a temporary on-disk database private to this job."""
+        scratch = sqlite3.connect("")
+        try:
+            scratch.execute(
+                "CREATE TABLE card (seq INTEGER PRIMARY KEY, front TEXT, back TEXT, "
+                "category TEXT, back_rich TEXT)"
+            )
+            scratch.executemany(
+                "INSERT INTO card (front, back, category, back_rich) VALUES (?, ?, ?, ?)",
+                ((c.front, c.back, c.category, c.back_rich) for c in cards),
+            )
+        except BaseException:
+            scratch.close()
+            raise
+        return scratch
+
+    def _tracked(
+        self, first: ParsedCard, cards: Iterator[ParsedCard], stream
+    ) -> Iterator[ParsedCard]:
+        yield first
+        n = 1
+        for n, card in enumerate(cards, 2):
+            if n % self.REPORT_EVERY == 0:
+                if self._cancel.is_set():
+                    raise ImportCancelled(self.path.name)
+                self._report(bytes_parsed=stream.tell(), cards_parsed=n)
+            yield card
+        self._report(phase="writing", bytes_parsed=self._progress.bytes_total, cards_parsed=n)
+
+    def _unstage(self, scratch: sqlite3.Connection) -> Iterator[ParsedCard]:
+        rows = scratch.execute("SELECT front, back, category, back_rich FROM card ORDER BY seq")
+        for self._written, row in enumerate(rows, 1):
+            yield ParsedCard(*row)
+
+    def _on_sql_progress(self) -> bool:
+        """SQLite progress handler: reports cards written; returning True cancels."""
+        if self._written != self._progress.cards_written:
+            self._report(cards_written=self._written)
+        return self._cancel.is_set()
+
+
+class DirectoryImportJob(_Job):
+    def __init__(
+        self,
+        db: ConnectionManager,
+        directory: str | Path,
+        pattern: str = "*.md",
+        workers: int | None = None,
+        batch_size: int = 50,
+        on_progress: Callable[[DirectoryImportProgress], None] | None = None,
+    ) -> None:
+        super().__init__(db, DirectoryImportProgress("scanning"), on_progress)
+        self.directory = Path(directory).resolve()
+        self.future: Future[DirectoryImportReport]
+        self._pattern = pattern
+        self._workers = workers
+        self._batch_size = batch_size
+
+    def result(self, timeout: float | None = None) -> DirectoryImportReport:
+        """The report, covering the files written before any cancel()."""
+        return self.future.result(timeout)
+
+    def _import(self) -> DirectoryImportReport:
+        started = time.perf_counter()
+        report = DirectoryImportReport()
+        with self._db.reader() as conn:
+            paths, known = scan_directory(conn, self.directory, report, self._pattern)
+        self._report(phase="importing", files_total=len(paths))
+
+        if paths:
+            pool = parse_pool(self._workers)
+            try:
+                batch = []
+                for item in zip(paths, parse_files(pool, paths, known)):
+                    if self._cancel.is_set():
+                        break
+                    batch.append(item)
+                    if len(batch) >= self._batch_size:
+                        self._write(batch, report, known)
+                        batch = []
+                else:
+                    self._write(batch, report, known)
+            finally:
+                pool.shutdown(cancel_futures=True)
+
+        report.elapsed = time.perf_counter() - started
+        return report
+
+    def _write(self, batch, report: DirectoryImportReport, known) -> None:
+        if batch:
+            with self._db.writer() as conn:
+                for path, result in batch:
+                    apply_parsed_file(conn, report, known, path, result)
+        self._report(files_done=self._progress.files_done + len(batch), cards=report.cards)
@@ -2,36 +2,330 @@
 Orchestrates importing a parsed deck into the database.
 Handles both new decks and re-imports (partial progress preservation).
 """
+import hashlib
+import itertools
+import mmap
+import multiprocessing
+import os
 import sqlite3
+import stat
+import time
+from collections.abc import Iterator
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
 
-from flashmd.parser.md_parser import ParsedDeck
+from flashmd.parser.md_parser import ParsedDeck, StreamedDeck, parse, parse_stream
 from flashmd.db import deck_repo, card_repo, progress_repo
 
 
-def import_deck(conn: sqlite3.Connection, parsed: ParsedDeck) -> str:
+@dataclass(frozen=True)
+class Fingerprint:
+    """Size, mtime and content hash of a deck's source file."""
+    size: int
+    mtime_ns: int
+    digest: str
+
+
+@dataclass
+class DirectoryImportReport:
+    """Outcome of import_directory. Paths are stored as strings."""
+    imported: dict[str, int] = field(default_factory=dict)  # path → deck_id
+    skipped: dict[str, int] = field(default_factory=dict)   # unchanged since last import
+    errors: dict[str, str] = field(default_factory=dict)    # path → message
+    cards: int = 0
+    bytes_read: int = 0
+    elapsed: float = 0.0
+
+    @property
+    def files_per_second(self) -> float:
+        return len(self.imported) / self.elapsed if self.elapsed else 0.0
+
+    @property
+    def cards_per_second(self) -> float:
+        return self.cards / self.elapsed if self.elapsed else 0.0
+
+
+def import_deck(
+    conn: sqlite3.Connection,
+    parsed: ParsedDeck | StreamedDeck,
+    commit: bool = True,
+) -> int:
     """
-    Insert or update a deck from a ParsedDeck.
+    Insert or update a deck from a ParsedDeck (or a StreamedDeck, whose
+    cards are consumed lazily).
     - New deck: insert everything, init progress for all cards.
     - Existing deck: upsert cards, reset progress only for changed/new cards.
+    Runs a fixed number of SQL statements whatever the deck size.
+    Pass commit=False to batch several imports into one transaction.
     Returns the deck_id.
     """
     existing = deck_repo.get_by_title(conn, parsed.title)
 
     if existing is None:
         deck_id = deck_repo.insert(conn, parsed.title, parsed.source_file)
-        card_map, changed_fronts = card_repo.upsert_deck_contents(conn, deck_id, parsed)
     else:
         deck_id = existing["id"]
-        card_map, changed_fronts = card_repo.upsert_deck_contents(conn, deck_id, parsed)
 
-    for front, card_id in card_map.items():
-        if front in changed_fronts:
-            # New card: init; changed card: reset
-            existing_progress = progress_repo.get_progress(conn, card_id)
-            if existing_progress is None:
-                progress_repo.init_progress(conn, card_id)
-            else:
-                progress_repo.reset_progress(conn, card_id)
+    # Changed cards: reset; new cards (and any without progress): init
+    changed_ids = card_repo.upsert_deck_contents(conn, deck_id, parsed.cards)
+    progress_repo.reset_progress_many(conn, changed_ids)
+    progress_repo.init_missing_progress(conn, deck_id)
 
-    conn.commit()
+    if commit:
+        conn.commit()
     return deck_id
+
+
+def import_file(
+    conn: sqlite3.Connection, path: str | Path, commit: bool = True
+) -> tuple[int, bool]:
+    """
+    Import a deck file unless it is unchanged since it was last imported.
+
+    If size and mtime match the stored fingerprint the file is skipped after
+    a single stat, without reading it. Otherwise it is memory-mapped once:
+    if only the mtime moved (touch, git checkout) the content hash decides
+    and just the fingerprint is updated, else the same mapping is streamed
+    through import_deck, so the recorded hash is of the cards imported.
+
+    Returns (deck_id, skipped). Raises ValueError if the file has no cards.
+    """
+    path = Path(path).resolve()
+    st = path.stat()
+    known = deck_repo.get_by_source_path(conn, str(path))
+    if _stat_matches(known, st):
+        return known["id"], True
+
+    with mapped_file(path) as (stream, fp):
+        if known is not None and known["source_hash"] == fp.digest:
+            deck_id, skipped = known["id"], True
+        else:
+            deck = parse_stream(stream, path.name)
+            first = next(deck.cards, None)
+            if first is None:
+                raise ValueError(f"No flashcards found in {path.name}")
+            deck.cards = itertools.chain([first], deck.cards)
+            deck_id, skipped = import_deck(conn, deck, commit=False), False
+
+    record_fingerprint(conn, deck_id, path, fp)
+    if commit:
+        conn.commit()
+    return deck_id, skipped
+
+
+@contextmanager
+def mapped_file(path: str | Path) -> Iterator[tuple[mmap.mmap, Fingerprint]]:
+    """
+    Memory-map a deck file and fingerprint it from that mapping, so whatever
+    is parsed from the stream is exactly what was hashed. Raises ValueError
+    for an empty file, which can't be mapped and has no cards anyway.
+    """
+    path = Path(path)
+    with open(path, "rb") as f:
+        st = os.fstat(f.fileno())
+        if not st.st_size:
+            raise ValueError(f"No flashcards found in {path.name}")
+        stream = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    with stream:
+        yield stream, Fingerprint(st.st_size, st.st_mtime_ns, _hash_bytes(stream))
+
+
+def file_fingerprint(path: str | Path) -> Fingerprint:
+    st = os.stat(path)
+    return Fingerprint(st.st_size, st.st_mtime_ns, _hash_file(path))
+
+
+def record_fingerprint(
+    conn: sqlite3.Connection, deck_id: int, path: str | Path, fp: Fingerprint
+) -> None:
+    deck_repo.set_fingerprint(
+        conn, deck_id, str(Path(path).resolve()), fp.size, fp.mtime_ns, fp.digest
+    )
+
+
+def import_directory(
+    conn: sqlite3.Connection,
+    directory: str | Path,
+    pattern: str = "*.md",
+    workers: int | None = None,
+    batch_size: int = 50,
+) -> DirectoryImportReport:
+    """
+    Import every file matching `pattern` under `directory` (recursively).
+
+    Files whose size and mtime match their stored fingerprint are skipped
+    after one stat each. The rest are read, hashed and parsed in a process
+    pool; this process is the single writer and calls import_deck for each
+    result whose hash changed, committing every `batch_size` decks. Each
+    deck runs in its own savepoint, so a file that fails is recorded in
+    report.errors without losing the rest of its batch. Results are applied
+    in sorted path order, so duplicate titles resolve the same way as a
+    sequential import would. An error other than sqlite3.Error rolls back
+    the batch in progress and propagates; earlier batches stay committed.
+    """
+    started = time.perf_counter()
+    report = DirectoryImportReport()
+    paths, known = scan_directory(conn, directory, report, pattern)
+
+    pending = 0
+    if paths:
+        try:
+            with parse_pool(workers) as pool:
+                for path, result in zip(paths, parse_files(pool, paths, known)):
+                    if not apply_parsed_file(conn, report, known, path, result):
+                        continue
+                    pending += 1
+                    if pending >= batch_size:
+                        conn.commit()
+                        pending = 0
+        except BaseException:
+            # Don't leave the caller inside a half-written batch
+            conn.rollback()
+            raise
+
+    conn.commit()
+    report.elapsed = time.perf_counter() - started
+    return report
+
+
+def scan_directory(
+    conn: sqlite3.Connection,
+    directory: str | Path,
+    report: DirectoryImportReport,
+    pattern: str = "*.md",
+) -> tuple[list[str], dict[str, sqlite3.Row]]:
+    """
+    The stat pass of import_directory: records unchanged files in
+    report.skipped and unreadable ones in report.errors, and returns the
+    sorted paths left to parse with the stored fingerprints by path.
+    Only reads from `conn`.
+    """
+    known = deck_repo.get_fingerprints(conn)
+    paths: list[str] = []
+
+    for p in sorted(Path(directory).resolve().rglob(pattern)):
+        path = str(p)
+        try:
+            st = p.stat()
+        except OSError as e:
+            report.errors[path] = str(e)
+            continue
+        if not stat.S_ISREG(st.st_mode):
+            continue
+        if _stat_matches(known.get(path), st):
+            report.skipped[path] = known[path]["id"]
+        else:
+            paths.append(path)
+    return paths, known
+
+
+def parse_pool(workers: int | None = None) -> ProcessPoolExecutor:
+    """
+    A process pool for parse_files. Workers are started from a fork server
+    (or spawned where there is none) instead of forked from this process,
+    whose other threads may hold locks at the moment of a fork.
+    """
+    method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+    return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context(method))
+
+
+def parse_files(
+    pool: ProcessPoolExecutor, paths: list[str], known: dict[str, sqlite3.Row]
+) -> Iterator[tuple[ParsedDeck | None, Fingerprint | None, str | None]]:
+    """_parse_file for each of `paths` in `pool`, yielded in order."""
+    known_hashes = [known[p]["source_hash"] if p in known else None for p in paths]
+    return pool.map(
+        _parse_file, paths, known_hashes, chunksize=max(1, len(paths) // 64)
+    )
+
+
+def apply_parsed_file(
+    conn: sqlite3.Connection,
+    report: DirectoryImportReport,
+    known: dict[str, sqlite3.Row],
+    path: str,
+    result: tuple[ParsedDeck | None, Fingerprint | None, str | None],
+) -> bool:
+    """
+    Write one parse_files result in its own savepoint, opening a
+    transaction if none is open, and record the outcome in `report`.
+    Returns False if the file failed and nothing was written.
+    """
+    parsed, fp, error = result
+    if fp is not None:
+        report.bytes_read += fp.size
+    if error is None and parsed is not None and not parsed.cards:
+        error = "No flashcards found"
+    if error is not None:
+        report.errors[path] = error
+        return False
+
+    if not conn.in_transaction:
+        conn.execute("BEGIN")
+    conn.execute("SAVEPOINT import_file")
+    try:
+        if parsed is None:
+            # Content hash unchanged: only the mtime moved
+            deck_id = known[path]["id"]
+            report.skipped[path] = deck_id
+        else:
+            deck_id = import_deck(conn, parsed, commit=False)
+            report.imported[path] = deck_id
+            report.cards += len(parsed.cards)
+        record_fingerprint(conn, deck_id, path, fp)
+    except BaseException as e:
+        conn.execute("ROLLBACK TO import_file")
+        conn.execute("RELEASE import_file")
+        report.imported.pop(path, None)
+        report.skipped.pop(path, None)
+        if not isinstance(e, sqlite3.Error):
+            raise
+        report.errors[path] = str(e)
+        return False
+    conn.execute("RELEASE import_file")
+    return True
+
+
+def _parse_file(
+    path: str, known_hash: str | None = None
+) -> tuple[ParsedDeck | None, Fingerprint | None, str | None]:
+    """
+    Process-pool worker: returns (parsed, fingerprint, error message).
+    parsed is None without an error when the content hash equals known_hash.
+    """
+    try:
+        with open(path, "rb") as f:
+            st = os.fstat(f.fileno())
+            data = f.read()
+    except OSError as e:
+        return None, None, str(e)
+    fp = Fingerprint(len(data), st.st_mtime_ns, _hash_bytes(data))
+    if fp.digest == known_hash:
+        return None, fp, None
+    try:
+        text = data.decode("utf-8")
+    except UnicodeDecodeError as e:
+        return None, fp, str(e)
+    return parse(text, Path(path).name), fp, None
+
+
+def _stat_matches(known: sqlite3.Row | None, st: os.stat_result) -> bool:
+    return (
+        known is not None
+        and known["source_size"] == st.st_size
+        and known["source_mtime_ns"] == st.st_mtime_ns
+    )
+
+
+def _hash_bytes(data: bytes) -> str:
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def _hash_file(path: str | Path) -> str:
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
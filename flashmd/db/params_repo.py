@@ -0,0 +1,37 @@
+import sqlite3
+from dataclasses import astuple, fields
+
+from flashmd.db.timeutil import epoch_now
+from flashmd.sm2.algorithm import DEFAULT_PARAMS, SM2Params
+
+_COLUMNS = [f.name for f in fields(SM2Params)]
+
+
+def get_params(conn: sqlite3.Connection, deck_id: int) -> SM2Params:
+    """The deck's fitted SM-2 constants, or the defaults."""
+    row = conn.execute(
+        f"SELECT {', '.join(_COLUMNS)} FROM deck_params WHERE deck_id = ?", (deck_id,)
+    ).fetchone()
+    return SM2Params(*row) if row else DEFAULT_PARAMS
+
+
+def set_params(
+    conn: sqlite3.Connection,
+    deck_id: int,
+    params: SM2Params,
+    loss: float | None = None,
+    scored: int | None = None,
+    fitted_at: int | None = None,
+) -> None:
+    conn.execute(
+        f"INSERT OR REPLACE INTO deck_params "
+        f"(deck_id, {', '.join(_COLUMNS)}, loss, scored, fitted_at) "
+        f"VALUES ({', '.join('?' * (len(_COLUMNS) + 4))})",
+        (deck_id, *astuple(params), loss, scored,
+         fitted_at if fitted_at is not None else epoch_now()),
+    )
+
+
+def clear_params(conn: sqlite3.Connection, deck_id: int) -> None:
+    """Go back to the default constants."""
+    conn.execute("DELETE FROM deck_params WHERE deck_id = ?", (deck_id,))
@@ -1,129 +1,323 @@
 import sqlite3
-import uuid
-from datetime import date, datetime, timezone
+from collections.abc import Iterable, Iterator
 
-from flashmd.sm2.algorithm import SM2Progress, calculate
+from flashmd.db import params_repo, review_repo
+from flashmd.db.timeutil import epoch_now, epoch_to_day, today
+from flashmd.sm2 import load_balance
+from flashmd.sm2.algorithm import SM2Params, SM2Progress, calculate
 
 
-def _today() -> str:
-    return date.today().isoformat()
+def _today() -> int:
+    return today()
 
 
-def _tomorrow() -> str:
-    from datetime import timedelta
-    return (date.today() + timedelta(days=1)).isoformat()
+def _tomorrow() -> int:
+    return today() + 1
 
 
-def _now() -> str:
-    return datetime.now(timezone.utc).isoformat()
-
-
-def init_progress(conn: sqlite3.Connection, card_id: str) -> None:
-    """Create a default CardProgress for a new card. due_date = tomorrow."""
-    prog_id = str(uuid.uuid4())
+def init_progress(conn: sqlite3.Connection, card_id: int) -> None:
+    """Create a default CardProgress for a new card. due_day = tomorrow."""
     conn.execute(
         "INSERT OR IGNORE INTO card_progress "
-        "(id, card_id, easiness, interval, repetitions, due_date) "
-        "VALUES (?, ?, 2.5, 0, 0, ?)",
-        (prog_id, card_id, _tomorrow()),
+        "(card_id, deck_id, easiness, interval, repetitions, due_day) "
+        "SELECT id, deck_id, 2.5, 0, 0, ? FROM card WHERE id = ?",
+        (_tomorrow(), card_id),
     )
 
 
-def reset_progress(conn: sqlite3.Connection, card_id: str) -> None:
+def reset_progress(conn: sqlite3.Connection, card_id: int) -> None:
     """Reset SM-2 state for a card whose content changed."""
     conn.execute(
         "UPDATE card_progress "
-        "SET easiness=2.5, interval=0, repetitions=0, due_date=?, "
+        "SET easiness=2.5, interval=0, repetitions=0, due_day=?, "
         "    last_reviewed=NULL, last_rating=NULL "
         "WHERE card_id=?",
         (_tomorrow(), card_id),
     )
 
 
-def get_due_cards(
-    conn: sqlite3.Connection, deck_id: str
+def init_missing_progress(conn: sqlite3.Connection, deck_id: int) -> None:
+    """Create default CardProgress for every card in the deck that has none."""
+    conn.execute(
+        "INSERT INTO card_progress "
+        "(card_id, deck_id, easiness, interval, repetitions, due_day) "
+        "SELECT c.id, c.deck_id, 2.5, 0, 0, ? FROM card c "
+        "WHERE c.deck_id = ? "
+        "AND NOT EXISTS (SELECT 1 FROM card_progress cp WHERE cp.card_id = c.id)",
+        (_tomorrow(), deck_id),
+    )
+
+
+def reset_progress_many(conn: sqlite3.Connection, card_ids: Iterable[int]) -> None:
+    """reset_progress for many cards in one executemany."""
+    due = _tomorrow()
+    conn.executemany(
+        "UPDATE card_progress "
+        "SET easiness=2.5, interval=0, repetitions=0, due_day=?, "
+        "    last_reviewed=NULL, last_rating=NULL "
+        "WHERE card_id=?",
+        ((due, card_id) for card_id in card_ids),
+    )
+
+
+def get_due_page(
+    conn: sqlite3.Connection,
+    deck_id: int | None = None,
+    after: tuple[int, int] | None = None,
+    limit: int = 200,
 ) -> list[sqlite3.Row]:
-    """Return cards due today or earlier, joined with progress, ordered by due_date."""
+    """
+    One page of cards due today or earlier, in (due_day, card id) order, from
+    one deck or, with deck_id None, merged across all decks. Pass the last
+    row's (due_day, id) as `after` for the next page; every page is a single
+    index range scan however far into the queue it starts. Rows carry id,
+    deck_id, category_id, front and due_day; the back (often much longer)
+    and deck and category details are left to the caller to fetch when
+    needed (card_repo.get_rich_backs, deck_repo.get_titles).
+    """
+    where = ["cp.due_day <= ?"]
+    params: list = [_today()]
+    if deck_id is not None:
+        where.append("cp.deck_id = ?")
+        params.append(deck_id)
+    if after is not None:
+        where.append("(cp.due_day, cp.card_id) > (?, ?)")
+        params.extend(after)
     return conn.execute(
-        """
-        SELECT c.id, c.front, c.back,
-               cp.id AS progress_id, cp.easiness, cp.interval,
-               cp.repetitions, cp.due_date, cp.last_reviewed, cp.last_rating
-        FROM card c
-        JOIN card_progress cp ON cp.card_id = c.id
-        WHERE c.deck_id = ?
-          AND cp.due_date <= ?
-        ORDER BY cp.due_date ASC
+        f"""
+        SELECT c.id, c.deck_id, c.category_id, c.front, cp.due_day
+        FROM card_progress cp
+        JOIN card c ON c.id = cp.card_id
+        WHERE {" AND ".join(where)}
+        ORDER BY cp.due_day, cp.card_id
+        LIMIT ?
         """,
-        (deck_id, _today()),
+        (*params, limit),
     ).fetchall()
 
 
-def get_progress(conn: sqlite3.Connection, card_id: str) -> sqlite3.Row | None:
+def iter_due_cards(
+    conn: sqlite3.Connection, deck_id: int | None = None, page_size: int = 200
+) -> Iterator[sqlite3.Row]:
+    """
+    Every due card, as get_due_page rows, fetched a page at a time so at most
+    `page_size` rows are held however many are due.
+    """
+    after = None
+    while page := get_due_page(conn, deck_id, after, page_size):
+        yield from page
+        if len(page) < page_size:
+            return
+        after = (page[-1]["due_day"], page[-1]["id"])
+
+
+def get_due_count(conn: sqlite3.Connection, deck_id: int | None = None) -> int:
+    """Cards due today or earlier in one deck, or in all decks."""
+    if deck_id is None:
+        return conn.execute(
+            "SELECT COALESCE(SUM(n), 0) FROM deck_due_counter WHERE due_day <= ?",
+            (_today(),),
+        ).fetchone()[0]
+    return conn.execute(
+        "SELECT COALESCE(SUM(n), 0) FROM deck_due_counter "
+        "WHERE deck_id = ? AND due_day <= ?",
+        (deck_id, _today()),
+    ).fetchone()[0]
+
+
+def get_schedule(
+    conn: sqlite3.Connection, deck_id: int | None = None
+) -> tuple[list[float], list[int], list[int], list[int]]:
+    """
+    SM-2 state of every card in one deck, or in all decks, as parallel
+    columns (easiness, interval, repetitions, due_day) in card order, ready
+    for forecast.simulate.
+    """
+    cur = conn.cursor()
+    # Plain tuples: a Row per card is most of the cost on a large collection
+    cur.row_factory = None
+    sql = "SELECT easiness, interval, repetitions, due_day FROM card_progress"
+    if deck_id is None:
+        rows = cur.execute(sql + " ORDER BY card_id").fetchall()
+    else:
+        rows = cur.execute(sql + " WHERE deck_id = ? ORDER BY card_id", (deck_id,)).fetchall()
+    if not rows:
+        return [], [], [], []
+    ef, interval, reps, due = map(list, zip(*rows))
+    return ef, interval, reps, due
+
+
+def flatten_due_days(
+    conn: sqlite3.Connection,
+    max_per_day: int,
+    deck_id: int | None = None,
+    tolerance: float = load_balance.TOLERANCE,
+    new_window: int = load_balance.NEW_WINDOW,
+) -> int:
+    """
+    Move cards of one deck, or of all decks, off days with more than
+    `max_per_day` cards due (in all decks) to quieter days nearby; see
+    load_balance.spread_due_days for how far each card may move. Today's
+    queue and overdue cards are left alone. All moves go out in one
+    executemany, so with the caller's commit they land in a single
+    transaction. Returns the number of cards moved.
+    """
+    start = _tomorrow()
+    load = {
+        r["due_day"]: r["n"] for r in conn.execute(
+            "SELECT due_day, SUM(n) AS n FROM deck_due_counter "
+            "WHERE due_day >= ? GROUP BY due_day",
+            (start,),
+        )
+    }
+    cur = conn.cursor()
+    cur.row_factory = None
+    sql = "SELECT card_id, interval, due_day FROM card_progress WHERE due_day >= ?"
+    if deck_id is None:
+        rows = cur.execute(sql, (start,)).fetchall()
+    else:
+        rows = cur.execute(sql + " AND deck_id = ?", (start, deck_id)).fetchall()
+    if not rows:
+        return 0
+
+    card_ids, interval, due = zip(*rows)
+    moved = load_balance.spread_due_days(
+        card_ids, interval, due, load, start, max_per_day, tolerance, new_window
+    )
+    conn.executemany(
+        "UPDATE card_progress SET due_day = ? WHERE card_id = ?",
+        ((day, card_id) for card_id, day in moved.items()),
+    )
+    return len(moved)
+
+
+def get_progress(conn: sqlite3.Connection, card_id: int) -> sqlite3.Row | None:
     return conn.execute(
         "SELECT * FROM card_progress WHERE card_id = ?", (card_id,)
     ).fetchone()
 
 
-def apply_rating(conn: sqlite3.Connection, card_id: str, rating: int) -> None:
-    """Run SM-2, persist result, update due_date."""
+def apply_rating(
+    conn: sqlite3.Connection,
+    card_id: int,
+    rating: int,
+    reviewed_at: int | None = None,
+    duration_ms: int | None = None,
+) -> None:
+    """
+    Run SM-2 with the deck's parameters, persist result, update due_day and
+    append to review_log. `reviewed_at` (epoch seconds, default now) is when
+    the rating was given, which may be earlier than this call;
+    `duration_ms` is how long the card was shown.
+    """
     row = get_progress(conn, card_id)
     if row is None:
         raise ValueError(f"No CardProgress for card {card_id}")
+    if reviewed_at is None:
+        reviewed_at = epoch_now()
+    params = params_repo.get_params(conn, row["deck_id"])
+    review = _apply(conn, row, rating, reviewed_at, duration_ms, params)
+    review_repo.insert_reviews(conn, [review])
+
 
+def apply_ratings(
+    conn: sqlite3.Connection,
+    ratings: Iterable[tuple[int, int, int, int | None]],
+) -> int:
+    """
+    Apply a batch of (card_id, rating, reviewed_at, duration_ms) in order,
+    so a card rated twice ends in the same state as two apply_rating calls.
+    The review log rows are written in one executemany. Ratings for cards
+    that no longer exist (e.g. removed by a re-import) are skipped.
+    Returns the number applied; the caller commits.
+    """
+    reviews = []
+    params: dict[int, SM2Params] = {}
+    for card_id, rating, reviewed_at, duration_ms in ratings:
+        row = get_progress(conn, card_id)
+        if row is None:
+            continue
+        deck_id = row["deck_id"]
+        if deck_id not in params:
+            params[deck_id] = params_repo.get_params(conn, deck_id)
+        reviews.append(_apply(conn, row, rating, reviewed_at, duration_ms, params[deck_id]))
+    review_repo.insert_reviews(conn, reviews)
+    return len(reviews)
+
+
+def _apply(
+    conn: sqlite3.Connection,
+    row: sqlite3.Row,
+    rating: int,
+    reviewed_at: int,
+    duration_ms: int | None,
+    params: SM2Params,
+) -> tuple:
+    """Update one card's progress; returns its review_log row."""
     progress = SM2Progress(
         easiness=row["easiness"],
         interval=row["interval"],
         repetitions=row["repetitions"],
     )
-    result = calculate(progress, rating)
+    result = calculate(progress, rating, params)
 
-    from datetime import timedelta
-    new_due = (date.today() + timedelta(days=result.interval)).isoformat()
+    day = epoch_to_day(reviewed_at)
 
     conn.execute(
         "UPDATE card_progress "
-        "SET easiness=?, interval=?, repetitions=?, due_date=?, "
+        "SET easiness=?, interval=?, repetitions=?, due_day=?, "
         "    last_reviewed=?, last_rating=? "
         "WHERE card_id=?",
         (
             result.easiness,
             result.interval,
             result.repetitions,
-            new_due,
-            _now(),
+            day + result.interval,
+            reviewed_at,
             rating,
-            card_id,
+            row["card_id"],
         ),
     )
+    return (
+        row["card_id"], row["deck_id"], reviewed_at, day,
+        rating, row["interval"], result.interval, result.easiness, duration_ms,
+    )
 
 
-def get_stats(conn: sqlite3.Connection, deck_id: str) -> dict:
-    """Return summary stats for a deck."""
+def get_stats(conn: sqlite3.Connection, deck_id: int) -> dict:
+    """Return summary stats for a deck, read from the trigger-kept counters."""
     total = conn.execute(
-        "SELECT COUNT(*) FROM card WHERE deck_id = ?", (deck_id,)
-    ).fetchone()[0]
+        "SELECT cards FROM deck_counter WHERE deck_id = ?", (deck_id,)
+    ).fetchone()
 
-    due = conn.execute(
-        "SELECT COUNT(*) FROM card c "
-        "JOIN card_progress cp ON cp.card_id = c.id "
-        "WHERE c.deck_id = ? AND cp.due_date <= ?",
-        (deck_id, _today()),
-    ).fetchone()[0]
+    due = get_due_count(conn, deck_id)
 
     ratings = conn.execute(
-        "SELECT last_rating, COUNT(*) as cnt "
-        "FROM card_progress cp "
-        "JOIN card c ON c.id = cp.card_id "
-        "WHERE c.deck_id = ? AND cp.last_rating IS NOT NULL "
-        "GROUP BY last_rating",
+        "SELECT rating, n FROM deck_rating_counter WHERE deck_id = ? AND n > 0",
         (deck_id,),
     ).fetchall()
 
-    rating_counts = {r["last_rating"]: r["cnt"] for r in ratings}
+    rating_counts = {r["rating"]: r["n"] for r in ratings}
 
     return {
-        "total": total,
+        "total": total[0] if total else 0,
         "due": due,
         "rating_counts": rating_counts,
     }
+
+
+def get_due_histogram(conn: sqlite3.Connection, deck_id: int, days: int) -> list[int]:
+    """
+    Cards falling due on each of the next `days` days, today first. Overdue
+    cards count as due today.
+    """
+    start = _today()
+    counts = [0] * days
+    rows = conn.execute(
+        "SELECT due_day, n FROM deck_due_counter "
+        "WHERE deck_id = ? AND due_day < ?",
+        (deck_id, start + days),
+    ).fetchall()
+    for r in rows:
+        counts[max(r["due_day"] - start, 0)] += r["n"]
+    return counts
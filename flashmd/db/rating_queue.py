@@ -0,0 +1,155 @@
+"""
+Write-behind queue for study ratings.
+
+record() only appends to an in-memory list, so rating a card never waits on
+the disk. A background thread writes pending ratings through the
+ConnectionManager's writer in one transaction per batch:
+- every `interval` seconds, so a crash loses at most that much work;
+- as soon as `max_batch` ratings are pending;
+- when flush() is called (e.g. at the end of a session), which blocks until
+  everything recorded so far is committed.
+
+close() stops the thread and writes whatever is left; it is also registered
+with atexit while the queue runs, so ratings survive an interpreter exit that
+skips the normal shutdown path.
+"""
+import atexit
+import logging
+import sqlite3
+import threading
+from dataclasses import dataclass
+
+from flashmd.db import deck_repo, progress_repo
+from flashmd.db.database import ConnectionManager
+from flashmd.db.timeutil import epoch_now
+
+log = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class PendingRating:
+    deck_id: int
+    card_id: int
+    rating: int
+    reviewed_at: int                # epoch seconds
+    duration_ms: int | None = None
+
+
+class RatingQueue:
+    def __init__(
+        self,
+        db: ConnectionManager,
+        interval: float = 2.0,
+        max_batch: int = 200,
+    ) -> None:
+        self._db = db
+        self.interval = interval
+        self.max_batch = max_batch
+
+        self._cond = threading.Condition()
+        self._write_lock = threading.Lock()     # one batch in flight at a time
+        self._pending: list[PendingRating] = []
+        self._recorded = 0                      # ratings ever recorded
+        self._written = 0                       # ratings committed (a prefix)
+        self._flush_requested = False
+        self._stopping = False
+        self._thread: threading.Thread | None = None
+
+    @property
+    def pending(self) -> int:
+        """Ratings recorded but not yet committed, including a batch in flight."""
+        with self._cond:
+            return self._recorded - self._written
+
+    # ── Lifecycle ─────────────────────────────────────────────────────────────
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stopping = False
+        self._thread = threading.Thread(
+            target=self._run, name="flashmd-ratings", daemon=True
+        )
+        self._thread.start()
+        atexit.register(self.close)
+
+    def close(self, timeout: float | None = 5.0) -> None:
+        """Stop the background thread and write every pending rating."""
+        if self._thread is not None:
+            with self._cond:
+                self._stopping = True
+                self._cond.notify_all()
+            self._thread.join(timeout)
+            self._thread = None
+            atexit.unregister(self.close)
+        if not self._write_pending():
+            log.error("Could not save %d rating(s) on close", self.pending)
+
+    # ── Producer side (Tk thread) ─────────────────────────────────────────────
+
+    def record(
+        self, deck_id: int, card_id: int, rating: int, duration_ms: int | None = None
+    ) -> None:
+        item = PendingRating(deck_id, card_id, rating, epoch_now(), duration_ms)
+        with self._cond:
+            self._pending.append(item)
+            self._recorded += 1
+            if len(self._pending) >= self.max_batch:
+                self._cond.notify_all()
+
+    def flush(self, timeout: float | None = 5.0) -> bool:
+        """
+        Block until every rating recorded so far is committed. Returns False
+        if that did not happen within `timeout` seconds.
+        """
+        if self._thread is None:
+            return self._write_pending()
+        with self._cond:
+            target = self._recorded
+            self._flush_requested = True
+            self._cond.notify_all()
+            return self._cond.wait_for(lambda: self._written >= target, timeout)
+
+    # ── Writer thread ─────────────────────────────────────────────────────────
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                self._cond.wait_for(
+                    lambda: self._stopping or self._flush_requested
+                    or len(self._pending) >= self.max_batch,
+                    self.interval,
+                )
+                if self._stopping:
+                    return
+                self._flush_requested = False
+            self._write_pending()
+
+    def _write_pending(self) -> bool:
+        """Write all pending ratings in one transaction. Returns success."""
+        with self._write_lock:
+            with self._cond:
+                batch, self._pending = self._pending, []
+            if not batch:
+                return True
+            try:
+                with self._db.writer() as conn:
+                    progress_repo.apply_ratings(conn, (
+                        (r.card_id, r.rating, r.reviewed_at, r.duration_ms)
+                        for r in batch
+                    ))
+                    last: dict[int, int] = {}
+                    for r in batch:
+                        last[r.deck_id] = r.reviewed_at
+                    for deck_id, studied_at in last.items():
+                        deck_repo.update_last_studied(conn, deck_id, studied_at)
+            except sqlite3.Error as e:
+                # Keep the batch, in order, ahead of anything recorded since
+                log.warning("Deferring %d rating(s): %s", len(batch), e)
+                with self._cond:
+                    self._pending[:0] = batch
+                return False
+            with self._cond:
+                self._written += len(batch)
+                self._cond.notify_all()
+            return True
@@ -0,0 +1,67 @@
+import sqlite3
+from collections.abc import Iterable
+
+
+def insert_reviews(conn: sqlite3.Connection, reviews: Iterable[tuple]) -> None:
+    """
+    Append reviews in one executemany. Each item is
+    (card_id, deck_id, reviewed_at, day, rating, prev_interval, interval,
+    easiness, duration_ms); review_daily is updated by trigger.
+    """
+    conn.executemany(
+        "INSERT INTO review_log (card_id, deck_id, reviewed_at, day, rating, "
+        "prev_interval, interval, easiness, duration_ms) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        reviews,
+    )
+
+
+def get_card_reviews(conn: sqlite3.Connection, card_id: int) -> list[sqlite3.Row]:
+    return conn.execute(
+        "SELECT * FROM review_log WHERE card_id = ? ORDER BY id", (card_id,)
+    ).fetchall()
+
+
+def get_rating_history(
+    conn: sqlite3.Connection, deck_id: int
+) -> list[tuple[int, int, int]]:
+    """
+    (card_id, day, rating) for every review in a deck, grouped by card in
+    review order, as plain tuples; the input of optimizer.ReviewHistory.
+    """
+    cur = conn.cursor()
+    cur.row_factory = None
+    return cur.execute(
+        "SELECT card_id, day, rating FROM review_log WHERE deck_id = ? ORDER BY card_id, id",
+        (deck_id,),
+    ).fetchall()
+
+
+def get_daily(
+    conn: sqlite3.Connection, deck_id: int, since: int | None = None
+) -> list[sqlite3.Row]:
+    """Per-day rollup rows for a deck, oldest first, from day number `since`."""
+    return conn.execute(
+        "SELECT * FROM review_daily WHERE deck_id = ? AND day >= ? ORDER BY day",
+        (deck_id, since if since is not None else 0),
+    ).fetchall()
+
+
+def get_history(conn: sqlite3.Connection, deck_id: int) -> dict:
+    """
+    All-time totals for a deck from the daily rollup. Retention is the share
+    of reviews of already-learned cards (previous interval > 0) rated 3+.
+    """
+    row = conn.execute(
+        "SELECT COUNT(*) AS days, COALESCE(SUM(reviews), 0) AS reviews, "
+        "COALESCE(SUM(recalls), 0) AS recalls, COALESCE(SUM(recalled), 0) AS recalled, "
+        "COALESCE(SUM(duration_ms), 0) AS duration_ms "
+        "FROM review_daily WHERE deck_id = ?",
+        (deck_id,),
+    ).fetchone()
+    return {
+        "days": row["days"],
+        "reviews": row["reviews"],
+        "retention": row["recalled"] / row["recalls"] if row["recalls"] else None,
+        "duration_ms": row["duration_ms"],
+    }
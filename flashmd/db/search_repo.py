@@ -0,0 +1,95 @@
+import re
+import sqlite3
+
+_TOKEN = re.compile(r"\w+")
+
+# Ranking costs about a microsecond per match, so queries matching more
+# cards than this (a very common word, a one- or two-letter prefix) list the
+# newest matches instead of the best ones.
+RANKED_MATCHES = 10_000
+
+
+def search_cards(
+    conn: sqlite3.Connection,
+    query: str,
+    limit: int = 50,
+    mark: tuple[str, str] = ("[", "]"),
+) -> list[sqlite3.Row]:
+    """
+    Cards matching every word of `query` in their front or back, best first
+    (front hits weigh more). The last word also matches as a prefix, so
+    partial input finds cards while the user types.
+
+    Rows have id, deck_id, deck_title, front and snippet: a short excerpt
+    of the best-matching column with hits wrapped in `mark`. Without the
+    FTS5 index (SQLite built without it) a LIKE scan is used instead; its
+    snippets are plain text.
+    """
+    words = _TOKEN.findall(query)
+    if not words or limit <= 0:
+        return []
+    try:
+        return _search_fts(conn, _fts_query(words, prefix=not query[-1].isspace()),
+                           limit, mark)
+    except sqlite3.OperationalError as e:
+        if "no such table" not in str(e):
+            raise
+    return _search_like(conn, words, limit)
+
+
+def _fts_query(words: list[str], prefix: bool) -> str:
+    """Quote each word so FTS5 operators in user input are matched literally."""
+    terms = [f'"{w}"' for w in words]
+    if prefix:
+        terms[-1] += "*"
+    return " ".join(terms)
+
+
+def _search_fts(
+    conn: sqlite3.Connection, match: str, limit: int, mark: tuple[str, str]
+) -> list[sqlite3.Row]:
+    matches = conn.execute(
+        "SELECT COUNT(*) FROM (SELECT 1 FROM card_fts WHERE card_fts MATCH ? LIMIT ?)",
+        (match, RANKED_MATCHES + 1),
+    ).fetchone()[0]
+    order = "rank" if matches <= RANKED_MATCHES else "rowid DESC"
+    # FTS5 sorts inside the module, so only `limit` snippets are built
+    return conn.execute(
+        f"""
+        SELECT c.id, c.deck_id, d.title AS deck_title, c.front, f.snippet
+        FROM (
+            SELECT rowid, rank, snippet(card_fts, -1, ?, ?, '…', 12) AS snippet
+            FROM card_fts
+            WHERE card_fts MATCH ?
+            ORDER BY {order}
+            LIMIT ?
+        ) f
+        JOIN card c ON c.id = f.rowid
+        JOIN deck d ON d.id = c.deck_id
+        ORDER BY f.{order}
+        """,
+        (mark[0], mark[1], match, limit),
+    ).fetchall()
+
+
+def _search_like(
+    conn: sqlite3.Connection, words: list[str], limit: int
+) -> list[sqlite3.Row]:
+    patterns = ["%" + re.sub(r"([\\%_])", r"\\\1", w) + "%" for w in words]
+    where = " AND ".join(
+        "(c.front LIKE ? ESCAPE '\\' OR c.back LIKE ? ESCAPE '\\')" for _ in words
+    )
+    params: list = [p for p in patterns for _ in range(2)]
+    return conn.execute(
+        f"""
+        SELECT c.id, c.deck_id, d.title AS deck_title, c.front,
+               substr(c.back, max(1, instr(lower(c.back), lower(?)) - 40), 120)
+                   AS snippet
+        FROM card c
+        JOIN deck d ON d.id = c.deck_id
+        WHERE {where}
+        ORDER BY c.front LIKE ? ESCAPE '\\' DESC, c.id
+        LIMIT ?
+        """,
+        [words[0], *params, patterns[0], limit],
+    ).fetchall()
@@ -0,0 +1,96 @@
+"""
+Integer time values stored in the database.
+
+- Calendar days are day numbers: days since 1970-01-01, counted on the local
+  calendar (the day the user sees). Due dates are compared and bucketed with
+  plain integer arithmetic.
+- Instants (created, reviewed, studied) are Unix epoch seconds.
+
+today() and epoch_now() read the current Clock, which tests and simulations
+can replace with a FixedClock (see use_clock).
+"""
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from datetime import date, datetime
+
+_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+SECONDS_PER_DAY = 86_400
+
+
+class Clock:
+    """The system clock."""
+
+    def now(self) -> float:
+        return time.time()
+
+    def today(self) -> int:
+        return epoch_to_day(self.now())
+
+
+class FixedClock(Clock):
+    """A clock that only moves when told to."""
+
+    def __init__(self, now: float) -> None:
+        self._now = now
+
+    @classmethod
+    def at_day(cls, day: int) -> "FixedClock":
+        """Noon, local time, on day number `day`."""
+        d = day_to_date(day)
+        return cls(datetime(d.year, d.month, d.day, 12).timestamp())
+
+    def now(self) -> float:
+        return self._now
+
+    def advance(self, days: int = 0, seconds: float = 0) -> None:
+        self._now += days * SECONDS_PER_DAY + seconds
+
+
+_clock: Clock = Clock()
+
+
+def get_clock() -> Clock:
+    return _clock
+
+
+def set_clock(clock: Clock | None) -> Clock:
+    """Install `clock` (None: the system clock); returns the previous one."""
+    global _clock
+    previous, _clock = _clock, clock or Clock()
+    return previous
+
+
+@contextmanager
+def use_clock(clock: Clock) -> Iterator[Clock]:
+    previous = set_clock(clock)
+    try:
+        yield clock
+    finally:
+        set_clock(previous)
+
+
+def day_number(d: date) -> int:
+    return d.toordinal() - _EPOCH_ORDINAL
+
+
+def day_to_date(day: int) -> date:
+    return date.fromordinal(day + _EPOCH_ORDINAL)
+
+
+def today() -> int:
+    return _clock.today()
+
+
+def epoch_now() -> int:
+    return int(_clock.now())
+
+
+def epoch_to_day(ts: float) -> int:
+    """Local calendar day of an instant."""
+    return day_number(datetime.fromtimestamp(ts).date())
+
+
+def epoch_to_datetime(ts: float) -> datetime:
+    """Aware datetime in local time."""
+    return datetime.fromtimestamp(ts).astimezone()
@@ -0,0 +1,105 @@
+"""
+Fits SM-2 constants per deck from its review history and stores them for
+apply_rating.
+
+    python -m flashmd.db.tuning_service [--deck ID] [--candidates N] [--workers N] [--dry-run]
+
+Each deck's history is replayed against the default constants, its current
+ones and `candidates` random sets (optimizer.optimize, in a process pool).
+The best set is saved when the deck has at least MIN_SCORED scored reviews;
+a best set equal to the defaults removes the deck's row instead.
+"""
+import argparse
+import sqlite3
+from dataclasses import dataclass
+
+from flashmd.db import deck_repo, params_repo, review_repo
+from flashmd.db.database import get_connection, init_db
+from flashmd.sm2 import optimizer
+from flashmd.sm2.algorithm import DEFAULT_PARAMS, SM2Params
+from flashmd.sm2.optimizer import ReviewHistory, Score
+
+CANDIDATES = 200
+MIN_SCORED = 200  # fewer reviews than this fit noise, not the deck
+
+
+@dataclass
+class FitReport:
+    deck_id: int
+    default: Score
+    best: Score
+    params: SM2Params
+    saved: bool
+
+
+def fit_deck(
+    conn: sqlite3.Connection,
+    deck_id: int,
+    candidates: int = CANDIDATES,
+    workers: int | None = None,
+    seed: int | None = None,
+    save: bool = True,
+    commit: bool = True,
+    min_scored: int = MIN_SCORED,
+) -> FitReport:
+    """
+    Fit one deck. With save=False nothing is written; pass commit=False to
+    leave the write in the caller's transaction.
+    """
+    history = ReviewHistory.from_rows(review_repo.get_rating_history(conn, deck_id))
+    current = params_repo.get_params(conn, deck_id)
+    schedulers = optimizer.sm2_candidates(candidates, seed, include=(current, DEFAULT_PARAMS))
+    ranked = optimizer.optimize(history, schedulers, workers)
+
+    best_score, best = ranked[0]
+    default = next(score for score, s in ranked if s.params == DEFAULT_PARAMS)
+    saved = save and best_score.scored >= min_scored
+    if saved:
+        if best.params == DEFAULT_PARAMS:
+            params_repo.clear_params(conn, deck_id)
+        else:
+            params_repo.set_params(
+                conn, deck_id, best.params, best_score.loss, best_score.scored
+            )
+        if commit:
+            conn.commit()
+    return FitReport(deck_id, default, best_score, best.params, saved)
+
+
+def fit_all(conn: sqlite3.Connection, **kwargs) -> list[FitReport]:
+    """fit_deck for every deck, committing after each."""
+    return [fit_deck(conn, deck["id"], **kwargs) for deck in deck_repo.get_all(conn)]
+
+
+def main(argv: list[str] | None = None) -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    ap.add_argument("--deck", type=int, help="deck ID (default: every deck)")
+    ap.add_argument("--candidates", type=int, default=CANDIDATES)
+    ap.add_argument("--workers", type=int)
+    ap.add_argument("--seed", type=int)
+    ap.add_argument("--dry-run", action="store_true", help="report without saving")
+    args = ap.parse_args(argv)
+
+    conn = get_connection()
+    try:
+        init_db(conn)
+        kwargs = dict(candidates=args.candidates, workers=args.workers,
+                      seed=args.seed, save=not args.dry_run)
+        reports = (
+            [fit_deck(conn, args.deck, **kwargs)] if args.deck is not None
+            else fit_all(conn, **kwargs)
+        )
+        titles = deck_repo.get_titles(conn, [r.deck_id for r in reports])
+    finally:
+        conn.close()
+
+    print(f"{'deck':<32}{'reviews':>9}{'default':>9}{'best':>9}  saved")
+    for r in reports:
+        print(f"{titles.get(r.deck_id, r.deck_id)!s:<32.32}{r.best.scored:>9,}"
+              f"{r.default.loss:>9.4f}{r.best.loss:>9.4f}  {'yes' if r.saved else 'no'}")
+        if r.saved and r.params != DEFAULT_PARAMS:
+            print(f"    {r.params}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,22 @@
+import queue
 import tkinter as tk
-from tkinter import ttk
+from collections.abc import Callable
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
 
-from flashmd.db.database import get_connection, init_db
+from flashmd.db.database import ConnectionManager
+from flashmd.db.executor import DbExecutor
+from flashmd.db.rating_queue import RatingQueue
 from flashmd.gui import theme
 from flashmd.gui.deck_list import DeckListScreen
 from flashmd.gui.study_session import StudySessionScreen
 from flashmd.gui.session_summary import SessionSummaryScreen
 from flashmd.gui.deck_stats import DeckStatsScreen
+from flashmd.gui.screen import Screen, ScreenCache
+from flashmd.sync.watcher import FolderWatcher
+
+DB_POLL_MS = 15
+SCREEN_CACHE = 4    # hidden deck list / stats screens kept for reuse
 
 
 class App(tk.Tk):
@@ -26,26 +36,180 @@ class App(tk.Tk):
         self.columnconfigure(0, weight=1)
         self.rowconfigure(0, weight=1)
 
-        self.conn = get_connection()
-        init_db(self.conn)
+        self.db = ConnectionManager()
+        self.ratings = RatingQueue(self.db)
+        self.ratings.start()
+        self.db_executor = DbExecutor(self.db)
+        # CPU-bound work (forecasts) runs here, leaving the DB worker free
+        self._compute = ThreadPoolExecutor(max_workers=1, thread_name_prefix="flashmd-compute")
+        self._db_waiting: list[tuple[Future, Callable | None, tk.Misc | None]] = []
+        self._db_poll_job: str | None = None
+
+        self._watcher: FolderWatcher | None = None
+        self._watch_events: queue.Queue[list[int]] = queue.Queue()
+        self._drain_job: str | None = None
 
-        self._current: ttk.Frame | None = None
+        self._current: Screen | None = None
+        self._current_key: tuple | None = None
+        self._screens = ScreenCache(SCREEN_CACHE)
         self.show_deck_list()
 
-    def _swap(self, frame: ttk.Frame) -> None:
-        if self._current is not None:
-            self._current.grid_forget()
-        self._current = frame
-        frame.grid(row=0, column=0, sticky="nsew")
+    def destroy(self) -> None:
+        self.stop_watching()
+        if self._db_poll_job is not None:
+            self.after_cancel(self._db_poll_job)
+            self._db_poll_job = None
+        super().destroy()
+        self._compute.shutdown(wait=False, cancel_futures=True)
+        self.db_executor.shutdown()
+        self.ratings.close()
+        self.db.close()
+
+    # ── Background database work ──────────────────────────────────────────────
+
+    def run_db(
+        self,
+        fn: Callable,
+        *args,
+        on_done: Callable | None = None,
+        owner: tk.Misc | None = None,
+        write: bool = False,
+    ) -> Future:
+        """
+        Run fn(conn, *args) on the DB executor and call on_done(result) on
+        the Tk thread once it finishes. The callback is dropped if `owner`
+        has been destroyed by then; errors go to report_callback_exception.
+        """
+        submit = self.db_executor.write if write else self.db_executor.read
+        return self._wait_for(submit(fn, *args), on_done, owner)
+
+    def run_compute(
+        self,
+        fn: Callable,
+        *args,
+        on_done: Callable | None = None,
+        owner: tk.Misc | None = None,
+    ) -> Future:
+        """
+        Run fn(*args) on the compute thread, for CPU-bound work that would
+        hold up other screens' queries on the DB executor; on_done and owner
+        behave as in run_db. Calls run one at a time, in submission order.
+        """
+        return self._wait_for(self._compute.submit(fn, *args), on_done, owner)
+
+    def save_ratings(self, deck_ids: set[int]) -> None:
+        """
+        Write every recorded rating now. flush() blocks until the commit, so
+        it waits on the compute thread rather than ahead of other screens'
+        queries on the DB worker; the deck list, if showing by then, picks up
+        the new counts for deck_ids.
+        """
+        if deck_ids:
+            self.run_compute(self.ratings.flush, on_done=lambda ok: self._ratings_saved(deck_ids))
+
+    def _ratings_saved(self, deck_ids: set[int]) -> None:
+        if isinstance(self._current, DeckListScreen):
+            self._current.refresh_decks(list(deck_ids))
+
+    def _wait_for(self, future: Future, on_done: Callable | None, owner: tk.Misc | None) -> Future:
+        self._db_waiting.append((future, on_done, owner))
+        if self._db_poll_job is None:
+            self._db_poll_job = self.after(DB_POLL_MS, self._poll_db)
+        return future
+
+    def _poll_db(self) -> None:
+        self._db_poll_job = None
+        waiting, self._db_waiting = self._db_waiting, []
+        still = []
+        entries = iter(waiting)
+        try:
+            for future, on_done, owner in entries:
+                if not future.done():
+                    still.append((future, on_done, owner))
+                    continue
+                if future.cancelled() or (owner is not None and not owner.winfo_exists()):
+                    continue
+                error = future.exception()
+                if error is not None:
+                    self.report_callback_exception(type(error), error, error.__traceback__)
+                elif on_done is not None:
+                    try:
+                        on_done(future.result())
+                    except Exception as e:
+                        self.report_callback_exception(type(e), e, e.__traceback__)
+        finally:
+            # Callbacks may have queued more work meanwhile; entries not
+            # reached (the loop was interrupted) are kept as well
+            self._db_waiting[:0] = [*still, *entries]
+        if self._db_waiting and self._db_poll_job is None:
+            self._db_poll_job = self.after(DB_POLL_MS, self._poll_db)
+
+    # ── Watched folder ────────────────────────────────────────────────────────
+
+    @property
+    def watched_directory(self) -> Path | None:
+        return self._watcher.directory if self._watcher is not None else None
+
+    def start_watching(self, directory: str | Path) -> None:
+        """Re-import changed decks under `directory` in the background."""
+        self.stop_watching()
+        self._watcher = FolderWatcher(directory, self.db, self._watch_events.put)
+        self._watcher.start()
+        self._drain_job = self.after(250, self._drain_watch_events)
+
+    def stop_watching(self) -> None:
+        if self._drain_job is not None:
+            self.after_cancel(self._drain_job)
+            self._drain_job = None
+        if self._watcher is not None:
+            self._watcher.stop()
+            self._watcher = None
+
+    def _drain_watch_events(self) -> None:
+        # The watcher thread never touches Tk; deck IDs arrive through a queue
+        deck_ids: list[int] = []
+        while True:
+            try:
+                deck_ids.extend(self._watch_events.get_nowait())
+            except queue.Empty:
+                break
+        if deck_ids and isinstance(self._current, DeckListScreen):
+            self._current.refresh_decks(deck_ids)
+        self._drain_job = self.after(250, self._drain_watch_events)
+
+    def _show(self, key: tuple | None, make: Callable[..., Screen], *args) -> None:
+        """
+        Replace the current screen. Screens with a key are cached when left
+        and reused when shown again; screens without one (a study session,
+        its summary) are destroyed when left.
+        """
+        current = self._current
+        if current is not None and key is not None and key == self._current_key:
+            current.on_show()
+            return
+        screen = self._screens.take(key) if key is not None else None
+        if screen is None:
+            screen = make(self, self, *args)
+        if current is not None:
+            current.on_hide()
+            current.grid_forget()
+            if self._current_key is None:
+                current.destroy()
+            else:
+                self._screens.put(self._current_key, current)
+        self._current, self._current_key = screen, key
+        screen.grid(row=0, column=0, sticky="nsew")
+        screen.on_show()
 
     def show_deck_list(self) -> None:
-        self._swap(DeckListScreen(self, self))
+        self._show(("deck_list",), DeckListScreen)
 
-    def show_study_session(self, deck_id: str) -> None:
-        self._swap(StudySessionScreen(self, self, deck_id))
+    def show_study_session(self, deck_id: int | None) -> None:
+        """Study one deck, or with deck_id None everything due in all decks."""
+        self._show(None, StudySessionScreen, deck_id)
 
-    def show_session_summary(self, deck_id: str, results: dict) -> None:
-        self._swap(SessionSummaryScreen(self, self, deck_id, results))
+    def show_session_summary(self, deck_id: int | None, results: dict) -> None:
+        self._show(None, SessionSummaryScreen, deck_id, results)
 
-    def show_deck_stats(self, deck_id: str) -> None:
-        self._swap(DeckStatsScreen(self, self, deck_id))
+    def show_deck_stats(self, deck_id: int) -> None:
+        self._show(("deck_stats", deck_id), DeckStatsScreen, deck_id)
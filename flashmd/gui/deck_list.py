@@ -1,19 +1,48 @@
 import tkinter as tk
+from collections.abc import Callable
 from tkinter import ttk, filedialog, messagebox
 from pathlib import Path
 
-from flashmd.db import deck_repo, progress_repo
-from flashmd.db.import_service import import_deck
-from flashmd.parser.md_parser import parse
+from flashmd.db import deck_repo, search_repo
+from flashmd.db.import_job import DirectoryImportJob, ImportCancelled, ImportJob
+from flashmd.db.timeutil import epoch_to_datetime
+from flashmd.parser.md_parser import parse_path
 from flashmd.gui import theme
+from flashmd.gui.screen import Screen
+from flashmd.gui.virtual_list import PAGE_SIZE, VirtualList
 
+IMPORT_POLL_MS = 100
+SEARCH_DELAY_MS = 150       # typing pause before a search runs
+FILTER_DELAY_MS = 100       # typing pause before the deck filter runs
+SEARCH_LIMIT = 50
+_MARK = ("\x02", "\x03")    # snippet highlight delimiters, never in card text
 
-class DeckListScreen(ttk.Frame):
+
+class DeckListScreen(Screen):
     def __init__(self, master, app):
-        super().__init__(master)
-        self._app = app
+        super().__init__(master, app)
+        self._prefix = ""
+        self._filter_job: str | None = None
+        self._poll_job: str | None = None
+        self._highlight_job: str | None = None
+        self._highlight: int | None = None
+        self._job: ImportJob | DirectoryImportJob | None = None
+        self._search_job: str | None = None
+        self._search_seq = 0
         self._build()
-        self._load()
+
+    def on_show(self):
+        # Counts change while the list is hidden, e.g. during a study session
+        self._load(keep_position=True)
+
+    def destroy(self):
+        jobs = (self._search_job, self._filter_job, self._poll_job, self._highlight_job)
+        for job in jobs:
+            if job is not None:
+                self.after_cancel(job)
+        if self._job is not None:
+            self._job.cancel()
+        super().destroy()
 
     def _build(self):
         self.columnconfigure(0, weight=1)
@@ -27,92 +56,275 @@ class DeckListScreen(ttk.Frame):
         ttk.Label(hdr, text="FlashMD", style="Title.TLabel").grid(
             row=0, column=0, sticky="w", padx=16, pady=12
         )
-        ttk.Button(hdr, text="+ Import .md", style="Accent.TButton",
-                   command=self._import).grid(row=0, column=1, padx=12, pady=8)
+        ttk.Button(
+            hdr, text="Study all due", style="Accent.TButton",
+            command=lambda: self._app.show_study_session(None),
+        ).grid(row=0, column=1, padx=(0, 12), pady=8)
+        self._watch_btn = ttk.Button(hdr, command=self._toggle_watch)
+        self._watch_btn.grid(row=0, column=2, padx=(0, 4), pady=8)
+        self._update_watch_button()
+        self._folder_btn = ttk.Button(hdr, text="+ Import folder",
+                                      command=self._import_folder)
+        self._folder_btn.grid(row=0, column=3, pady=8)
+        self._import_btn = ttk.Button(hdr, text="+ Import .md", style="Accent.TButton",
+                                      command=self._import)
+        self._import_btn.grid(row=0, column=4, padx=12, pady=8)
+
+        self._search_var = tk.StringVar()
+        self._search_var.trace_add("write", lambda *_: self._on_search_changed())
+        search = ttk.Entry(hdr, textvariable=self._search_var)
+        search.grid(row=1, column=0, columnspan=5, sticky="ew", padx=16, pady=(0, 10))
+        search.bind("<Escape>", lambda e: self._search_var.set(""))
+        search.bind("<Return>", lambda e: self._jump_to_result(0))
+
+        # Import progress, shown while a background import runs
+        self._job_frame = ttk.Frame(self, style="Surface.TFrame")
+        self._job_frame.grid(row=2, column=0, sticky="ew")
+        self._job_frame.columnconfigure(1, weight=1)
+        self._job_label = ttk.Label(self._job_frame, text="", style="Sub.TLabel")
+        self._job_label.grid(row=0, column=0, sticky="w", padx=16, pady=8)
+        self._job_bar = ttk.Progressbar(
+            self._job_frame, orient="horizontal", mode="determinate", maximum=1.0
+        )
+        self._job_bar.grid(row=0, column=1, sticky="ew", padx=8)
+        ttk.Button(self._job_frame, text="Cancel", command=self._cancel_import).grid(
+            row=0, column=2, padx=12, pady=6
+        )
+        self._job_frame.grid_remove()
 
-        # Scrollable deck list
+        # Search results, shown in place of the deck list while searching
+        self._results = tk.Text(
+            self, bg=theme.BG, fg=theme.TEXT, font=theme.FONT_NORMAL,
+            relief="flat", borderwidth=0, highlightthickness=0,
+            padx=24, pady=12, wrap="word", cursor="arrow",
+        )
+        self._results.tag_configure("deck", font=theme.FONT_SMALL, foreground=theme.SUBTEXT)
+        self._results.tag_configure("front", font=theme.FONT_LARGE)
+        self._results.tag_configure("snippet", foreground=theme.SUBTEXT, spacing3=12)
+        self._results.tag_configure("hit", foreground=theme.ACCENT)
+        self._results.config(state="disabled")
+        self._results.grid(row=1, column=0, sticky="nsew")
+        self._results.grid_remove()
+        self._result_decks: list[int] = []
+
+        # Deck list: a filter box over a virtual list paged from the DB
         container = ttk.Frame(self)
         container.grid(row=1, column=0, sticky="nsew")
+        self._list_container = container
         container.columnconfigure(0, weight=1)
-        container.rowconfigure(0, weight=1)
+        container.rowconfigure(1, weight=1)
+
+        self._filter_var = tk.StringVar()
+        self._filter_var.trace_add("write", lambda *_: self._on_filter_changed())
+        filter_entry = ttk.Entry(container, textvariable=self._filter_var)
+        filter_entry.grid(row=0, column=0, sticky="ew", padx=16, pady=(8, 4))
+        filter_entry.bind("<Escape>", lambda e: self._filter_var.set(""))
+
+        self._list = VirtualList(
+            container, make_row=lambda parent: _DeckRow(parent, self._app),
+            fill_row=self._fill_row,
+            request_page=self._request_page,
+        )
+        self._list.grid(row=1, column=0, sticky="nsew")
 
-        canvas = tk.Canvas(container, bg=theme.BG, highlightthickness=0)
-        scrollbar = ttk.Scrollbar(container, orient="vertical", command=canvas.yview)
-        self._list_frame = ttk.Frame(canvas)
-        self._list_frame.columnconfigure(0, weight=1)
+        # Empty / loading state, drawn over the list body
+        self._empty_label = ttk.Label(self._list.body, text="", style="Sub.TLabel")
 
-        self._list_frame.bind(
-            "<Configure>",
-            lambda e: canvas.configure(scrollregion=canvas.bbox("all"))
+    def _load(self, keep_position: bool = False, then=None):
+        """
+        Count the decks matching the filter and restart the list; rows are
+        then fetched page by page as they scroll into view. then(), if given,
+        runs once the list has been reset.
+        """
+        if not self._list.count:
+            self._show_empty("Loading decks…")
+        prefix = self._filter_var.get()
+        self._app.run_db(
+            deck_repo.count_matching, prefix,
+            on_done=lambda n: self._reset(prefix, n, keep_position, then), owner=self,
         )
-        canvas.create_window((0, 0), window=self._list_frame, anchor="nw")
-        canvas.configure(yscrollcommand=scrollbar.set)
 
-        canvas.grid(row=0, column=0, sticky="nsew")
-        scrollbar.grid(row=0, column=1, sticky="ns")
+    def _reset(self, prefix: str, count: int, keep_position: bool, then) -> None:
+        if prefix != self._filter_var.get():
+            return      # the filter changed while counting; a newer _load follows
+        self._prefix = prefix
+        self._list.reset(count, keep_position)
+        if count:
+            self._empty_label.place_forget()
+        elif prefix:
+            self._show_empty(f'No decks starting with "{prefix}".')
+        else:
+            self._show_empty("No decks yet. Import a .md file to get started.")
+        if then is not None:
+            then()
 
-        canvas.bind("<MouseWheel>", lambda e: canvas.yview_scroll(-1 * (e.delta // 120), "units"))
-        canvas.bind("<Button-4>", lambda e: canvas.yview_scroll(-1, "units"))
-        canvas.bind("<Button-5>", lambda e: canvas.yview_scroll(1, "units"))
+    def _show_empty(self, text: str) -> None:
+        self._empty_label.config(text=text)
+        self._empty_label.place(relx=0.5, y=40, anchor="n")
 
-        # Empty state label
-        self._empty_label = ttk.Label(
-            self._list_frame,
-            text="No decks yet. Import a .md file to get started.",
-            style="Sub.TLabel",
+    def _request_page(self, generation: int, page: int) -> None:
+        self._app.run_db(
+            deck_repo.get_page, page * PAGE_SIZE, PAGE_SIZE, self._prefix,
+            on_done=lambda rows: self._list.set_page(generation, page, rows),
+            owner=self,
         )
 
-    def _load(self):
-        for w in self._list_frame.winfo_children():
-            w.destroy()
+    def _fill_row(self, row: "_DeckRow", deck) -> None:
+        if deck is None:
+            row.show(None, "", "", highlight=False)
+        else:
+            row.show(deck["id"], deck["title"], self._info_text(deck),
+                     highlight=deck["id"] == self._highlight)
 
-        conn = self._app.conn
-        decks = deck_repo.get_all(conn)
+    def _on_filter_changed(self):
+        if self._filter_job is not None:
+            self.after_cancel(self._filter_job)
+        self._filter_job = self.after(FILTER_DELAY_MS, self._run_filter)
 
-        if not decks:
-            self._empty_label = ttk.Label(
-                self._list_frame,
-                text="No decks yet. Import a .md file to get started.",
-                style="Sub.TLabel",
-            )
-            self._empty_label.grid(row=0, column=0, padx=24, pady=40)
+    def _run_filter(self):
+        self._filter_job = None
+        self._load()
+
+    @staticmethod
+    def _info_text(deck) -> str:
+        last = deck["last_studied"]
+        last_str = (
+            f"Last studied: {epoch_to_datetime(last).date().isoformat()}"
+            if last else "Never studied"
+        )
+        return f"{deck['total']} cards  •  {deck['due']} due today  •  {last_str}"
+
+    def refresh_decks(self, deck_ids: list[int]) -> None:
+        """
+        Show the given decks' new counts after they changed. Only their rows
+        are fetched and, where loaded, filled again. If a title changed or
+        decks were added, rows move, so the list is reloaded instead,
+        keeping the scroll position.
+        """
+        prefix = self._prefix
+        self._app.run_db(
+            _fetch_changed, prefix, deck_ids,
+            on_done=lambda result: self._apply_changed(prefix, *result), owner=self,
+        )
+
+    def _apply_changed(self, prefix: str, count: int, rows: dict) -> None:
+        if prefix != self._prefix:
+            return      # the filter changed meanwhile; its _load shows fresh rows
+        if count != self._list.count:
+            self._load(keep_position=True)
             return
+        moved = False
 
-        for idx, deck in enumerate(decks):
-            stats = progress_repo.get_stats(conn, deck["id"])
-            self._deck_card(deck, stats, idx)
+        def update(deck):
+            nonlocal moved
+            new = rows.get(deck["id"]) if deck is not None else None
+            if new is None:
+                return deck
+            moved = moved or new["title"] != deck["title"]
+            return new
 
-    def _deck_card(self, deck, stats, row):
-        card = ttk.Frame(self._list_frame, style="Surface.TFrame")
-        card.grid(row=row, column=0, sticky="ew", padx=12, pady=4)
-        card.columnconfigure(0, weight=1)
+        self._list.update_items(update)
+        if moved:
+            self._load(keep_position=True)
+
+    # ── Search ────────────────────────────────────────────────────────────────
 
-        ttk.Label(card, text=deck["title"], style="Title.TLabel").grid(
-            row=0, column=0, sticky="w", padx=12, pady=(10, 2)
+    def _on_search_changed(self):
+        if self._search_job is not None:
+            self.after_cancel(self._search_job)
+        self._search_job = self.after(SEARCH_DELAY_MS, self._run_search)
+
+    def _run_search(self):
+        self._search_job = None
+        self._search_seq += 1
+        query = self._search_var.get()
+        if not query.strip():
+            self._hide_results()
+            return
+        seq = self._search_seq
+        self._app.run_db(
+            search_repo.search_cards, query, SEARCH_LIMIT, _MARK,
+            on_done=lambda rows: self._show_results(seq, rows), owner=self,
         )
 
-        last = deck["last_studied"]
-        last_str = f"Last studied: {last[:10]}" if last else "Never studied"
-        info = f"{stats['total']} cards  •  {stats['due']} due today  •  {last_str}"
-        ttk.Label(card, text=info, style="Sub.TLabel").grid(
-            row=1, column=0, sticky="w", padx=12, pady=(0, 4)
+    def _show_results(self, seq: int, rows):
+        if seq != self._search_seq:
+            return      # the query changed while this one ran
+        text = self._results
+        text.config(state="normal")
+        text.delete("1.0", "end")
+        self._result_decks = [r["deck_id"] for r in rows]
+        if not rows:
+            text.insert("end", "No matching cards.", "deck")
+        for i, r in enumerate(rows):
+            tag = f"result{i}"
+            text.insert("end", r["deck_title"] + "\n", ("deck", tag))
+            text.insert("end", r["front"] + "\n", ("front", tag))
+            for j, part in enumerate(r["snippet"].replace(_MARK[1], _MARK[0]).split(_MARK[0])):
+                text.insert("end", part, ("snippet", tag, "hit") if j % 2 else ("snippet", tag))
+            text.insert("end", "\n", ("snippet", tag))
+            text.tag_bind(tag, "<Button-1>", lambda e, i=i: self._jump_to_result(i))
+        text.config(state="disabled")
+        self._list_container.grid_remove()
+        text.grid()
+
+    def _hide_results(self):
+        self._results.grid_remove()
+        self._list_container.grid()
+
+    def _jump_to_result(self, index: int):
+        """Leave search, clear the filter and scroll to the result's deck."""
+        if index >= len(self._result_decks) or not self._results.winfo_ismapped():
+            return
+        deck_id = self._result_decks[index]
+        self._search_var.set("")
+        self._hide_results()
+        self._filter_var.set("")
+        if self._filter_job is not None:
+            self.after_cancel(self._filter_job)
+            self._filter_job = None
+        self._app.run_db(
+            deck_repo.get_position, deck_id,
+            on_done=lambda pos: self._load(then=lambda: self._show_deck(deck_id, pos)),
+            owner=self,
         )
 
-        btn_frame = ttk.Frame(card, style="Surface.TFrame")
-        btn_frame.grid(row=0, column=1, rowspan=2, padx=12, pady=8)
+    def _show_deck(self, deck_id: int, position: int | None) -> None:
+        if position is None:
+            return
+        if self._highlight_job is not None:
+            self.after_cancel(self._highlight_job)
+        self._highlight = deck_id
+        self._list.see(position)
+        self._list.refresh()
+        self._highlight_job = self.after(1500, self._unhighlight, deck_id)
 
-        deck_id = deck["id"]
-        ttk.Button(
-            btn_frame, text="Study",
-            style="Accent.TButton",
-            command=lambda d=deck_id: self._app.show_study_session(d),
-        ).pack(side="left", padx=(0, 4))
-        ttk.Button(
-            btn_frame, text="Stats",
-            command=lambda d=deck_id: self._app.show_deck_stats(d),
-        ).pack(side="left")
+    def _unhighlight(self, deck_id: int):
+        self._highlight_job = None
+        if self._highlight == deck_id:
+            self._highlight = None
+            self._list.refresh()
+
+    def _toggle_watch(self):
+        if self._app.watched_directory is not None:
+            self._app.stop_watching()
+        else:
+            directory = filedialog.askdirectory(title="Watch Folder for Deck Changes")
+            if not directory:
+                return
+            self._app.start_watching(directory)
+        self._update_watch_button()
+
+    def _update_watch_button(self):
+        watched = self._app.watched_directory
+        if watched is None:
+            self._watch_btn.config(text="Watch folder…")
+        else:
+            self._watch_btn.config(text=f"Stop watching {watched.name}")
 
     def _import(self):
+        if self._job is not None:
+            return
         path = filedialog.askopenfilename(
             title="Import Markdown Deck",
             filetypes=[("Markdown files", "*.md"), ("All files", "*.*")],
@@ -120,32 +332,182 @@ class DeckListScreen(ttk.Frame):
         if not path:
             return
 
-        try:
-            text = Path(path).read_text(encoding="utf-8")
-        except OSError as e:
-            messagebox.showerror("Error", f"Could not read file:\n{e}")
-            return
+        self._app.run_compute(
+            _read_title, path,
+            on_done=lambda found: self._find_deck(path, *found),
+            owner=self,
+        )
 
-        parsed = parse(text, Path(path).name)
-        if not parsed.cards:
-            messagebox.showerror(
-                "No Flashcards Found",
-                "No flashcards found in this file.\n"
-                "Make sure cards follow the pattern:\n"
-                "  **N. TERM — Full Name**",
-            )
+    def _find_deck(self, path: str, title: str | None, error) -> None:
+        if error is not None:
+            messagebox.showerror("Error", f"Could not read file:\n{error}")
             return
+        self._app.run_db(
+            deck_repo.get_by_title, title,
+            on_done=lambda existing: self._confirm_import(path, title, existing),
+            owner=self,
+        )
 
-        conn = self._app.conn
-        existing = deck_repo.get_by_title(conn, parsed.title)
+    def _confirm_import(self, path: str, title: str, existing) -> None:
         if existing:
             ok = messagebox.askyesno(
                 "Deck Already Exists",
-                f'"{parsed.title}" already exists.\n'
+                f'"{title}" already exists.\n'
                 "Replace it? Progress for unchanged cards will be kept.",
             )
             if not ok:
                 return
 
-        import_deck(conn, parsed)
+        self._start_job(ImportJob(self._app.db, path), Path(path).name)
+
+    def _start_job(self, job: ImportJob | DirectoryImportJob, name: str) -> None:
+        self._job = job.start()
+        self._import_btn.state(["disabled"])
+        self._folder_btn.state(["disabled"])
+        self._job_label.config(text=f"Importing {name}…")
+        self._job_bar["value"] = 0
+        self._job_frame.grid()
+        self._poll_job = self.after(IMPORT_POLL_MS, self._poll_import)
+
+    def _cancel_import(self):
+        if self._job is not None:
+            self._job.cancel()
+            self._job_label.config(text="Cancelling…")
+
+    def _poll_import(self):
+        self._poll_job = None
+        job = self._job
+        if job is None:
+            return
+        p = job.progress
+        self._job_bar["value"] = p.fraction
+        if not job.future.done():
+            if isinstance(job, DirectoryImportJob):
+                name = job.directory.name
+                detail = f"{p.files_done:,} / {p.files_total:,} files, {p.cards:,} cards"
+            elif p.phase == "parsing":
+                name = job.path.name
+                detail = f"{p.bytes_parsed / 1e6:.1f} / {p.bytes_total / 1e6:.1f} MB"
+            else:
+                name = job.path.name
+                detail = f"{p.cards_written:,} / {p.cards_parsed:,} cards"
+            if not job.cancelled:
+                self._job_label.config(text=f"Importing {name}: {detail}")
+            self._poll_job = self.after(IMPORT_POLL_MS, self._poll_import)
+            return
+
+        self._job = None
+        self._job_frame.grid_remove()
+        self._import_btn.state(["!disabled"])
+        self._folder_btn.state(["!disabled"])
+        if isinstance(job, DirectoryImportJob):
+            self._folder_import_done(job)
+            return
+        error = job.future.exception()
+        if error is None:
+            self._load()
+        elif isinstance(error, ImportCancelled):
+            pass
+        elif isinstance(error, (OSError, UnicodeDecodeError)):
+            messagebox.showerror("Error", f"Could not read file:\n{error}")
+        elif isinstance(error, ValueError):
+            messagebox.showerror(
+                "No Flashcards Found",
+                "No flashcards found in this file.\n"
+                "Make sure cards follow the pattern:\n"
+                "  **N. TERM — Full Name**",
+            )
+        else:
+            self._app.report_callback_exception(type(error), error, error.__traceback__)
+
+    def _import_folder(self):
+        if self._job is not None:
+            return
+        directory = filedialog.askdirectory(title="Import Folder of Markdown Decks")
+        if not directory:
+            return
+        self._start_job(DirectoryImportJob(self._app.db, directory), Path(directory).name)
+
+    def _folder_import_done(self, job: DirectoryImportJob) -> None:
+        error = job.future.exception()
+        if error is not None:
+            self._app.report_callback_exception(type(error), error, error.__traceback__)
+            return
+        report = job.result()
         self._load()
+
+        summary = (
+            f"Imported {len(report.imported)} deck(s), {report.cards} cards "
+            f"in {report.elapsed:.1f}s ({report.cards_per_second:,.0f} cards/s)."
+        )
+        if job.cancelled:
+            summary = f"Import cancelled. {summary}"
+        if report.errors:
+            failed = "\n".join(
+                f"  {Path(p).name}: {msg}" for p, msg in list(report.errors.items())[:10]
+            )
+            more = len(report.errors) - 10
+            if more > 0:
+                failed += f"\n  … and {more} more"
+            messagebox.showwarning(
+                "Import Finished With Errors",
+                f"{summary}\n\n{len(report.errors)} file(s) failed:\n{failed}",
+            )
+        else:
+            messagebox.showinfo("Import Finished", summary)
+
+
+def _fetch_changed(conn, prefix: str, deck_ids: list[int]):
+    return deck_repo.count_matching(conn, prefix), deck_repo.get_list_rows(conn, deck_ids)
+
+
+def _read_title(path: str):
+    """
+    (title, None) for the file at `path`, or (None, error) if it can't be
+    read. Runs on the compute thread: finding the title reads the whole file
+    when it has no H1, and DB work queued behind it shouldn't wait for that.
+    """
+    try:
+        return parse_path(path).title, None
+    except (OSError, UnicodeDecodeError) as e:
+        return None, e
+
+
+class _DeckRow(ttk.Frame):
+    """One recycled row of the deck list; show() points it at another deck."""
+
+    def __init__(self, master, app):
+        super().__init__(master)
+        self._app = app
+        self.deck_id: int | None = None
+        card = ttk.Frame(self, style="Surface.TFrame")
+        card.pack(fill="both", expand=True, padx=12, pady=4)
+        card.columnconfigure(0, weight=1)
+
+        self._title = ttk.Label(card, text=" ", style="Title.TLabel")
+        self._title.grid(row=0, column=0, sticky="w", padx=12, pady=(10, 2))
+        self._info = ttk.Label(card, text=" ", style="Sub.TLabel")
+        self._info.grid(row=1, column=0, sticky="w", padx=12, pady=(0, 4))
+
+        btn_frame = ttk.Frame(card, style="Surface.TFrame")
+        btn_frame.grid(row=0, column=1, rowspan=2, padx=12, pady=8)
+        self._buttons = (
+            ttk.Button(btn_frame, text="Study", style="Accent.TButton",
+                       command=lambda: self._open(self._app.show_study_session)),
+            ttk.Button(btn_frame, text="Stats",
+                       command=lambda: self._open(self._app.show_deck_stats)),
+        )
+        self._buttons[0].pack(side="left", padx=(0, 4))
+        self._buttons[1].pack(side="left")
+
+    def show(self, deck_id: int | None, title: str, info: str, highlight: bool) -> None:
+        self.deck_id = deck_id
+        self._title.config(text=title or " ", foreground=theme.ACCENT if highlight else "")
+        self._info.config(text=info or " ")
+        state = ["!disabled"] if deck_id is not None else ["disabled"]
+        for button in self._buttons:
+            button.state(state)
+
+    def _open(self, show: Callable[[int], None]) -> None:
+        if self.deck_id is not None:
+            show(self.deck_id)
@@ -1,19 +1,28 @@
 import tkinter as tk
+from concurrent.futures import Future
 from tkinter import ttk
 
-from flashmd.db import deck_repo, progress_repo
+from flashmd.db import deck_repo, params_repo, progress_repo, review_repo
+from flashmd.db.timeutil import day_to_date, today
 from flashmd.gui import theme
+from flashmd.gui.screen import Screen
+from flashmd.sm2 import forecast
 
 
 RATING_LABELS = {1: "Again", 2: "Hard", 3: "Good", 4: "Easy", 5: "Perfect"}
+HISTORY_DAYS = 30
+FORECAST_DAYS = 365
+FORECAST_TRIALS = 20
 
 
-class DeckStatsScreen(ttk.Frame):
-    def __init__(self, master, app, deck_id: str):
-        super().__init__(master)
-        self._app = app
+class DeckStatsScreen(Screen):
+    def __init__(self, master, app, deck_id: int):
+        super().__init__(master, app)
         self._deck_id = deck_id
-        self._conn = app.conn
+        self._forecast: forecast.Forecast | None = None
+        self._forecast_frame: ttk.Frame | None = None
+        self._simulation: Future | None = None
+        self._shown = 0         # bumped on hide; results for an older showing are dropped
         self._build()
 
     def _build(self):
@@ -29,18 +38,56 @@ class DeckStatsScreen(ttk.Frame):
             row=0, column=0, padx=8, pady=8
         )
 
-        deck = deck_repo.get_by_id(self._conn, self._deck_id)
-        title = deck["title"] if deck else "Deck Stats"
-        ttk.Label(hdr, text=title, style="Title.TLabel").grid(
-            row=0, column=1, sticky="w", padx=8
+        self._title_label = ttk.Label(hdr, text="Loading…", style="Title.TLabel")
+        self._title_label.grid(row=0, column=1, sticky="w", padx=8)
+
+        # Content, filled in when the stats arrive
+        self._content = ttk.Frame(self)
+        self._content.grid(row=1, column=0, sticky="nsew", padx=40, pady=24)
+        self._content.columnconfigure(0, weight=1)
+        ttk.Label(self._content, text="Loading stats…", style="Sub.TLabel").grid(
+            row=0, column=0, sticky="w"
+        )
+
+    def on_show(self):
+        # Fetched on every show: a cached screen may be out of date
+        shown = self._shown
+        self._forecast = None
+        self._show_forecast()       # the last showing's forecast is stale too
+        since = today() - (HISTORY_DAYS - 1)
+        self._app.run_db(
+            _fetch_stats, self._deck_id, since,
+            on_done=lambda result: self._fill(shown, result), owner=self,
+        )
+        # Separate, so the counts show while the simulation runs
+        self._app.run_db(
+            _fetch_schedule, self._deck_id,
+            on_done=lambda schedule: self._simulate(shown, schedule), owner=self,
+        )
+
+    def on_hide(self):
+        self._shown += 1
+        if self._simulation is not None:
+            self._simulation.cancel()       # only stops one that hasn't started
+            self._simulation = None
+
+    def _simulate(self, shown: int, schedule):
+        if shown != self._shown:
+            return
+        self._simulation = self._app.run_compute(
+            _simulate_forecast, *schedule, today(),
+            on_done=lambda result: self._set_forecast(shown, result), owner=self,
         )
 
-        # Content
-        content = ttk.Frame(self)
-        content.grid(row=1, column=0, sticky="nsew", padx=40, pady=24)
-        content.columnconfigure(0, weight=1)
+    def _fill(self, shown: int, result):
+        if shown != self._shown:
+            return
+        deck, stats, history, daily, since = result
+        self._title_label.config(text=deck["title"] if deck else "Deck Stats")
 
-        stats = progress_repo.get_stats(self._conn, self._deck_id)
+        content = self._content
+        for w in content.winfo_children():
+            w.destroy()
 
         # Summary row
         summary = ttk.Frame(content, style="Surface.TFrame")
@@ -92,8 +139,133 @@ class DeckStatsScreen(ttk.Frame):
                     font=theme.FONT_NORMAL, fg=theme.SUBTEXT, bg=theme.SURFACE, width=5, anchor="e",
                 ).grid(row=row_idx, column=2, padx=(8, 16), pady=4, sticky="e")
 
+        self._history(content, history, daily, since, row=3)
+
+        ttk.Label(
+            content, text=f"Forecast, next {FORECAST_DAYS} days", style="Sub.TLabel"
+        ).grid(row=6, column=0, sticky="w", pady=(16, 8))
+        self._forecast_frame = ttk.Frame(content)
+        self._forecast_frame.grid(row=7, column=0, sticky="ew")
+        self._forecast_frame.columnconfigure(0, weight=1)
+        self._show_forecast()
+
+    def _set_forecast(self, shown: int, result: forecast.Forecast):
+        if shown != self._shown:
+            return
+        self._simulation = None
+        self._forecast = result
+        self._show_forecast()
+
+    def _show_forecast(self):
+        # Whichever of the stats and the forecast arrives last draws it
+        frame, f = self._forecast_frame, self._forecast
+        if frame is None:
+            return
+        for w in frame.winfo_children():
+            w.destroy()
+        if f is None:
+            ttk.Label(frame, text="Simulating…", style="Sub.TLabel").grid(
+                row=0, column=0, sticky="w"
+            )
+            return
+
+        summary = ttk.Frame(frame, style="Surface.TFrame")
+        summary.grid(row=0, column=0, sticky="ew")
+        for col in range(3):
+            summary.columnconfigure(col, weight=1)
+        peak_day, peak = f.peak()
+        self._stat_block(summary, "Next 7 Days", f"{f.total(7):,.0f}", 0)
+        self._stat_block(summary, "Next 30 Days", f"{f.total(30):,.0f}", 1)
+        self._stat_block(
+            summary, f"Busiest ({day_to_date(peak_day):%d %b})", f"{peak:,.0f}", 2
+        )
+
+        chart = tk.Canvas(frame, height=84, bg=theme.SURFACE, highlightthickness=0)
+        chart.grid(row=1, column=0, sticky="ew", pady=(8, 0))
+        chart.bind("<Configure>", lambda e: self._draw_forecast(chart, f))
+
+    def _draw_forecast(self, chart: tk.Canvas, f: forecast.Forecast):
+        """Expected reviews per day as bars, the 90th percentile as a line."""
+        chart.delete("all")
+        width, height = chart.winfo_width(), 80
+        if not len(f) or width < 2:
+            return
+        step = width / len(f)
+        top = max(f.high) or 1
+        for i, n in enumerate(f.mean):
+            if n:
+                h = max(1, round(height * n / top))
+                chart.create_rectangle(
+                    i * step, height + 2 - h, (i + 1) * step, height + 2,
+                    fill=theme.ACCENT, width=0,
+                )
+        line = []
+        for i, n in enumerate(f.high):
+            line += [(i + 0.5) * step, height + 2 - height * n / top]
+        if len(line) >= 4:
+            chart.create_line(*line, fill=theme.SUBTEXT)
+
+    def _history(self, parent, history: dict, daily, since: int, row: int):
+        ttk.Label(parent, text="Review History", style="Sub.TLabel").grid(
+            row=row, column=0, sticky="w", pady=(16, 8)
+        )
+        summary = ttk.Frame(parent, style="Surface.TFrame")
+        summary.grid(row=row + 1, column=0, sticky="ew")
+        for col in range(3):
+            summary.columnconfigure(col, weight=1)
+
+        retention = history["retention"]
+        minutes = history["duration_ms"] / 60_000
+        self._stat_block(summary, "Reviews", f"{history['reviews']:,}", 0)
+        self._stat_block(
+            summary, "Retention", f"{retention:.0%}" if retention is not None else "—", 1
+        )
+        self._stat_block(
+            summary, "Time Spent",
+            f"{minutes / 60:.1f} h" if minutes >= 60 else f"{minutes:.0f} min", 2,
+        )
+
+        # Reviews per day, last HISTORY_DAYS days
+        per_day = {r["day"]: r["reviews"] for r in daily}
+        counts = [per_day.get(since + i, 0) for i in range(HISTORY_DAYS)]
+        height, bar_w, gap = 80, 12, 3
+        chart = tk.Canvas(
+            parent, height=height + 4, width=HISTORY_DAYS * (bar_w + gap),
+            bg=theme.SURFACE, highlightthickness=0,
+        )
+        chart.grid(row=row + 2, column=0, sticky="w", pady=(8, 0))
+        peak = max(counts) or 1
+        for i, n in enumerate(counts):
+            x = i * (bar_w + gap) + gap
+            h = max(1, round(height * n / peak))
+            chart.create_rectangle(
+                x, height + 2 - h, x + bar_w, height + 2,
+                fill=theme.ACCENT if n else theme.SURFACE2, width=0,
+            )
+
     def _stat_block(self, parent, label: str, value: str, col: int):
         f = tk.Frame(parent, bg=theme.SURFACE)
         f.grid(row=0, column=col, padx=12, pady=12, sticky="ew")
         tk.Label(f, text=value, font=theme.FONT_LARGE, fg=theme.ACCENT, bg=theme.SURFACE).pack()
         tk.Label(f, text=label, font=theme.FONT_SMALL, fg=theme.SUBTEXT, bg=theme.SURFACE).pack()
+
+
+def _fetch_stats(conn, deck_id: int, since: int):
+    return (
+        deck_repo.get_by_id(conn, deck_id),
+        progress_repo.get_stats(conn, deck_id),
+        review_repo.get_history(conn, deck_id),
+        review_repo.get_daily(conn, deck_id, since),
+        since,
+    )
+
+
+def _fetch_schedule(conn, deck_id: int):
+    return progress_repo.get_schedule(conn, deck_id), params_repo.get_params(conn, deck_id)
+
+
+def _simulate_forecast(schedule, params, start: int) -> forecast.Forecast:
+    # Runs on App's compute thread, so the simulation never delays DB reads
+    return forecast.simulate(
+        *schedule, start_day=start, days=FORECAST_DAYS, trials=FORECAST_TRIALS, params=params,
+    )
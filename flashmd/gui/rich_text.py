@@ -0,0 +1,51 @@
+"""Shows card backs stored by flashmd.parser.rich in a tk.Text."""
+import tkinter as tk
+from functools import lru_cache
+
+from flashmd.gui import theme
+from flashmd.parser import rich
+
+RENDER_CACHE = 512      # decoded backs kept; a session revisits its "again" cards
+MAX_LINES = 18          # taller backs scroll inside the text widget
+
+FONT_MONO = ("Monospace", 11)
+
+
+@lru_cache(maxsize=RENDER_CACHE)
+def tag_runs(back: str, back_rich: str | None) -> tuple[str, ...]:
+    """The (text, tags, text, tags, …) arguments of Text.insert for a back."""
+    if back_rich is None:
+        return (back, "")
+    return rich.decode(back_rich)
+
+
+def configure(text: tk.Text) -> None:
+    """Set up the tags tag_runs uses on a text widget."""
+    text.tag_configure("b", font=(theme.FONT_FAMILY, theme.FONT_CARD[1], "bold"))
+    text.tag_configure("i", font=(theme.FONT_FAMILY, theme.FONT_CARD[1], "italic"))
+    text.tag_configure("code", font=FONT_MONO, background=theme.SURFACE2)
+    text.tag_configure("pre", font=FONT_MONO, background=theme.SURFACE2, lmargin1=12, lmargin2=12)
+    text.tag_configure("li", lmargin1=8, lmargin2=30)
+    text.tag_configure("quote", foreground=theme.SUBTEXT, lmargin1=16, lmargin2=16)
+    text.tag_configure("h", font=theme.FONT_LARGE)
+    # Tags raise priority as they are made: inline styles win over blocks
+    for tag in ("b", "i", "code"):
+        text.tag_raise(tag)
+
+
+def show(text: tk.Text, back: str, back_rich: str | None = None) -> None:
+    """Replace the contents of `text` with a back, sized to fit up to MAX_LINES."""
+    text.config(state="normal")
+    text.delete("1.0", "end")
+    text.insert("1.0", *tag_runs(back, back_rich))
+    text.config(state="disabled")
+    fit(text)
+
+
+def fit(text: tk.Text) -> None:
+    """Make `text` as tall as its wrapped contents, up to MAX_LINES."""
+    lines = text.count("1.0", "end", "displaylines") if text.winfo_ismapped() else None
+    if lines is None:
+        lines = int(text.index("end-1c").split(".")[0])
+    lines = lines[0] if isinstance(lines, tuple) else lines
+    text.config(height=max(1, min(lines, MAX_LINES)))
@@ -0,0 +1,60 @@
+"""Base class for the app's screens, and the cache App keeps hidden ones in."""
+from collections import OrderedDict
+from collections.abc import Hashable
+from tkinter import ttk
+
+
+class Screen(ttk.Frame):
+    """
+    A view that fills the window. App calls on_show each time the screen is
+    put on the window, including the first, and on_hide when another screen
+    replaces it; a hidden screen is then either cached for reuse or
+    destroyed. Anything outside the screen's own widgets (bind_all handlers,
+    timers) is set up in on_show and released in on_hide, so a hidden screen
+    reacts to nothing.
+    """
+
+    def __init__(self, master, app):
+        super().__init__(master)
+        self._app = app
+
+    def on_show(self) -> None:
+        pass
+
+    def on_hide(self) -> None:
+        pass
+
+
+class ScreenCache:
+    """
+    Hidden screens by key, least recently hidden first. Beyond `size`
+    screens the oldest is destroyed.
+    """
+
+    def __init__(self, size: int):
+        self.size = size
+        self._screens: OrderedDict[Hashable, Screen] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._screens)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._screens
+
+    def take(self, key: Hashable) -> Screen | None:
+        """Remove and return the screen cached under `key`, if any."""
+        return self._screens.pop(key, None)
+
+    def put(self, key: Hashable, screen: Screen) -> None:
+        old = self._screens.pop(key, None)
+        if old is not None and old is not screen:
+            old.destroy()
+        self._screens[key] = screen
+        while len(self._screens) > self.size:
+            _, evicted = self._screens.popitem(last=False)
+            evicted.destroy()
+
+    def clear(self) -> None:
+        while self._screens:
+            _, screen = self._screens.popitem(last=False)
+            screen.destroy()
@@ -2,15 +2,15 @@ import tkinter as tk
 from tkinter import ttk
 
 from flashmd.gui import theme
+from flashmd.gui.screen import Screen
 
 
 RATING_LABELS = {1: "Again", 2: "Hard", 3: "Good", 4: "Easy", 5: "Perfect"}
 
 
-class SessionSummaryScreen(ttk.Frame):
-    def __init__(self, master, app, deck_id: str, results: dict):
-        super().__init__(master)
-        self._app = app
+class SessionSummaryScreen(Screen):
+    def __init__(self, master, app, deck_id: int | None, results: dict):
+        super().__init__(master, app)
         self._deck_id = deck_id
         self._results = results
         self._build()
@@ -72,10 +72,11 @@ class SessionSummaryScreen(ttk.Frame):
         btn_frame = ttk.Frame(center)
         btn_frame.grid(row=3, column=0, pady=8)
 
-        ttk.Button(
-            btn_frame, text="Stats",
-            command=lambda: self._app.show_deck_stats(self._deck_id),
-        ).pack(side="left", padx=4)
+        if self._deck_id is not None:
+            ttk.Button(
+                btn_frame, text="Stats",
+                command=lambda: self._app.show_deck_stats(self._deck_id),
+            ).pack(side="left", padx=4)
         ttk.Button(
             btn_frame, text="Back to Decks",
             style="Accent.TButton",
@@ -1,26 +1,51 @@
+import time
 import tkinter as tk
 from tkinter import ttk
 from collections import deque
 
-from flashmd.db import progress_repo, deck_repo
-from flashmd.gui import theme
+from flashmd.db import card_repo, deck_repo, progress_repo
+from flashmd.gui import rich_text, theme
+from flashmd.gui.screen import Screen
 
+PAGE_SIZE = 200         # due cards fetched per page
+REFILL_AT = 50          # fetch the next page when this few fetched cards remain
+PREFETCH = 5            # backs loaded ahead: the card shown and the next few
 
-class StudySessionScreen(ttk.Frame):
-    def __init__(self, master, app, deck_id: str):
-        super().__init__(master)
-        self._app = app
+
+class StudySessionScreen(Screen):
+    """
+    Studies the cards due in one deck, or with deck_id None in every deck,
+    in due order. Due cards stream in pages (id and front only) as the
+    session goes. Backs are loaded for the card shown and the next few, so
+    flipping rarely waits, in the rich form stored at import; deck titles
+    and category names are fetched once per deck and category met.
+    """
+
+    def __init__(self, master, app, deck_id: int | None):
+        super().__init__(master, app)
         self._deck_id = deck_id
-        self._conn = app.conn
 
-        self._queue: deque = deque()
+        self._queue: deque = deque()        # fetched cards not shown yet
+        self._again: deque = deque()        # rated below 3; studied after the rest
+        self._card = None                   # the card on screen
+        self._after: tuple[int, int] | None = None      # keyset of the next page
+        self._exhausted = False
+        self._fetching = False
+        self._deck_titles: dict[int, str] = {}
+        self._category_names: dict[int, str] = {}
+        self._backs: dict[int, tuple[str, str | None]] = {}   # card id → (back, back_rich)
+        self._backs_requested: set[int] = set()
         self._total = 0
         self._reviewed = 0
         self._rating_counts: dict[int, int] = {}
+        self._rated_decks: set[int] = set()
         self._flipped = False
+        self._shown_at = 0.0
 
         self._build()
-        self.after(0, self._load_queue)
+        self._front_label.config(text="Loading cards…")
+        self._hint_label.grid_remove()
+        self._fetch_page()
 
     def _build(self):
         self.columnconfigure(0, weight=1)
@@ -32,12 +57,14 @@ class StudySessionScreen(ttk.Frame):
         hdr.columnconfigure(1, weight=1)
 
         ttk.Button(hdr, text="← Back", command=self._back).grid(
-            row=0, column=0, padx=8, pady=8
+            row=0, column=0, rowspan=2, padx=8, pady=8
         )
         self._deck_label = ttk.Label(hdr, text="", style="Title.TLabel")
-        self._deck_label.grid(row=0, column=1, sticky="w", padx=8)
+        self._deck_label.grid(row=0, column=1, sticky="w", padx=8, pady=(8, 0))
+        self._category_label = ttk.Label(hdr, text="", style="Sub.TLabel")
+        self._category_label.grid(row=1, column=1, sticky="w", padx=8, pady=(0, 8))
         self._progress_label = ttk.Label(hdr, text="", style="Sub.TLabel")
-        self._progress_label.grid(row=0, column=2, padx=16)
+        self._progress_label.grid(row=0, column=2, rowspan=2, padx=16)
 
         # Progress bar
         self._progress_bar = ttk.Progressbar(self, orient="horizontal", mode="determinate")
@@ -73,15 +100,22 @@ class StudySessionScreen(ttk.Frame):
 
         self._sep = tk.Frame(self._card_frame, height=1, bg=theme.BORDER)
 
-        self._back_label = tk.Label(
+        self._back_text = tk.Text(
             self._card_frame,
-            text="",
             font=theme.FONT_CARD,
             fg=theme.TEXT,
             bg=theme.SURFACE,
-            wraplength=600,
-            justify="left",
+            relief="flat",
+            borderwidth=0,
+            highlightthickness=0,
+            width=60,
+            height=1,
+            wrap="word",
+            cursor="arrow",
+            state="disabled",
         )
+        rich_text.configure(self._back_text)
+        self._back_text.bind("<Configure>", lambda e: rich_text.fit(self._back_text))
 
         # Flip hint
         self._hint_label = tk.Label(
@@ -120,79 +154,150 @@ class StudySessionScreen(ttk.Frame):
 
         self._hide_ratings()
 
-        # Keyboard bindings
+    def on_show(self):
+        # Keyboard bindings, global so they work wherever the focus is
         self.bind_all("<space>", lambda e: self._flip() if not self._flipped else None)
         for i in range(1, 6):
             self.bind_all(str(i), lambda e, r=i: self._rate(r) if self._flipped else None)
 
-    def _load_queue(self):
-        deck = deck_repo.get_by_id(self._conn, self._deck_id)
-        if deck:
-            self._deck_label.config(text=deck["title"])
+    def on_hide(self):
+        self.unbind_all("<space>")
+        for i in range(1, 6):
+            self.unbind_all(str(i))
 
-        rows = progress_repo.get_due_cards(self._conn, self._deck_id)
-        self._queue = deque(rows)
-        self._total = len(rows)
-        self._reviewed = 0
-        self._rating_counts = {}
+    def _fetch_page(self):
+        self._fetching = True
+        self._app.run_db(
+            _fetch_page, self._deck_id, self._after,
+            set(self._deck_titles), set(self._category_names), self._after is None,
+            on_done=self._add_page, owner=self,
+        )
+
+    def _add_page(self, result):
+        rows, deck_titles, category_names, total = result
+        self._fetching = False
+        self._deck_titles.update(deck_titles)
+        self._category_names.update(category_names)
+        if total is not None:
+            self._total = total
+        self._queue.extend(rows)
+        if len(rows) < PAGE_SIZE:
+            self._exhausted = True
+        else:
+            self._after = (rows[-1]["due_day"], rows[-1]["id"])
 
-        if not self._queue:
+        if self._card is not None:
+            return
+        if not self._queue and not self._again and not self._reviewed:
             self._app.show_session_summary(
                 deck_id=self._deck_id,
                 results={"reviewed": 0, "rating_counts": {}, "nothing_due": True},
             )
             return
-
         self._show_next()
 
     def _show_next(self):
         self._flipped = False
         self._hide_ratings()
-        self._hint_label.grid()
         self._sep.grid_remove()
-        self._back_label.grid_remove()
+        self._back_text.grid_remove()
+
+        if self._queue:
+            card = self._queue.popleft()
+        elif not self._exhausted:
+            # The next page is on its way; _add_page shows it
+            self._card = None
+            self._front_label.config(text="Loading cards…")
+            self._hint_label.grid_remove()
+            if not self._fetching:
+                self._fetch_page()
+            return
+        elif self._again:
+            card = self._again.popleft()
+        else:
+            self._finish()
+            return
+        if len(self._queue) < REFILL_AT and not self._exhausted and not self._fetching:
+            self._fetch_page()
 
-        card = self._queue[0]
+        self._card = card
+        self._hint_label.grid()
+        self._deck_label.config(text=self._deck_titles.get(card["deck_id"], ""))
+        category = card["category_id"]
+        self._category_label.config(
+            text=self._category_names.get(category, "") if category is not None else ""
+        )
         self._front_label.config(text=card["front"])
-        self._back_label.config(text=card["back"])
+        rich_text.show(self._back_text, *self._backs.get(card["id"], ("Loading…", None)))
+        self._prefetch_backs()
         self._update_progress()
+        self._shown_at = time.monotonic()
+
+    def _upcoming(self, n: int) -> list:
+        """The card shown and the next cards, up to n, in the order they come."""
+        cards = [self._card] if self._card is not None else []
+        for source in (self._queue, self._again):
+            for card in source:
+                if len(cards) >= n:
+                    return cards
+                cards.append(card)
+            if not self._exhausted:
+                break   # unfetched pages come before the again pile
+        return cards
+
+    def _prefetch_backs(self):
+        wanted = [
+            c["id"] for c in self._upcoming(PREFETCH)
+            if c["id"] not in self._backs and c["id"] not in self._backs_requested
+        ]
+        if not wanted:
+            return
+        self._backs_requested.update(wanted)
+        self._app.run_db(
+            card_repo.get_rich_backs, wanted,
+            on_done=lambda backs: self._add_backs(wanted, backs), owner=self,
+        )
+
+    def _add_backs(self, requested: list[int], backs: dict[int, tuple[str, str | None]]):
+        self._backs_requested.difference_update(requested)
+        self._backs.update(backs)
+        card = self._card
+        if card is not None and card["id"] in requested:
+            # Missing only if the card was deleted since its page was read
+            rich_text.show(self._back_text, *backs.get(card["id"], ("(card removed)", None)))
 
     def _flip(self):
-        if self._flipped or not self._queue:
+        if self._flipped or self._card is None:
             return
         self._flipped = True
         self._hint_label.grid_remove()
         self._sep.grid(row=1, column=0, sticky="ew", padx=20, pady=4)
-        self._back_label.grid(row=2, column=0, padx=30, pady=(4, 30), sticky="ew")
+        self._back_text.grid(row=2, column=0, padx=30, pady=(4, 30), sticky="ew")
         self._show_ratings()
 
     def _rate(self, rating: int):
-        if not self._flipped or not self._queue:
+        if not self._flipped or self._card is None:
             return
 
-        card = self._queue.popleft()
-        progress_repo.apply_rating(self._conn, card["id"], rating)
-        self._conn.commit()
-        deck_repo.update_last_studied(self._conn, self._deck_id)
-        self._conn.commit()
+        card = self._card
+        self._backs.pop(card["id"], None)       # fetched again if it comes back
+        # Written behind by the app's RatingQueue; flushed when the session ends
+        duration_ms = int((time.monotonic() - self._shown_at) * 1000)
+        self._app.ratings.record(card["deck_id"], card["id"], rating, duration_ms)
+        self._rated_decks.add(card["deck_id"])
 
         self._rating_counts[rating] = self._rating_counts.get(rating, 0) + 1
 
         if rating < 3:
-            # Place at end of queue to review again this session
-            self._queue.append(card)
+            # Review again after the rest of the session
+            self._again.append(card)
         else:
             self._reviewed += 1
 
-        if not self._queue:
-            self._finish()
-        else:
-            self._show_next()
+        self._show_next()
 
     def _finish(self):
-        self.unbind_all("<space>")
-        for i in range(1, 6):
-            self.unbind_all(str(i))
+        self._app.save_ratings(self._rated_decks)
         self._app.show_session_summary(
             deck_id=self._deck_id,
             results={
@@ -203,16 +308,13 @@ class StudySessionScreen(ttk.Frame):
         )
 
     def _back(self):
-        self.unbind_all("<space>")
-        for i in range(1, 6):
-            self.unbind_all(str(i))
+        self._app.save_ratings(self._rated_decks)
         self._app.show_deck_list()
 
     def _update_progress(self):
-        remaining = sum(1 for _ in self._queue if True)
-        total_in_queue = len(self._queue)
         done = self._reviewed
-        label = f"{done} done  •  {total_in_queue} remaining"
+        remaining = max(self._total - done, len(self._again) + 1)
+        label = f"{done} done  •  {remaining} remaining"
         self._progress_label.config(text=label)
 
         if self._total > 0:
@@ -227,3 +329,15 @@ class StudySessionScreen(ttk.Frame):
     def _hide_ratings(self):
         for btn in self._rating_buttons.values():
             btn.grid_remove()
+
+
+def _fetch_page(
+    conn, deck_id: int | None, after, known_decks: set, known_categories: set, count: bool
+):
+    rows = progress_repo.get_due_page(conn, deck_id, after, PAGE_SIZE)
+    deck_titles = deck_repo.get_titles(conn, {r["deck_id"] for r in rows} - known_decks)
+    category_names = card_repo.get_category_names(
+        conn, {r["category_id"] for r in rows if r["category_id"] is not None} - known_categories
+    )
+    total = progress_repo.get_due_count(conn, deck_id) if count else None
+    return rows, deck_titles, category_names, total
@@ -67,6 +67,15 @@ def apply(root: tk.Tk) -> None:
     style.configure("Sub.TLabel", font=FONT_SMALL, foreground=SUBTEXT)
     style.configure("Card.TLabel", font=FONT_CARD, foreground=TEXT, background=SURFACE)
 
+    style.configure(
+        "TEntry",
+        fieldbackground=SURFACE2,
+        foreground=TEXT,
+        insertcolor=TEXT,
+        borderwidth=0,
+        padding=(8, 5),
+    )
+
     style.configure(
         "TProgressbar",
         background=ACCENT,
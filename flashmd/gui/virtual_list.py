@@ -0,0 +1,215 @@
+"""
+A scrolling list that only has widgets for the rows on screen.
+
+Every row has the same height. The list keeps a pool of row widgets, just
+enough to cover the viewport, and scrolling moves them and refills them
+with other items instead of creating new ones, so a list of 100,000 items
+costs the same as one of 20. Items arrive in pages through request_page,
+usually a background query: the owner answers with set_page. Rows whose
+page has not arrived yet are filled with None and filled again when it does.
+"""
+import math
+import tkinter as tk
+from collections import OrderedDict
+from collections.abc import Callable, Sequence
+from tkinter import ttk
+
+from flashmd.gui import theme
+
+PAGE_SIZE = 100
+CACHED_PAGES = 8    # pages kept around the viewport; older ones are dropped
+
+
+class VirtualList(ttk.Frame):
+    def __init__(
+        self,
+        master,
+        make_row: Callable[[tk.Misc], tk.Widget],
+        fill_row: Callable[[tk.Widget, object | None], None],
+        request_page: Callable[[int, int], None],
+        row_height: int | None = None,
+        page_size: int = PAGE_SIZE,
+    ):
+        """
+        make_row(parent) creates an empty row widget; fill_row(row, item)
+        shows an item in it (None while loading). request_page(generation,
+        page) asks for items page * page_size onwards; pass both back to
+        set_page. row_height defaults to the height of the first row made.
+        """
+        super().__init__(master)
+        self._make_row = make_row
+        self._fill_row = fill_row
+        self._request_page = request_page
+        self._row_height = row_height
+        self._page_size = page_size
+
+        self._count = 0
+        self._top = 0                   # pixel offset of the viewport
+        self._generation = 0
+        self._pages: OrderedDict[int, Sequence] = OrderedDict()
+        self._requested: set[int] = set()
+        self._pool: list[tk.Widget] = []
+        self._shown: list[tuple[int, bool] | None] = []   # (index, loaded) per pool row
+
+        self.columnconfigure(0, weight=1)
+        self.rowconfigure(0, weight=1)
+        self._body = tk.Frame(self, bg=theme.BG)
+        self._body.grid(row=0, column=0, sticky="nsew")
+        self._scrollbar = ttk.Scrollbar(self, orient="vertical", command=self._on_scrollbar)
+        self._scrollbar.grid(row=0, column=1, sticky="ns")
+        self._body.bind("<Configure>", lambda e: self._layout())
+        self._bind_wheel(self._body)
+
+    @property
+    def count(self) -> int:
+        return self._count
+
+    @property
+    def body(self) -> tk.Frame:
+        """The area rows are drawn in, e.g. for an empty-list message."""
+        return self._body
+
+    def reset(self, count: int, keep_position: bool = False) -> None:
+        """Show a new set of `count` items; cached pages are dropped."""
+        self._generation += 1
+        self._count = count
+        self._pages.clear()
+        self._requested.clear()
+        if not keep_position:
+            self._top = 0
+        self._shown = [None] * len(self._pool)
+        self._layout()
+
+    def set_page(self, generation: int, page: int, items: Sequence) -> None:
+        if generation != self._generation:
+            return      # answer to a request from before the last reset
+        self._requested.discard(page)
+        self._pages[page] = items
+        while len(self._pages) > CACHED_PAGES:
+            self._pages.popitem(last=False)
+        self._layout()
+
+    def item(self, index: int):
+        """The item at `index` if its page is loaded, else None."""
+        page = self._pages.get(index // self._page_size)
+        offset = index % self._page_size
+        return page[offset] if page is not None and offset < len(page) else None
+
+    def see(self, index: int) -> None:
+        """Scroll so the item at `index` is in the middle of the viewport."""
+        if self._row_height:
+            self._top = index * self._row_height - (self._body.winfo_height() - self._row_height) // 2
+            self._layout()
+
+    def update_items(self, update: Callable[[object], object]) -> None:
+        """
+        Pass every loaded item through update() and fill again just the
+        visible rows whose item it replaced (returned a different object).
+        """
+        changed: set[int] = set()
+        for page, items in self._pages.items():
+            new = [update(item) for item in items]
+            replaced = {
+                page * self._page_size + offset
+                for offset, (old, item) in enumerate(zip(items, new)) if item is not old
+            }
+            if replaced:
+                self._pages[page] = new
+                changed |= replaced
+        if changed:
+            self._shown = [
+                None if state is not None and state[0] in changed else state
+                for state in self._shown
+            ]
+            self._layout()
+
+    def refresh(self) -> None:
+        """Fill the visible rows again, e.g. after a change in how they look."""
+        self._shown = [None] * len(self._pool)
+        self._layout()
+
+    # ── Layout ────────────────────────────────────────────────────────────────
+
+    def _layout(self) -> None:
+        height = self._body.winfo_height()
+        if self._row_height is None:
+            if not self._count:
+                self._scrollbar.set(0, 1)
+                return
+            self._new_row()
+            self._row_height = max(1, self._pool[0].winfo_reqheight())
+        rh = self._row_height
+        total = self._count * rh
+        self._top = max(0, min(self._top, total - height))
+        first = self._top // rh
+        visible = min(self._count - first, math.ceil((height + self._top % rh) / rh))
+
+        while len(self._pool) < visible:
+            self._new_row()
+        for k, row in enumerate(self._pool):
+            if k >= visible:
+                if self._shown[k] is not None:
+                    row.place_forget()
+                    self._shown[k] = None
+                continue
+            index = first + k
+            item = self.item(index)
+            state = (index, item is not None)
+            if self._shown[k] != state:
+                self._fill_row(row, item)
+                self._shown[k] = state
+            row.place(x=0, y=index * rh - self._top, relwidth=1, height=rh)
+
+        if total > height > 0:
+            self._scrollbar.set(self._top / total, (self._top + height) / total)
+        else:
+            self._scrollbar.set(0, 1)
+        if visible > 0:
+            self._load_pages(first, first + visible - 1)
+
+    def _load_pages(self, first: int, last: int) -> None:
+        for page in range(first // self._page_size, last // self._page_size + 1):
+            if page in self._pages:
+                self._pages.move_to_end(page)
+            elif page not in self._requested:
+                self._requested.add(page)
+                self._request_page(self._generation, page)
+
+    def _new_row(self) -> None:
+        row = self._make_row(self._body)
+        self._bind_wheel(row)
+        self._pool.append(row)
+        self._shown.append(None)
+        if self._row_height is None:
+            row.update_idletasks()
+
+    # ── Scrolling ─────────────────────────────────────────────────────────────
+
+    def _scroll_to(self, top: float) -> None:
+        self._top = int(top)
+        self._layout()
+
+    def _on_scrollbar(self, action: str, amount: str, unit: str | None = None) -> None:
+        rh = self._row_height or 1
+        if action == "moveto":
+            self._scroll_to(float(amount) * self._count * rh)
+        elif unit == "pages":
+            self._scroll_to(self._top + int(amount) * max(rh, self._body.winfo_height() - rh))
+        else:
+            self._scroll_to(self._top + int(amount) * rh)
+
+    def _on_wheel(self, event) -> None:
+        if event.num == 4:
+            steps = -1
+        elif event.num == 5:
+            steps = 1
+        else:
+            steps = -event.delta // 120 or (-1 if event.delta > 0 else 1)
+        self._scroll_to(self._top + steps * (self._row_height or 1))
+
+    def _bind_wheel(self, widget: tk.Misc) -> None:
+        """Scroll from anywhere over the list, including inside rows."""
+        for sequence in ("<MouseWheel>", "<Button-4>", "<Button-5>"):
+            widget.bind(sequence, self._on_wheel, add="+")
+        for child in widget.winfo_children():
+            self._bind_wheel(child)
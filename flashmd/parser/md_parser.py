@@ -1,5 +1,12 @@
+import io
+import mmap
 import re
+from collections.abc import Iterable, Iterator
 from dataclasses import dataclass, field
+from pathlib import Path
+from typing import IO
+
+from flashmd.parser import rich
 
 
 @dataclass
@@ -7,6 +14,7 @@ class ParsedCard:
     front: str
     back: str
     category: str | None = None
+    back_rich: str | None = None    # rich.encode() form; None when back has no markup
 
 
 @dataclass
@@ -16,10 +24,23 @@ class ParsedDeck:
     cards: list[ParsedCard] = field(default_factory=list)
 
 
-_RE_H1 = re.compile(r'^# (.+)')
-_RE_H2 = re.compile(r'^## (.+)')
-_RE_FRONT = re.compile(r'^\*\*\d+\.\s(.+?)\*\*')
-_RE_HR = re.compile(r'^---+$')
+@dataclass
+class StreamedDeck:
+    """
+    A deck whose cards are produced lazily.
+    `cards` is a one-shot iterator; consuming it reads the source.
+    """
+    title: str
+    source_file: str
+    cards: Iterator[ParsedCard]
+
+
+# Line kinds returned by _classify
+_TEXT, _H1, _H2, _FRONT, _HR = range(5)
+
+# Only the "**N. " prefix of a card front uses a regex; the closing "**" is
+# found with str.find so a long line without one is scanned exactly once.
+_RE_FRONT_PREFIX = re.compile(r'\*\*\d+\.\s')
 
 
 def parse(text: str, source_file: str = "") -> ParsedDeck:
@@ -29,74 +50,163 @@ def parse(text: str, source_file: str = "") -> ParsedDeck:
     (caller should check and raise an error for the user).
     """
     lines = text.splitlines()
+    title = _find_title(lines) or source_file
+    return ParsedDeck(
+        title=title, source_file=source_file, cards=list(iter_cards(lines))
+    )
 
+
+def parse_stream(stream: IO, source_file: str = "") -> StreamedDeck:
+    """
+    Parse a seekable file object (text, binary or an mmap) lazily.
+
+    The title is found with a first pass that stops at the first H1; the
+    stream is then rewound and cards are yielded as they are read, so only
+    one card is held in memory at a time. Output matches parse().
+    """
+    start = stream.tell()
+    title = _find_title(_iter_lines(stream)) or source_file
+    stream.seek(start)
+    return StreamedDeck(
+        title=title, source_file=source_file,
+        cards=iter_cards(_iter_lines(stream)),
+    )
+
+
+def parse_path(path: str | Path, source_file: str | None = None) -> StreamedDeck:
+    """
+    Parse a UTF-8 markdown file through a memory map.
+    source_file defaults to the file name. The file is opened again for the
+    card pass and closed once the cards iterator is exhausted or closed.
+    """
+    path = Path(path)
+    if source_file is None:
+        source_file = path.name
+    with _open_mapped(path) as stream:
+        title = _find_title(_iter_lines(stream)) or source_file
+    return StreamedDeck(
+        title=title, source_file=source_file, cards=_iter_path_cards(path),
+    )
+
+
+def iter_cards(lines: Iterable[str]) -> Iterator[ParsedCard]:
+    """Yield cards from an iterable of lines (without line endings)."""
     title = ""
     current_category: str | None = None
     current_front: str | None = None
     back_lines: list[str] = []
-    cards: list[ParsedCard] = []
-
-    def flush_card():
-        nonlocal current_front, back_lines
-        if current_front is not None:
-            back = _clean_back(back_lines)
-            cards.append(ParsedCard(
-                front=current_front,
-                back=back,
-                category=current_category,
-            ))
-        current_front = None
-        back_lines = []
 
     for line in lines:
-        m_h1 = _RE_H1.match(line)
-        m_h2 = _RE_H2.match(line)
-        m_front = _RE_FRONT.match(line)
-        m_hr = _RE_HR.match(line)
-
-        if m_h1 and not title:
-            title = m_h1.group(1).strip()
-        elif m_h2:
-            flush_card()
-            current_category = m_h2.group(1).strip()
-        elif m_hr:
+        kind, value = _classify(line)
+
+        if kind == _H1 and not title:
+            title = value
+        elif kind == _H2:
+            if current_front is not None:
+                yield _make_card(current_front, back_lines, current_category)
+            current_front = None
+            back_lines = []
+            current_category = value
+        elif kind == _HR:
             # horizontal rule: just a separator, ignore
             pass
-        elif m_front:
-            flush_card()
-            current_front = m_front.group(1).strip()
+        elif kind == _FRONT:
+            if current_front is not None:
+                yield _make_card(current_front, back_lines, current_category)
+            back_lines = []
+            current_front = value
         elif current_front is not None:
             back_lines.append(line)
 
-    flush_card()
+    if current_front is not None:
+        yield _make_card(current_front, back_lines, current_category)
 
-    if not title:
-        title = source_file
 
-    return ParsedDeck(title=title, source_file=source_file, cards=cards)
+def _make_card(
+    front: str, back_lines: list[str], category: str | None
+) -> ParsedCard:
+    return ParsedCard(
+        front=front, back=_clean_back(back_lines), category=category,
+        back_rich=rich.from_lines(back_lines),
+    )
 
 
-def _clean_back(lines: list[str]) -> str:
-    """Join back lines, collapsing runs of blank lines into paragraph breaks."""
-    # Remove leading and trailing blank lines
-    while lines and not lines[0].strip():
-        lines.pop(0)
-    while lines and not lines[-1].strip():
-        lines.pop()
+def _classify(line: str) -> tuple[int, str]:
+    """
+    Classify a line in one pass, dispatching on its first character.
+    Returns (kind, stripped text) for headings and fronts, (kind, "") otherwise.
+
+    Same rules as the original per-line regexes (H1, H2, "**N. front**",
+    "---"), but each line costs O(len(line)) with no backtracking.
+    """
+    first = line[:1]
+    if first == "#":
+        if line.startswith("# ") and len(line) > 2:
+            return _H1, line[2:].strip()
+        if line.startswith("## ") and len(line) > 3:
+            return _H2, line[3:].strip()
+    elif first == "*":
+        m = _RE_FRONT_PREFIX.match(line)
+        if m:
+            start = m.end()
+            end = line.find("**", start + 1)
+            if end != -1:
+                return _FRONT, line[start:end].strip()
+    elif first == "-":
+        if len(line) >= 3 and not line.strip("-"):
+            return _HR, ""
+    return _TEXT, ""
+
+
+def _find_title(lines: Iterable[str]) -> str:
+    """Return the deck title (first non-empty H1), or "" if there is none."""
+    for line in lines:
+        kind, value = _classify(line)
+        if kind == _H1 and value:
+            return value
+    return ""
+
+
+def _iter_lines(stream: IO) -> Iterator[str]:
+    """
+    Yield lines from a text or binary stream with the same boundaries as
+    str.splitlines(). Binary input is decoded as UTF-8 one line at a time,
+    which is safe because b"\\n" never occurs inside a multi-byte sequence.
+    """
+    for raw in iter(stream.readline, stream.read(0)):
+        chunk = raw.decode("utf-8") if isinstance(raw, bytes) else raw
+        yield from chunk.splitlines()
+
+
+def _open_mapped(path: Path) -> IO:
+    """Open path as a read-only mmap, or an empty stream for empty files."""
+    with open(path, "rb") as f:
+        if f.seek(0, io.SEEK_END) == 0:
+            return io.BytesIO()
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
 
-    if not lines:
-        return ""
+def _iter_path_cards(path: Path) -> Iterator[ParsedCard]:
+    with _open_mapped(path) as stream:
+        yield from iter_cards(_iter_lines(stream))
 
+
+def _clean_back(lines: list[str]) -> str:
+    """
+    Join back lines, collapsing runs of blank lines into paragraph breaks.
+    Leading and trailing blank lines produce no paragraph, so this is a
+    single linear pass that leaves `lines` untouched.
+    """
     paragraphs: list[str] = []
     current: list[str] = []
 
     for line in lines:
-        if line.strip():
-            current.append(line.strip())
-        else:
-            if current:
-                paragraphs.append(" ".join(current))
-                current = []
+        stripped = line.strip()
+        if stripped:
+            current.append(stripped)
+        elif current:
+            paragraphs.append(" ".join(current))
+            current = []
 
     if current:
         paragraphs.append(" ".join(current))
@@ -0,0 +1,159 @@
+"""
+Rich text for card backs, tokenized once at import.
+
+tokenize() turns the Markdown lines of a back into runs of (text, tags):
+the text exactly as displayed, with markers removed, and a space-separated
+list of tag names. The tags are
+
+    b, i, code      **bold** (or __bold__), *italic* (or _italic_), `code`
+    pre             fenced ``` code blocks, lines kept as written
+    li              list items, "- ", "* ", "+ " (shown as "•") or "1. "
+    quote           "> " block quotes
+    h               ### and deeper headings (# and ## delimit decks and categories)
+
+Paragraphs are joined into one line each, as in the plain back. encode()
+stores the runs as a flat JSON array [text, tags, text, tags, …], which is
+also the argument list tk.Text.insert takes, so showing a card decodes one
+string and makes one insert call. A back with no markup encodes to None:
+its plain text is already everything there is to show.
+"""
+import json
+import re
+from collections.abc import Iterable
+
+Run = tuple[str, str]
+
+_RE_ITEM = re.compile(r"([-*+]|\d{1,9}[.)])\s+(.*)")
+_RE_INLINE = re.compile(
+    r"`([^`]+)`"
+    r"|\*\*(.+?)\*\*"
+    r"|__(.+?)__"
+    r"|\*([^*\s](?:[^*]*[^*\s])?)\*"
+    r"|(?<!\w)_([^_\s](?:[^_]*[^_\s])?)_(?!\w)"
+)
+_FENCE = "```"
+BULLET = "•  "
+# Anything tokenize could tag; backs without a match skip it entirely
+_RE_MARKUP = re.compile(r"[*_`]|^[ \t]*(?:[-+>#]|\d{1,9}[.)][ \t])", re.MULTILINE)
+_BLOCK_START = frozenset("-*+>#0123456789")
+_ENCODER = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"))
+
+
+def from_lines(lines: list[str]) -> str | None:
+    """encode(tokenize(lines)), with a single scan for backs without markup."""
+    if not _RE_MARKUP.search("\n".join(lines)):
+        return None
+    return encode(tokenize(lines))
+
+
+def tokenize(lines: Iterable[str]) -> list[Run]:
+    """Runs for the back made of `lines` (without line endings); see above."""
+    blocks: list[tuple[str, str]] = []     # (block tag, text)
+    paragraph: list[str] = []
+    code: list[str] | None = None
+
+    def flush():
+        if paragraph:
+            blocks.append(("", " ".join(paragraph)))
+            paragraph.clear()
+
+    for line in lines:
+        stripped = line.strip()
+        if code is not None:
+            if stripped.startswith(_FENCE):
+                blocks.append(("pre", "\n".join(code)))
+                code = None
+            else:
+                code.append(line.rstrip())
+            continue
+        if stripped.startswith(_FENCE):
+            flush()
+            code = []
+        elif not stripped:
+            flush()
+        elif stripped[0] not in _BLOCK_START:
+            if line[0].isspace() and not paragraph and blocks and blocks[-1][0] == "li":
+                # An indented line straight after an item continues it
+                blocks[-1] = ("li", f"{blocks[-1][1]} {stripped}")
+            else:
+                paragraph.append(stripped)
+        elif m := _RE_ITEM.fullmatch(stripped):
+            flush()
+            marker = BULLET if m[1] in "-*+" else m[1] + " "
+            blocks.append(("li", marker + m[2]))
+        elif stripped.startswith(">"):
+            flush()
+            blocks.append(("quote", stripped[1:].strip()))
+        elif (heading := _heading(stripped)) is not None:
+            flush()
+            blocks.append(("h", heading))
+        else:
+            paragraph.append(stripped)
+    flush()
+    if code:                                # unterminated fence: keep the lines
+        blocks.append(("pre", "\n".join(code)))
+
+    runs: list[Run] = []
+    previous = None
+    for tag, text in blocks:
+        if previous is not None:
+            # Consecutive items and quote lines stay together
+            _append(runs, "\n" if tag == previous and tag in ("li", "quote") else "\n\n", "")
+        if tag == "pre":
+            _append(runs, text, "pre")
+        else:
+            for run in _inline(text, (tag,) if tag else ()):
+                _append(runs, *run)
+        previous = tag
+    return runs
+
+
+def _heading(stripped: str) -> str | None:
+    """The text of a "### Heading ###" line, or None if it isn't one."""
+    text = stripped.lstrip("#")
+    if len(stripped) - len(text) < 3 or not text[:1].isspace():
+        return None
+    return text.strip().rstrip("#").rstrip()
+
+
+def _inline(text: str, tags: tuple[str, ...]) -> Iterable[Run]:
+    if "*" not in text and "_" not in text and "`" not in text:
+        yield text, " ".join(tags)
+        return
+    pos = 0
+    for m in _RE_INLINE.finditer(text):
+        if m.start() > pos:
+            yield text[pos:m.start()], " ".join(tags)
+        code, bold, bold2, italic, italic2 = m.groups()
+        if code is not None:
+            yield code, " ".join((*tags, "code"))
+        elif bold is not None or bold2 is not None:
+            yield from _inline(bold if bold is not None else bold2, (*tags, "b"))
+        else:
+            yield from _inline(italic if italic is not None else italic2, (*tags, "i"))
+        pos = m.end()
+    if pos < len(text):
+        yield text[pos:], " ".join(tags)
+
+
+def _append(runs: list[Run], text: str, tags: str) -> None:
+    if runs and runs[-1][1] == tags:
+        runs[-1] = (runs[-1][0] + text, tags)
+    elif text:
+        runs.append((text, tags))
+
+
+def encode(runs: list[Run]) -> str | None:
+    """The stored form of `runs`, or None if they carry no tags."""
+    if all(not tags for _, tags in runs):
+        return None
+    return _ENCODER.encode([x for run in runs for x in run])
+
+
+def decode(stored: str) -> tuple[str, ...]:
+    """Flat (text, tags, text, tags, …) from encode()'s output."""
+    return tuple(json.loads(stored))
+
+
+def plain(runs: list[Run]) -> str:
+    return "".join(text for text, _ in runs)
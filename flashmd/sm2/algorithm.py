@@ -1,21 +1,49 @@
 from dataclasses import dataclass
 
 
-@dataclass
+@dataclass(slots=True)
 class SM2Progress:
     easiness: float = 2.5
     interval: int = 0
     repetitions: int = 0
 
 
-@dataclass
+@dataclass(slots=True)
 class SM2Result:
     easiness: float
     interval: int
     repetitions: int
 
 
-def calculate(progress: SM2Progress, rating: int) -> SM2Result:
+@dataclass(frozen=True, slots=True)
+class SM2Params:
+    """
+    The constants of SM-2. The defaults are the published algorithm;
+    tuning_service fits other values per deck from review history.
+
+    Easiness changes by ef_base - (5 - q) * (ef_linear + (5 - q) * ef_quadratic)
+    for rating q and never drops below min_easiness. Intervals from the third
+    successful review on are the previous one times easiness times
+    interval_modifier.
+    """
+    first_interval: int = 1
+    second_interval: int = 6
+    ef_base: float = 0.1
+    ef_linear: float = 0.08
+    ef_quadratic: float = 0.02
+    min_easiness: float = 1.3
+    interval_modifier: float = 1.0
+
+    def ef_delta(self, rating: int) -> float:
+        return self.ef_base - (5 - rating) * (self.ef_linear + (5 - rating) * self.ef_quadratic)
+
+
+DEFAULT_PARAMS = SM2Params()
+
+
+def calculate(
+    progress: SM2Progress, rating: int, params: SM2Params = DEFAULT_PARAMS
+) -> SM2Result:
     """
     Pure SM-2 calculation. rating must be 1–5.
     Returns updated progress values (no DB side effects).
@@ -34,15 +62,17 @@ def calculate(progress: SM2Progress, rating: int) -> SM2Result:
         new_reps = 0
     else:
         if reps == 0:
-            new_interval = 1
+            new_interval = params.first_interval
         elif reps == 1:
-            new_interval = 6
-        else:
+            new_interval = params.second_interval
+        elif params.interval_modifier == 1.0:
             new_interval = round(prev_interval * old_ef)
+        else:
+            new_interval = max(1, round(prev_interval * old_ef * params.interval_modifier))
         new_reps = reps + 1
 
-    new_ef = old_ef + (0.1 - (5 - rating) * (0.08 + (5 - rating) * 0.02))
-    new_ef = max(1.3, new_ef)
+    new_ef = old_ef + params.ef_delta(rating)
+    new_ef = max(params.min_easiness, new_ef)
 
     return SM2Result(
         easiness=round(new_ef, 6),
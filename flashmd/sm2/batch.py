@@ -0,0 +1,148 @@
+"""
+SM-2 over whole arrays of cards in one call.
+
+calculate_batch takes parallel sequences of easiness, interval, repetitions
+and rating and returns the updated values, element for element identical to
+calling algorithm.calculate on each card. NumPy is used when it is installed
+(pip install flashmd[fast]); without it the same arithmetic runs as a plain
+loop over array.array buffers, which saves the per-card objects but not the
+interpreter overhead.
+"""
+from array import array
+from collections.abc import Sequence
+from dataclasses import dataclass
+from functools import lru_cache
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from flashmd.sm2.algorithm import DEFAULT_PARAMS, SM2Params
+
+USING_NUMPY = np is not None
+
+
+@lru_cache(maxsize=256)
+def _ef_delta(params: SM2Params) -> tuple[float, ...]:
+    """
+    Easiness change per rating, from the same expression as calculate() so
+    the sums below round identically; index 0 is unused.
+    """
+    return (0.0, *(params.ef_delta(r) for r in range(1, 6)))
+
+
+@dataclass(slots=True)
+class SM2Batch:
+    """
+    Updated values, one element per input card: numpy arrays (float64,
+    int64, int64) with NumPy, array.array('d'/'q') otherwise.
+    """
+    easiness: Sequence[float]
+    interval: Sequence[int]
+    repetitions: Sequence[int]
+
+    def __len__(self) -> int:
+        return len(self.interval)
+
+
+def calculate_batch(
+    easiness: Sequence[float],
+    interval: Sequence[int],
+    repetitions: Sequence[int],
+    rating: Sequence[int],
+    use_numpy: bool | None = None,
+    params: SM2Params = DEFAULT_PARAMS,
+) -> SM2Batch:
+    """
+    Vectorised calculate(). All inputs must have the same length; every
+    rating must be 1–5. use_numpy=None picks NumPy when it is installed.
+    """
+    n = len(rating)
+    if not len(easiness) == len(interval) == len(repetitions) == n:
+        raise ValueError("easiness, interval, repetitions and rating differ in length")
+    if use_numpy is None:
+        use_numpy = USING_NUMPY
+    if use_numpy:
+        if np is None:
+            raise RuntimeError("NumPy is not installed")
+        return _calculate_numpy(easiness, interval, repetitions, rating, params)
+    return _calculate_array(easiness, interval, repetitions, rating, params)
+
+
+def _calculate_numpy(easiness, interval, repetitions, rating, params) -> SM2Batch:
+    ef = np.asarray(easiness, dtype=np.float64)
+    prev = np.asarray(interval, dtype=np.int64)
+    reps = np.asarray(repetitions, dtype=np.int64)
+    q = np.asarray(rating, dtype=np.int64)
+    if q.size and (q.min() < 1 or q.max() > 5):
+        bad = q[(q < 1) | (q > 5)][0]
+        raise ValueError(f"Rating must be 1–5, got {bad}")
+
+    # Masked arithmetic in place of nested np.where, which is several times slower
+    passed = q >= 3
+    grown = passed & (reps >= 2)
+    # rint rounds half to even, as round() does; interval uses the old EF
+    if params.interval_modifier == 1.0:
+        new_interval = np.rint(prev * ef).astype(np.int64)
+    else:
+        new_interval = np.rint(prev * ef * params.interval_modifier).astype(np.int64)
+        np.maximum(new_interval, 1, out=new_interval)
+    # Failed cards get 1 day, first and second successes their fixed intervals
+    new_interval -= 1
+    new_interval *= grown
+    new_interval += 1
+    if params.first_interval != 1:
+        new_interval += (params.first_interval - 1) * (passed & (reps == 0))
+    new_interval += (params.second_interval - 1) * (passed & (reps == 1))
+
+    new_reps = reps + 1
+    new_reps *= passed
+
+    new_ef = np.array(_ef_delta(params))[q]
+    new_ef += ef
+    np.maximum(new_ef, params.min_easiness, out=new_ef)
+    return SM2Batch(_round6(new_ef), new_interval, new_reps)
+
+
+def _round6(x):
+    """round(x, 6) for every element, bit for bit."""
+    scaled = x * 1e6
+    out = np.rint(scaled)
+    # round() rounds the exact decimal value; the product above is itself
+    # rounded, so where it lands next to a half the two can disagree
+    scaled -= out
+    np.abs(scaled, out=scaled)
+    near_half = scaled > 0.5 - 1e-6
+    out /= 1e6
+    if near_half.any():
+        for i in np.flatnonzero(near_half):
+            out[i] = round(float(x[i]), 6)
+    return out
+
+
+def _calculate_array(easiness, interval, repetitions, rating, params) -> SM2Batch:
+    new_ef = array("d")
+    new_interval = array("q")
+    new_reps = array("q")
+    delta = _ef_delta(params)
+    min_ef, modifier = params.min_easiness, params.interval_modifier
+    first, second = params.first_interval, params.second_interval
+    for ef, prev, reps, q in zip(easiness, interval, repetitions, rating):
+        if not 1 <= q <= 5:
+            raise ValueError(f"Rating must be 1–5, got {q}")
+        if q < 3:
+            new_interval.append(1)
+            new_reps.append(0)
+        else:
+            if reps == 0:
+                new_interval.append(first)
+            elif reps == 1:
+                new_interval.append(second)
+            elif modifier == 1.0:
+                new_interval.append(round(prev * ef))
+            else:
+                new_interval.append(max(1, round(prev * ef * modifier)))
+            new_reps.append(reps + 1)
+        new_ef.append(round(max(min_ef, ef + delta[q]), 6))
+    return SM2Batch(new_ef, new_interval, new_reps)
@@ -0,0 +1,252 @@
+"""
+Monte Carlo forecast of the daily review load.
+
+simulate() plays the scheduler forward one day at a time. Each day the cards
+that fall due are reviewed: every review draws a rating from an assumed
+distribution, and SM-2 runs on everything reviewed that day in one
+calculate_batch call. A card rated below 3 is shown again in the same
+session, as the study screen does, so one card can count several reviews in
+a day. Running the whole year `trials` times gives a spread as well as a
+mean.
+
+With NumPy all trials of a chunk of cards advance together; without it each
+trial walks per-day buckets of card indices, which is fine for a deck but
+slow for a large collection.
+"""
+import random
+from array import array
+from bisect import bisect_right
+from collections.abc import Mapping, Sequence
+from dataclasses import dataclass
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from flashmd.sm2.algorithm import DEFAULT_PARAMS, SM2Params
+from flashmd.sm2.batch import USING_NUMPY, calculate_batch
+
+# Share of reviews given each rating; new cards (no successful review yet)
+# are failed more often
+DEFAULT_RATINGS = {1: 0.05, 2: 0.05, 3: 0.30, 4: 0.40, 5: 0.20}
+DEFAULT_NEW_RATINGS = {1: 0.15, 2: 0.10, 3: 0.35, 4: 0.30, 5: 0.10}
+# Times a card is re-shown in one day before the simulation leaves it for tomorrow
+MAX_RELEARN = 10
+# Card-trials simulated at once by the NumPy path; bounds memory
+_CHUNK = 2_000_000
+
+
+@dataclass(slots=True)
+class Forecast:
+    """
+    Reviews per day for `len(mean)` days from start_day (a day number).
+    low and high are the 10th and 90th percentile over the trials.
+    """
+    start_day: int
+    trials: int
+    mean: list[float]
+    low: list[int]
+    high: list[int]
+
+    def __len__(self) -> int:
+        return len(self.mean)
+
+    def total(self, days: int | None = None) -> float:
+        """Expected reviews over the first `days` days (all by default)."""
+        return sum(self.mean[:days])
+
+    def peak(self) -> tuple[int, float]:
+        """(day number, expected reviews) of the busiest day."""
+        if not self.mean:
+            return self.start_day, 0.0
+        i = max(range(len(self.mean)), key=self.mean.__getitem__)
+        return self.start_day + i, self.mean[i]
+
+
+def simulate(
+    easiness: Sequence[float],
+    interval: Sequence[int],
+    repetitions: Sequence[int],
+    due_day: Sequence[int],
+    start_day: int,
+    days: int = 365,
+    ratings: Mapping[int, float] | None = None,
+    new_ratings: Mapping[int, float] | None = None,
+    trials: int = 20,
+    seed: int | None = None,
+    use_numpy: bool | None = None,
+    params: SM2Params = DEFAULT_PARAMS,
+) -> Forecast:
+    """
+    Forecast reviews per day for `days` days from start_day, for cards given
+    as parallel sequences of their card_progress columns (see
+    progress_repo.get_schedule). Overdue cards are reviewed on start_day.
+
+    ratings maps 1–5 to relative weights; new_ratings is used instead for
+    cards with repetitions == 0 and defaults to DEFAULT_NEW_RATINGS only when
+    ratings is also left at its default. `seed` makes a run repeatable for
+    one backend; use_numpy=None picks NumPy when it is installed. params
+    are the deck's SM-2 constants (params_repo.get_params).
+    """
+    n = len(due_day)
+    if not len(easiness) == len(interval) == len(repetitions) == n:
+        raise ValueError("easiness, interval, repetitions and due_day differ in length")
+    if days < 0 or trials < 1:
+        raise ValueError("days must be >= 0 and trials >= 1")
+    if new_ratings is None:
+        new_ratings = DEFAULT_NEW_RATINGS if ratings is None else ratings
+    cum = _cumulative(ratings if ratings is not None else DEFAULT_RATINGS)
+    new_cum = _cumulative(new_ratings)
+    if use_numpy is None:
+        use_numpy = USING_NUMPY
+    if use_numpy and np is None:
+        raise RuntimeError("NumPy is not installed")
+
+    sim = _simulate_numpy if use_numpy else _simulate_python
+    counts = sim(easiness, interval, repetitions, due_day, start_day, days,
+                 cum, new_cum, trials, seed, params)
+    return _summarise(counts, start_day, trials, days)
+
+
+def _cumulative(weights: Mapping[int, float]) -> list[float]:
+    if set(weights) - {1, 2, 3, 4, 5}:
+        raise ValueError(f"Ratings must be 1–5, got {sorted(weights)}")
+    w = [weights.get(r, 0.0) for r in range(1, 6)]
+    total = sum(w)
+    if min(w) < 0 or total <= 0:
+        raise ValueError("Rating weights must be non-negative and not all zero")
+    cum, acc = [], 0.0
+    for x in w:
+        acc += x / total
+        cum.append(acc)
+    cum[-1] = 1.0
+    return cum
+
+
+def _simulate_python(easiness, interval, repetitions, due_day, start, days,
+                     cum, new_cum, trials, seed, params) -> list[list[int]]:
+    rng = random.Random(seed)
+    counts = [[0] * days for _ in range(trials)]
+    for row in counts:
+        ef = array("d", easiness)
+        iv = array("q", interval)
+        reps = array("q", repetitions)
+        buckets: list[list[int]] = [[] for _ in range(days)]
+        for card, due in enumerate(due_day):
+            d = max(due - start, 0)
+            if d < days:
+                buckets[d].append(card)
+
+        for d in range(days):
+            pending = buckets[d]
+            for _ in range(MAX_RELEARN):
+                if not pending:
+                    break
+                q = [bisect_right(new_cum if reps[c] == 0 else cum, rng.random()) + 1
+                     for c in pending]
+                out = calculate_batch([ef[c] for c in pending], [iv[c] for c in pending],
+                                      [reps[c] for c in pending], q, use_numpy=False,
+                                      params=params)
+                for c, e, i, r in zip(pending, out.easiness, out.interval, out.repetitions):
+                    ef[c], iv[c], reps[c] = e, i, r
+                row[d] += len(pending)
+                pending = [c for c, r in zip(pending, q) if r < 3]
+            for c in buckets[d]:
+                # Never the same day again, even from a corrupt interval of 0
+                nd = d + max(iv[c], 1)
+                if nd < days:
+                    buckets[nd].append(c)
+            buckets[d] = []
+    return counts
+
+
+def _simulate_numpy(easiness, interval, repetitions, due_day, start, days,
+                    cum, new_cum, trials, seed, params):
+    rng = np.random.default_rng(seed)
+    ef0 = np.asarray(easiness, dtype=np.float64)
+    iv0 = np.asarray(interval, dtype=np.int64)
+    reps0 = np.asarray(repetitions, dtype=np.int64)
+    due0 = np.maximum(np.asarray(due_day, dtype=np.int64) - start, 0)
+    cum_a, new_cum_a = np.array(cum), np.array(new_cum)
+    n = len(due0)
+    counts = np.zeros((trials, days), dtype=np.int64)
+    if n == 0:
+        return counts
+
+    # Card-trials wait in per-day buckets, so each day touches only the cards
+    # due on it. A bucket holds rows of (trial, easiness, interval,
+    # repetitions); the ints are exact as float64 and one row moves as a unit.
+    # Every chunk starts from the same due days, so cards are sorted once.
+    order = np.argsort(due0, kind="stable")
+    order = order[:np.searchsorted(due0[order], days)]
+    start_due, start_state = due0[order], np.stack((ef0[order], iv0[order], reps0[order]), 1)
+    per_chunk = max(1, _CHUNK // n)
+    for first in range(0, trials, per_chunk):
+        t = min(per_chunk, trials - first)
+        buckets: list[list] = [[] for _ in range(days)]
+        state = np.empty((len(order), t, 4))
+        state[:, :, 0] = np.arange(t)
+        state[:, :, 1:] = start_state[:, None, :]
+        _append_runs(buckets, state.reshape(-1, 4), np.repeat(start_due, t))
+        for d in range(days):
+            if not buckets[d]:
+                continue
+            state = np.concatenate(buckets[d])
+            buckets[d] = []
+            trial = state[:, 0].astype(np.int64)
+            e, i, r = state[:, 1].copy(), state[:, 2].astype(np.int64), state[:, 3].astype(np.int64)
+            pending = np.arange(len(state))
+            for _ in range(MAX_RELEARN):
+                rp = r[pending]
+                u = rng.random(pending.size)
+                q = np.searchsorted(cum_a, u, side="right") + 1
+                new = rp == 0
+                if new.any():
+                    q[new] = np.searchsorted(new_cum_a, u[new], side="right") + 1
+                out = calculate_batch(e[pending], i[pending], rp, q,
+                                      use_numpy=True, params=params)
+                e[pending], i[pending], r[pending] = out.easiness, out.interval, out.repetitions
+                counts[first:first + t, d] += np.bincount(trial[pending], minlength=t)
+                pending = pending[q < 3]
+                if not pending.size:
+                    break
+            state[:, 1], state[:, 2], state[:, 3] = e, i, r
+            _bucket(buckets, state, d + np.maximum(i, 1))
+    return counts
+
+
+def _bucket(buckets: list[list], state, day) -> None:
+    """Append each row of state to the bucket of its day, dropping days past the end."""
+    rows = np.flatnonzero(day < len(buckets))
+    key = day[rows]
+    if len(buckets) <= np.iinfo(np.int16).max:
+        key = key.astype(np.int16)      # stable sorts of 16-bit keys are radix sorts
+    order = np.argsort(key, kind="stable")
+    _append_runs(buckets, state[rows[order]], key[order])
+
+
+def _append_runs(buckets: list[list], state, day) -> None:
+    """Append the rows of state, sorted by day, to their days' buckets."""
+    if not len(day):
+        return
+    starts = np.flatnonzero(np.diff(day)) + 1
+    bounds = [0, *starts.tolist(), len(day)]
+    for d, lo, hi in zip(day[np.r_[0, starts]].tolist(), bounds, bounds[1:]):
+        buckets[d].append(state[lo:hi])
+
+
+def _summarise(counts, start_day: int, trials: int, days: int) -> Forecast:
+    # Nearest-rank percentiles, the same for both backends
+    lo, hi = round(0.1 * (trials - 1)), round(0.9 * (trials - 1))
+    if np is not None and isinstance(counts, np.ndarray):
+        ordered = np.sort(counts, axis=0)
+        return Forecast(start_day, trials, counts.mean(axis=0).tolist(),
+                        ordered[lo].tolist(), ordered[hi].tolist())
+    columns = [sorted(col) for col in zip(*counts)] if days else []
+    return Forecast(
+        start_day, trials,
+        [sum(col) / trials for col in columns],
+        [col[lo] for col in columns],
+        [col[hi] for col in columns],
+    )
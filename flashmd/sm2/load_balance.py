@@ -0,0 +1,134 @@
+"""
+Spreading due dates so no day gets more than its share of reviews.
+
+SM-2 moves cards learned together in lockstep: a deck imported in one go is
+due tomorrow, then in 6 days, then 15, and every review day is a spike.
+spread_due_days() walks the overloaded days in order and moves cards off
+each one to the nearest days of their tolerance window that are under the
+target, a whole window group at a time: cards on the same day with the same
+window are placed together, and what no day has room for is spread so the
+window ends up level (water-filling). The tolerance is
+a fraction of the card's interval, so a card due in a year may move by weeks
+and one due in a week by a day; new cards, which have no interval yet, use
+new_window.
+"""
+import heapq
+from collections import defaultdict
+from collections.abc import Mapping, Sequence
+
+TOLERANCE = 0.1
+NEW_WINDOW = 7
+
+
+def spread_due_days(
+    card_ids: Sequence[int],
+    interval: Sequence[int],
+    due_day: Sequence[int],
+    load: Mapping[int, int],
+    first_day: int,
+    max_per_day: int,
+    tolerance: float = TOLERANCE,
+    new_window: int = NEW_WINDOW,
+) -> dict[int, int]:
+    """
+    New due days for cards that should move, as {card_id: due_day}.
+
+    card_ids, interval and due_day describe the cards that may move; load is
+    the number of cards due on each day in total, these included. Cards due
+    before first_day stay where they are and nothing moves before it. Days
+    that cannot get under max_per_day within their cards' windows are
+    levelled as far as the windows allow.
+    """
+    if not len(card_ids) == len(interval) == len(due_day):
+        raise ValueError("card_ids, interval and due_day differ in length")
+    if max_per_day < 0:
+        raise ValueError("max_per_day must be >= 0")
+
+    load = defaultdict(int, load)
+    current = list(due_day)
+    on_day: dict[int, list[int]] = defaultdict(list)
+    for i, d in enumerate(due_day):
+        if d >= first_day:
+            on_day[d].append(i)
+
+    days = list(on_day)
+    heapq.heapify(days)
+    queued = set(days)
+    while days:
+        d = heapq.heappop(days)
+        cards = on_day.pop(d)
+        if load[d] <= max_per_day:
+            continue
+
+        groups: dict[tuple[int, int], list[int]] = defaultdict(list)
+        for i in cards:
+            w = new_window if interval[i] == 0 else max(1, round(interval[i] * tolerance))
+            groups[max(first_day, due_day[i] - w), due_day[i] + w].append(i)
+        # Pour back narrowest windows first; they have the fewest days to go to
+        load[d] -= len(cards)
+        for lo, hi in sorted(groups, key=lambda g: g[1] - g[0]):
+            group = sorted(groups[lo, hi], key=card_ids.__getitem__)
+            window = _nearest_first(d, lo, hi)
+            # Nearest days up to the target first (d itself, so cards stay
+            # put where they can), then level whatever is left over
+            added, left = [], len(group)
+            for x in window:
+                n = min(left, max(0, max_per_day - load[x]))
+                added.append(n)
+                left -= n
+            if left:
+                extra = _water_fill([load[x] + n for x, n in zip(window, added)], left)
+                added = [a + b for a, b in zip(added, extra)]
+            at = 0
+            for x, n in zip(window, added):
+                load[x] += n
+                for i in group[at:at + n]:
+                    current[i] = x
+                    if x > d:
+                        on_day[x].append(i)
+                        if x not in queued:
+                            queued.add(x)
+                            heapq.heappush(days, x)
+                at += n
+
+    return {
+        card_ids[i]: d for i, d in enumerate(current) if d != due_day[i]
+    }
+
+
+def _water_fill(levels: list[int], k: int) -> list[int]:
+    """
+    Spread k units over the slots so the highest final level is as low as
+    possible, topping up the lowest slots first. Ties go to earlier slots.
+    """
+    if k <= 0 or not levels:
+        return [0] * len(levels)
+    # Raise the lowest slots together until the next one up is reached
+    # or the units run out; h is the level they all end at
+    ordered = sorted(levels)
+    total = 0
+    for j, x in enumerate(ordered):
+        total += x
+        if j + 1 == len(ordered) or ordered[j + 1] * (j + 1) - total > k:
+            h = (k + total) // (j + 1)
+            break
+    added = [h - x if x < h else 0 for x in levels]
+    left = k - sum(added)
+    for i, x in enumerate(levels):
+        if not left:
+            break
+        if x <= h:
+            added[i] += 1
+            left -= 1
+    return added
+
+
+def _nearest_first(d: int, lo: int, hi: int) -> list[int]:
+    """Days lo..hi ordered by distance from d, earlier first on ties."""
+    out = [d]
+    for step in range(1, max(d - lo, hi - d) + 1):
+        if d - step >= lo:
+            out.append(d - step)
+        if d + step <= hi:
+            out.append(d + step)
+    return out
@@ -0,0 +1,217 @@
+"""
+Scoring schedulers against recorded reviews, and picking the best.
+
+Every review after a card's first tests the interval the scheduler would
+have set at the review before it. The scheduler is taken to aim for
+TARGET_RETENTION on the due date, so a card seen again g days later under an
+interval of I days is predicted to be recalled with probability
+TARGET_RETENTION ** (g / I). evaluate() replays each card's actual ratings
+through a scheduler and returns the mean log loss of those predictions.
+Intervals that are too short (cards nearly always recalled, reviews wasted)
+score as badly as intervals that are too long. Same-day re-shows (g == 0)
+update the card's state but are not scored.
+
+Replays are vectorised across cards: the k-th review of every card goes
+through one calculate_batch call. optimize() scores many schedulers in a
+process pool that receives the history once per worker.
+"""
+import itertools
+import math
+import os
+import random
+from array import array
+from collections.abc import Iterable, Sequence
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, fields
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from flashmd.sm2.algorithm import SM2Params
+from flashmd.sm2.batch import USING_NUMPY
+from flashmd.sm2.scheduler import Scheduler, SM2Scheduler
+
+TARGET_RETENTION = 0.9
+# Range of each SM2Params field for random_params; ints are drawn as ints
+BOUNDS = {
+    "first_interval": (1, 3),
+    "second_interval": (2, 12),
+    "ef_base": (0.0, 0.2),
+    "ef_linear": (0.02, 0.14),
+    "ef_quadratic": (0.0, 0.04),
+    "min_easiness": (1.1, 1.8),
+    "interval_modifier": (0.5, 2.5),
+}
+# Predictions are clipped to this distance from 0 and 1 so one confident
+# miss does not make a loss infinite
+_EPS = 1e-6
+
+
+@dataclass(slots=True)
+class ReviewHistory:
+    """
+    Reviews of many cards in columns. days[k] and ratings[k] hold the k-th
+    review of every card with more than k of them; cards are ordered by
+    number of reviews, most first, so each step is a prefix of the one
+    before.
+    """
+    cards: int
+    days: list[Sequence[int]]
+    ratings: list[Sequence[int]]
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[tuple[int, int, int]]) -> "ReviewHistory":
+        """From (card_id, day, rating) rows grouped by card, in review order."""
+        per_card = [
+            [(day, rating) for _, day, rating in reviews]
+            for _, reviews in itertools.groupby(rows, key=lambda r: r[0])
+        ]
+        per_card.sort(key=len, reverse=True)
+        days, ratings = [], []
+        for k in range(len(per_card[0]) if per_card else 0):
+            step = [c[k] for c in itertools.takewhile(lambda c: len(c) > k, per_card)]
+            days.append(array("q", (d for d, _ in step)))
+            ratings.append(array("q", (r for _, r in step)))
+        return cls(len(per_card), days, ratings)
+
+    @property
+    def reviews(self) -> int:
+        return sum(len(d) for d in self.days)
+
+
+@dataclass(frozen=True, slots=True)
+class Score:
+    loss: float           # mean log loss per scored review; lower is better
+    scored: int           # reviews scored (all but each card's first and same-day repeats)
+    mean_interval: float  # mean interval the scheduler set before those reviews
+
+
+def evaluate(
+    scheduler: Scheduler,
+    history: ReviewHistory,
+    target: float = TARGET_RETENTION,
+    use_numpy: bool | None = None,
+) -> Score:
+    """Replay `history` through `scheduler`; see the module docstring."""
+    if use_numpy is None:
+        use_numpy = USING_NUMPY
+    if use_numpy and np is None:
+        raise RuntimeError("NumPy is not installed")
+    replay = _replay_numpy if use_numpy else _replay_python
+    loss, scored, interval_sum = replay(scheduler, history, math.log(target))
+    if not scored:
+        return Score(0.0, 0, 0.0)
+    return Score(loss / scored, scored, interval_sum / scored)
+
+
+def _replay_numpy(scheduler, history, log_target):
+    n0 = history.cards
+    ef, iv, reps = np.full(n0, 2.5), np.zeros(n0, np.int64), np.zeros(n0, np.int64)
+    loss, scored, interval_sum = 0.0, 0, 0
+    prev = None
+    for day, rating in zip(history.days, history.ratings):
+        day, rating = np.asarray(day), np.asarray(rating)
+        n = len(day)
+        if prev is not None:
+            gap = day - prev[:n]
+            tested = gap > 0
+            if tested.any():
+                i = np.maximum(iv[:n][tested], 1)
+                p = np.exp(log_target * gap[tested] / i)
+                np.clip(p, _EPS, 1 - _EPS, out=p)
+                recalled = rating[tested] >= 3
+                loss -= float(np.log(np.where(recalled, p, 1 - p)).sum())
+                scored += int(tested.sum())
+                interval_sum += int(i.sum())
+        out = scheduler.calculate_batch(ef[:n], iv[:n], reps[:n], rating)
+        ef[:n], iv[:n], reps[:n] = out.easiness, out.interval, out.repetitions
+        prev = day
+    return loss, scored, interval_sum
+
+
+def _replay_python(scheduler, history, log_target):
+    n0 = history.cards
+    ef, iv, reps = [2.5] * n0, [0] * n0, [0] * n0
+    loss, scored, interval_sum = 0.0, 0, 0
+    prev = None
+    for day, rating in zip(history.days, history.ratings):
+        n = len(day)
+        if prev is not None:
+            for j in range(n):
+                gap = day[j] - prev[j]
+                if gap > 0:
+                    i = max(iv[j], 1)
+                    p = min(max(math.exp(log_target * gap / i), _EPS), 1 - _EPS)
+                    loss -= math.log(p if rating[j] >= 3 else 1 - p)
+                    scored += 1
+                    interval_sum += i
+        out = scheduler.calculate_batch(ef[:n], iv[:n], reps[:n], rating)
+        ef[:n], iv[:n], reps[:n] = list(out.easiness), list(out.interval), list(out.repetitions)
+        prev = day
+    return loss, scored, interval_sum
+
+
+def random_params(n: int, seed: int | None = None) -> list[SM2Params]:
+    """n parameter sets drawn uniformly from BOUNDS."""
+    rng = random.Random(seed)
+    out = []
+    for _ in range(n):
+        values = {}
+        for f in fields(SM2Params):
+            lo, hi = BOUNDS[f.name]
+            values[f.name] = (
+                rng.randint(lo, hi) if isinstance(lo, int) else round(rng.uniform(lo, hi), 4)
+            )
+        out.append(SM2Params(**values))
+    return out
+
+
+def optimize(
+    history: ReviewHistory,
+    schedulers: Sequence[Scheduler],
+    workers: int | None = None,
+    target: float = TARGET_RETENTION,
+) -> list[tuple[Score, Scheduler]]:
+    """
+    Score every scheduler against `history`, best (lowest loss) first; ties
+    keep the order given, so list the incumbent first. workers defaults to
+    the CPU count; with one worker everything runs in this process.
+    """
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(schedulers) < 2:
+        scores = [evaluate(s, history, target) for s in schedulers]
+    else:
+        with ProcessPoolExecutor(
+            max_workers=workers, initializer=_init_worker, initargs=(history, target)
+        ) as pool:
+            scores = list(pool.map(
+                _evaluate_in_worker, schedulers,
+                chunksize=max(1, len(schedulers) // (4 * workers)),
+            ))
+    ranked = sorted(range(len(schedulers)), key=lambda i: scores[i].loss)
+    return [(scores[i], schedulers[i]) for i in ranked]
+
+
+def sm2_candidates(
+    n: int, seed: int | None = None, include: Iterable[SM2Params] = ()
+) -> list[SM2Scheduler]:
+    """SM2Schedulers for `include` (kept first, in order) and n random parameter sets."""
+    params = dict.fromkeys([*include, *random_params(n, seed)])
+    return [SM2Scheduler(p) for p in params]
+
+
+# ── Worker processes ──────────────────────────────────────────────────────────
+
+_worker_history: ReviewHistory | None = None
+_worker_target = TARGET_RETENTION
+
+
+def _init_worker(history: ReviewHistory, target: float) -> None:
+    global _worker_history, _worker_target
+    _worker_history, _worker_target = history, target
+
+
+def _evaluate_in_worker(scheduler: Scheduler) -> Score:
+    return evaluate(scheduler, _worker_history, _worker_target)
@@ -0,0 +1,39 @@
+"""
+The interface the optimizer replays review history against.
+
+A scheduler turns a card's (easiness, interval, repetitions) and a rating
+into its next state, for one card and for whole arrays at once. SM2Scheduler
+is SM-2 with a given set of constants; any other class with the same two
+methods can be compared against it with optimizer.evaluate. Schedulers are
+sent to worker processes, so they must pickle: plain module-level classes
+and dataclasses do.
+"""
+from collections.abc import Sequence
+from dataclasses import dataclass
+from typing import Protocol
+
+from flashmd.sm2.algorithm import DEFAULT_PARAMS, SM2Params, SM2Progress, SM2Result, calculate
+from flashmd.sm2.batch import SM2Batch, calculate_batch
+
+
+class Scheduler(Protocol):
+    def calculate(self, progress: SM2Progress, rating: int) -> SM2Result: ...
+
+    def calculate_batch(
+        self,
+        easiness: Sequence[float],
+        interval: Sequence[int],
+        repetitions: Sequence[int],
+        rating: Sequence[int],
+    ) -> SM2Batch: ...
+
+
+@dataclass(frozen=True, slots=True)
+class SM2Scheduler:
+    params: SM2Params = DEFAULT_PARAMS
+
+    def calculate(self, progress: SM2Progress, rating: int) -> SM2Result:
+        return calculate(progress, rating, self.params)
+
+    def calculate_batch(self, easiness, interval, repetitions, rating) -> SM2Batch:
+        return calculate_batch(easiness, interval, repetitions, rating, params=self.params)
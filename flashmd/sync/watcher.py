@@ -0,0 +1,295 @@
+"""
+Stdlib polling watcher that keeps imported decks in sync with a folder.
+
+No native file-system notifications are used. Each tick the watcher:
+- works through paths queued by directory rescans, then stats known
+  directories and files round-robin, a fixed budget of paths in all. A
+  directory whose mtime changed has its listing rescanned (new, deleted and
+  atomically-saved files show up there) and its entries queued; a file whose
+  size or mtime changed becomes pending;
+- re-stats files with pending changes, in turn, and re-imports those whose
+  size and mtime have been stable for `debounce` seconds. These visits come
+  out of the same budget; up to half of it is kept for them while any are
+  pending.
+
+Files found by the first full scan are imported without waiting for the
+debounce: unchanged ones are skipped by import_file's fingerprint check
+after a single stat, and only files edited while the app was closed are
+parsed.
+
+The per-tick cost is bounded by the budget, not by the number of files or
+directories, so CPU stays flat as the folder grows; only the worst-case
+latency for a change grows ((directories + files) / budget ticks). A
+directory rescan counts as one path although it lists every entry of that
+directory; entries come with their type, so only the listing is read.
+Symlinked directories are not followed, so a link back up the tree can't
+make the watcher walk in circles.
+"""
+import fnmatch
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+from collections.abc import Callable
+from pathlib import Path
+
+from flashmd.db.database import ConnectionManager
+from flashmd.db.import_service import import_file
+
+log = logging.getLogger(__name__)
+
+_Signature = tuple[int, int]  # (size, mtime_ns)
+
+
+class _Ring:
+    """
+    Paths visited round-robin, a budget at a time. Removal swaps the last
+    path into the hole, so forgetting a folder of N files is O(N); the moved
+    path may wait an extra round for its turn.
+    """
+
+    def __init__(self) -> None:
+        self._paths: list[str] = []
+        self._index: dict[str, int] = {}
+        self._cursor = 0
+
+    def __len__(self) -> int:
+        return len(self._paths)
+
+    def add(self, path: str) -> None:
+        if path not in self._index:
+            self._index[path] = len(self._paths)
+            self._paths.append(path)
+
+    def discard(self, path: str) -> None:
+        idx = self._index.pop(path, None)
+        if idx is None:
+            return
+        last = self._paths.pop()
+        if idx < len(self._paths):
+            self._paths[idx] = last
+            self._index[last] = idx
+
+    def take(self, n: int) -> list[str]:
+        """The next `n` paths (fewer if there aren't that many), wrapping around."""
+        taken = []
+        for _ in range(min(n, len(self._paths))):
+            if self._cursor >= len(self._paths):
+                self._cursor = 0
+            taken.append(self._paths[self._cursor])
+            self._cursor += 1
+        return taken
+
+
+class FolderWatcher:
+    def __init__(
+        self,
+        directory: str | Path,
+        db: ConnectionManager,
+        on_change: Callable[[list[int]], None],
+        pattern: str = "*.md",
+        interval: float = 1.0,
+        debounce: float = 1.5,
+        budget: int = 256,
+    ):
+        """
+        on_change is called on the watcher thread with the IDs of decks that
+        were re-imported in a tick; GUI callers must hand them to the Tk
+        thread themselves (e.g. through a queue polled with after()).
+        """
+        self.directory = Path(directory).resolve()
+        self._db = db
+        self._on_change = on_change
+        self._pattern = pattern
+        self._interval = interval
+        self._debounce = debounce
+        self._budget = budget
+
+        self._dirs: dict[str, int] = {}             # dir path → mtime_ns
+        self._dir_files: dict[str, set[str]] = {}   # dir path → watched files
+        self._files: dict[str, _Signature] = {}     # file path → last signature
+        self._order = _Ring()                       # _dirs and _files, round-robin
+        self._queue: deque[tuple[str, bool]] = deque()  # (path, is_dir) to visit
+        self._queued: set[str] = set()
+        self._pending: dict[str, tuple[_Signature, float]] = {}  # path → (sig, since)
+        self._settling: deque[str] = deque()        # _pending, in turn
+        self._seeded = False                        # first full scan done
+
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    # ── Lifecycle ─────────────────────────────────────────────────────────────
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="flashmd-watcher", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self, timeout: float | None = 5.0) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self) -> None:
+        try:
+            while not self._stop.is_set():
+                started = time.monotonic()
+                deck_ids = self.poll(started)
+                if deck_ids:
+                    self._on_change(deck_ids)
+                self._stop.wait(max(0.0, self._interval - (time.monotonic() - started)))
+        except Exception:
+            log.exception("Folder watcher stopped")
+
+    # ── Polling ───────────────────────────────────────────────────────────────
+
+    def poll(self, now: float | None = None) -> list[int]:
+        """
+        Run one tick and return the IDs of decks that were re-imported.
+        Safe to call directly (e.g. from tests) when the thread is not running.
+        """
+        now = time.monotonic() if now is None else now
+        if not self._dirs and not self._queue:
+            # First tick: every file is a candidate. Unchanged files are
+            # skipped by import_file's fingerprint check.
+            self._enqueue(str(self.directory), is_dir=True)
+
+        reserved = min(len(self._settling), max(1, self._budget // 2))
+        budget = self._budget - reserved
+        budget -= self._drain(budget, now)
+        for path in self._order.take(budget):
+            if path in self._dirs:
+                self._check_dir(path, now)
+            else:
+                self._check(path, now)
+            budget -= 1
+        # Whatever those rescans found gets the rest of the discovery budget
+        budget -= self._drain(budget, now)
+        if not self._queue and self._dirs:
+            self._seeded = True
+
+        return self._import_settled(now, budget + reserved)
+
+    def _enqueue(self, path: str, is_dir: bool) -> None:
+        if path not in self._queued:
+            self._queued.add(path)
+            self._queue.append((path, is_dir))
+
+    def _drain(self, budget: int, now: float) -> int:
+        """Visit up to `budget` queued paths, including any they queue; return the count."""
+        visited = 0
+        while self._queue and visited < budget:
+            path, is_dir = self._queue.popleft()
+            self._queued.discard(path)
+            if is_dir:
+                self._check_dir(path, now)
+            else:
+                self._check(path, now)
+            visited += 1
+        return visited
+
+    def _check_dir(self, directory: str, now: float) -> None:
+        try:
+            mtime = os.stat(directory).st_mtime_ns
+        except OSError:
+            self._forget_dir(directory)
+            return
+        if mtime != self._dirs.get(directory):
+            self._scan_dir(directory, now)
+
+    def _scan_dir(self, directory: str, now: float) -> None:
+        try:
+            mtime = os.stat(directory).st_mtime_ns
+            entries = list(os.scandir(directory))
+        except OSError:
+            self._forget_dir(directory)
+            return
+        if directory not in self._dirs:
+            self._order.add(directory)
+        self._dirs[directory] = mtime
+
+        known = self._dir_files.setdefault(directory, set())
+        present = set()
+        for entry in entries:
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    if entry.path not in self._dirs:
+                        self._enqueue(entry.path, is_dir=True)
+                elif entry.is_file() and fnmatch.fnmatch(entry.name, self._pattern):
+                    present.add(entry.path)
+                    if entry.path not in known:
+                        known.add(entry.path)
+                        self._order.add(entry.path)
+                    self._enqueue(entry.path, is_dir=False)
+            except OSError:
+                continue
+
+        for path in known - present:
+            self._forget_file(path)
+
+    def _check(self, path: str, now: float) -> None:
+        try:
+            st = os.stat(path)
+        except OSError:
+            self._forget_file(path)
+            return
+        sig = (st.st_size, st.st_mtime_ns)
+        if sig != self._files.get(path):
+            # The first scan's files count as settled; see the module docstring
+            since = now if self._seeded or path in self._files else now - self._debounce
+            self._files[path] = sig
+            if path not in self._pending:
+                self._settling.append(path)
+            self._pending[path] = (sig, since)
+
+    def _import_settled(self, now: float, budget: int) -> list[int]:
+        """Re-stat up to `budget` pending files and import the settled ones."""
+        deck_ids: list[int] = []
+        for _ in range(min(budget, len(self._settling))):
+            path = self._settling.popleft()
+            if path not in self._pending:
+                continue                # forgotten since it was queued
+            self._check(path, now)
+            if path not in self._pending:
+                continue
+            sig, since = self._pending[path]
+            if now - since < self._debounce:
+                self._settling.append(path)
+                continue
+            try:
+                # One short write transaction per file, so the lock is shared
+                with self._db.writer() as conn:
+                    deck_id, skipped = import_file(conn, path, commit=False)
+            except sqlite3.OperationalError as e:
+                # e.g. locked by another process: keep it pending, retry next tick
+                log.warning("Deferring re-import of %s: %s", path, e)
+                self._settling.append(path)
+                continue
+            except (OSError, ValueError) as e:
+                # Includes UnicodeDecodeError and files with no cards yet
+                log.info("Skipping %s: %s", path, e)
+            else:
+                if not skipped:
+                    deck_ids.append(deck_id)
+            del self._pending[path]
+        return deck_ids
+
+    def _forget_file(self, path: str) -> None:
+        self._files.pop(path, None)
+        self._pending.pop(path, None)
+        self._dir_files.get(os.path.dirname(path), set()).discard(path)
+        self._order.discard(path)
+
+    def _forget_dir(self, directory: str) -> None:
+        # Subdirectories fail their own stat when their turn comes
+        self._dirs.pop(directory, None)
+        self._order.discard(directory)
+        for path in list(self._dir_files.pop(directory, ())):
+            self._forget_file(path)
@@ -0,0 +1,256 @@
+import sqlite3
+import threading
+
+import pytest
+
+from flashmd.db import database, deck_repo, card_repo, progress_repo, review_repo
+from flashmd.db.database import (
+    SCHEMA_VERSION, ConnectionManager, get_schema_version, init_db,
+)
+
+
+LEGACY_SCHEMA = """
+    CREATE TABLE deck (
+        id TEXT PRIMARY KEY, title TEXT NOT NULL, source_file TEXT NOT NULL,
+        created_at TEXT NOT NULL, last_studied TEXT
+    );
+    CREATE TABLE category (
+        id TEXT PRIMARY KEY,
+        deck_id TEXT NOT NULL REFERENCES deck(id) ON DELETE CASCADE,
+        name TEXT NOT NULL, order_index INTEGER NOT NULL DEFAULT 0
+    );
+    CREATE TABLE card (
+        id TEXT PRIMARY KEY,
+        deck_id TEXT NOT NULL REFERENCES deck(id) ON DELETE CASCADE,
+        category_id TEXT REFERENCES category(id) ON DELETE SET NULL,
+        front TEXT NOT NULL, back TEXT NOT NULL, created_at TEXT NOT NULL
+    );
+    CREATE TABLE card_progress (
+        id TEXT PRIMARY KEY,
+        card_id TEXT NOT NULL UNIQUE REFERENCES card(id) ON DELETE CASCADE,
+        easiness REAL NOT NULL DEFAULT 2.5, interval INTEGER NOT NULL DEFAULT 0,
+        repetitions INTEGER NOT NULL DEFAULT 0, due_date TEXT NOT NULL,
+        last_reviewed TEXT, last_rating INTEGER
+    );
+    INSERT INTO deck VALUES ('d1', 'Legacy', 'legacy.md', '2025-01-01T00:00:00+00:00', NULL);
+    INSERT INTO deck VALUES ('d2', 'Other', 'other.md', '2025-01-01T00:00:00+00:00', NULL);
+    INSERT INTO category VALUES ('k1', 'd1', 'Basics', 0);
+    INSERT INTO card VALUES ('c1', 'd1', 'k1', 'FOO', 'Foo.', '2025-01-01T00:00:00+00:00');
+    INSERT INTO card VALUES ('c2', 'd2', NULL, 'BAR', 'Bar.', '2025-01-01T00:00:00+00:00');
+    INSERT INTO card_progress VALUES ('p1', 'c1', 2.6, 6, 2, '2025-01-07', NULL, 5);
+"""
+
+
+def _raw_conn():
+    c = sqlite3.connect(":memory:")
+    c.row_factory = sqlite3.Row
+    c.execute("PRAGMA foreign_keys = ON")
+    return c
+
+
+def _indexes(conn) -> set[str]:
+    return {
+        r["name"] for r in conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'index' AND sql IS NOT NULL"
+        )
+    }
+
+
+def test_fresh_db_is_at_latest_version(conn):
+    assert get_schema_version(conn) == SCHEMA_VERSION
+    assert {"idx_deck_title", "idx_card_deck_front", "idx_progress_due"} <= _indexes(conn)
+
+
+def test_init_db_is_idempotent(conn):
+    init_db(conn)
+    assert get_schema_version(conn) == SCHEMA_VERSION
+
+
+def test_legacy_db_is_upgraded_in_place():
+    c = _raw_conn()
+    c.executescript(LEGACY_SCHEMA)
+    assert get_schema_version(c) == 0
+
+    init_db(c)
+
+    assert get_schema_version(c) == SCHEMA_VERSION
+    deck = deck_repo.get_by_title(c, "Legacy")
+    assert deck["uuid"] == "d1"
+    card = card_repo.get_card_by_front(c, deck["id"], "FOO")
+    assert card["back"] == "Foo." and card["uuid"] == "c1"
+    assert card_repo.get_categories(c, deck["id"])[0]["id"] == card["category_id"]
+    assert progress_repo.get_progress(c, card["id"])["easiness"] == 2.6
+    assert progress_repo.get_stats(c, deck["id"]) == {
+        "total": 1, "due": 1, "rating_counts": {5: 1},
+    }
+    assert "idx_card_deck_front" in _indexes(c)
+
+
+def test_migration_rekeys_to_integers():
+    c = _raw_conn()
+    c.executescript(LEGACY_SCHEMA)
+    init_db(c)
+
+    for table in ("deck", "category", "card"):
+        assert all(isinstance(r["id"], int) for r in c.execute(f"SELECT id FROM {table}"))
+    assert c.execute("PRAGMA foreign_keys").fetchone()[0] == 1
+    assert c.execute("PRAGMA foreign_key_check").fetchall() == []
+
+    # Cascades follow the new integer keys
+    deck_repo.delete(c, deck_repo.get_by_title(c, "Legacy")["id"])
+    assert c.execute("SELECT COUNT(*) FROM card_progress").fetchone()[0] == 0
+    assert c.execute("SELECT front FROM card").fetchall()[0][0] == "BAR"
+
+
+def test_migration_converts_dates_to_integers():
+    c = _raw_conn()
+    c.executescript(LEGACY_SCHEMA)
+    database.migrate(c, target=6)
+    deck_id = deck_repo.get_by_title(c, "Legacy")["id"]
+    card_id = card_repo.get_card_by_front(c, deck_id, "FOO")["id"]
+    c.execute(
+        "INSERT INTO review_log (card_id, deck_id, reviewed_at, day, rating, "
+        "prev_interval, interval, easiness) "
+        "VALUES (?, ?, '2025-01-01T12:00:00+00:00', '2025-01-01', 5, 1, 6, 2.6)",
+        (card_id, deck_id),
+    )
+    c.commit()
+
+    init_db(c)
+
+    day = 20089                     # 2025-01-01 as days since 1970-01-01
+    deck = deck_repo.get_by_id(c, deck_id)
+    assert deck["created_at"] == 1735689600 and deck["last_studied"] is None
+    assert progress_repo.get_progress(c, card_id)["due_day"] == day + 6
+    counter = c.execute(
+        "SELECT due_day, n FROM deck_due_counter WHERE deck_id = ?", (deck_id,)
+    ).fetchall()
+    assert [tuple(r) for r in counter] == [(day + 6, 1)]
+    [log] = c.execute("SELECT reviewed_at, day FROM review_log").fetchall()
+    assert tuple(log) == (1735732800, day)
+    assert [r["day"] for r in review_repo.get_daily(c, deck_id, since=day)] == [day]
+
+    # The recreated triggers keep working on the converted columns
+    progress_repo.apply_rating(c, card_id, 4, reviewed_at=1735732800 + 86400)
+    assert [r["reviews"] for r in review_repo.get_daily(c, deck_id)] == [1, 1]
+    assert progress_repo.get_stats(c, deck_id)["rating_counts"] == {4: 1}
+    with pytest.raises(sqlite3.IntegrityError):
+        c.execute("UPDATE review_log SET rating = 1")
+
+
+def test_rich_back_migration_clears_fingerprints():
+    # Decks imported before back_rich existed must be re-read to fill it in
+    c = _raw_conn()
+    c.executescript(LEGACY_SCHEMA)
+    database.migrate(c, target=10)
+    c.execute(
+        "UPDATE deck SET source_path = '/decks/legacy.md', source_size = 10, "
+        "source_mtime_ns = 20, source_hash = 'abc'"
+    )
+    c.commit()
+
+    init_db(c)
+
+    deck = deck_repo.get_by_title(c, "Legacy")
+    assert deck["source_path"] == "/decks/legacy.md"
+    assert (deck["source_size"], deck["source_mtime_ns"], deck["source_hash"]) == (None,) * 3
+
+def test_migrations_avoid_drop_column():
+    # DROP COLUMN needs SQLite 3.35; tables are rebuilt instead
+    c = _raw_conn()
+    statements = []
+    c.set_trace_callback(statements.append)
+    c.executescript(LEGACY_SCHEMA)
+    init_db(c)
+    assert not [s for s in statements if "DROP COLUMN" in s.upper()]
+    assert get_schema_version(c) == SCHEMA_VERSION
+
+def test_newer_schema_is_rejected():
+    c = _raw_conn()
+    c.execute(f"PRAGMA user_version = {SCHEMA_VERSION + 1}")
+    with pytest.raises(RuntimeError):
+        init_db(c)
+
+
+def test_failed_migration_rolls_back(monkeypatch):
+    c = _raw_conn()
+
+    def broken(conn):
+        conn.execute("CREATE TABLE half_done (x)")
+        raise sqlite3.OperationalError("boom")
+
+    monkeypatch.setattr(database, "MIGRATIONS", [database.MIGRATIONS[0], broken])
+    with pytest.raises(sqlite3.OperationalError):
+        database.migrate(c, target=2)
+
+    assert get_schema_version(c) == 1
+    tables = {r[0] for r in c.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    assert "half_done" not in tables
+
+
+# ── Connection manager ────────────────────────────────────────────────────────
+
+@pytest.fixture
+def manager(tmp_path):
+    m = ConnectionManager(tmp_path / "flashmd.db", readers=2)
+    yield m
+    m.close()
+
+
+def test_manager_enables_wal_and_tuning(manager):
+    with manager.writer() as w:
+        assert w.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        assert w.execute("PRAGMA synchronous").fetchone()[0] == 1  # NORMAL
+        assert w.execute("PRAGMA busy_timeout").fetchone()[0] == 5000
+        assert get_schema_version(w) == SCHEMA_VERSION
+
+
+def test_readers_see_only_committed_data_and_do_not_block(manager):
+    with manager.writer() as w:
+        deck_repo.insert(w, "Pending", "p.md")
+        # The write transaction is still open; a reader is not blocked by it
+        with manager.reader() as r:
+            assert deck_repo.get_by_title(r, "Pending") is None
+    with manager.reader() as r:
+        assert deck_repo.get_by_title(r, "Pending") is not None
+
+
+def test_readers_are_read_only(manager):
+    with manager.reader() as r:
+        with pytest.raises(sqlite3.OperationalError):
+            deck_repo.insert(r, "Nope", "n.md")
+
+
+def test_writer_rolls_back_on_error_and_nests(manager):
+    with pytest.raises(ValueError):
+        with manager.writer() as w:
+            deck_repo.insert(w, "Outer", "o.md")
+            with manager.writer() as inner:
+                deck_repo.insert(inner, "Inner", "i.md")
+            raise ValueError
+    with manager.reader() as r:
+        assert deck_repo.get_all(r) == []
+
+
+def test_writer_is_serialised_across_threads(manager):
+    def work(n):
+        for i in range(20):
+            with manager.writer() as w:
+                deck_repo.insert(w, f"T{n}-{i}", "t.md")
+
+    threads = [threading.Thread(target=work, args=(n,)) for n in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    with manager.reader() as r:
+        assert len(deck_repo.get_all(r)) == 80
+
+
+def test_reader_pool_is_bounded(manager):
+    with manager.reader(), manager.reader():
+        with pytest.raises(TimeoutError):
+            with manager.reader(timeout=0.05):
+                pass
+    with manager.reader():
+        pass
@@ -0,0 +1,60 @@
+import asyncio
+import threading
+
+import pytest
+
+from flashmd.db import deck_repo
+from flashmd.db.database import ConnectionManager
+from flashmd.db.executor import DbExecutor
+
+
+@pytest.fixture
+def db(tmp_path):
+    manager = ConnectionManager(tmp_path / "flashmd.db")
+    yield manager
+    manager.close()
+
+
+@pytest.fixture
+def executor(db):
+    ex = DbExecutor(db)
+    yield ex
+    ex.shutdown()
+
+
+def test_work_runs_on_the_worker_thread(executor):
+    caller = threading.get_ident()
+    assert executor.submit(threading.get_ident).result(timeout=5) != caller
+
+
+def test_read_after_write_sees_it(executor):
+    executor.write(deck_repo.insert, "Async", "a.md")
+    titles = executor.read(lambda conn: [d["title"] for d in deck_repo.get_all(conn)])
+    assert titles.result(timeout=5) == ["Async"]
+
+
+def test_failed_write_rolls_back_and_reports_error(executor):
+    def broken(conn):
+        deck_repo.insert(conn, "Half", "h.md")
+        raise ValueError("boom")
+
+    with pytest.raises(ValueError):
+        executor.write(broken).result(timeout=5)
+    assert executor.read(deck_repo.get_by_title, "Half").result(timeout=5) is None
+
+
+def test_asyncio_interface(executor):
+    async def main():
+        deck_id = await executor.awrite(deck_repo.insert, "Coro", "c.md")
+        return await executor.aread(deck_repo.get_by_id, deck_id)
+
+    assert asyncio.run(main())["title"] == "Coro"
+
+
+def test_shutdown_finishes_submitted_work(db):
+    ex = DbExecutor(db)
+    futures = [ex.write(deck_repo.insert, f"D{i}", "d.md") for i in range(20)]
+    ex.shutdown()
+    assert all(f.done() and f.exception() is None for f in futures)
+    with pytest.raises(RuntimeError):
+        ex.submit(print)
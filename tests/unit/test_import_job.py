@@ -0,0 +1,151 @@
+import threading
+
+import pytest
+
+from flashmd.db import card_repo, deck_repo
+from flashmd.db.database import ConnectionManager
+from flashmd.db.import_job import DirectoryImportJob, ImportCancelled, ImportJob
+
+
+def _deck_md(n: int, back: str = "Back", title: str = "Big") -> str:
+    return f"# {title}\n\n" + "".join(f"**{i}. TERM{i}**\n{back} {i}.\n\n" for i in range(n))
+
+
+@pytest.fixture
+def db(tmp_path):
+    manager = ConnectionManager(tmp_path / "flashmd.db")
+    yield manager
+    manager.close()
+
+
+def _card_count(db, title="Big"):
+    with db.reader() as conn:
+        deck = deck_repo.get_by_title(conn, title)
+        return len(card_repo.get_cards(conn, deck["id"])) if deck else None
+
+
+def test_job_imports_and_reports_progress(db, tmp_path):
+    path = tmp_path / "big.md"
+    path.write_text(_deck_md(2000))
+    events = []
+
+    job = ImportJob(db, path, on_progress=events.append).start()
+    deck_id = job.result(timeout=30)
+
+    assert _card_count(db) == 2000
+    with db.reader() as conn:
+        assert deck_repo.get_by_id(conn, deck_id)["source_path"] == str(path.resolve())
+
+    parsed = [e.bytes_parsed for e in events if e.phase == "parsing"]
+    assert parsed == sorted(parsed) and 0 < parsed[-1] <= path.stat().st_size
+    final = events[-1]
+    assert final.phase == "done" and final.fraction == 1.0
+    assert final.bytes_parsed == final.bytes_total == path.stat().st_size
+    assert (final.cards_parsed, final.cards_written) == (2000, 2000)
+    written = [e.cards_written for e in events if e.phase == "writing"]
+    assert any(0 < n < 2000 for n in written)      # reported while writing
+    fractions = [e.fraction for e in events]
+    assert fractions == sorted(fractions)
+
+
+def test_writer_is_free_while_parsing(db, tmp_path):
+    path = tmp_path / "big.md"
+    path.write_text(_deck_md(2000))
+    wrote, during_parse = [], []
+
+    def write_elsewhere():
+        with db.writer() as conn:
+            wrote.append(deck_repo.insert(conn, "Elsewhere", "e.md"))
+
+    def on_progress(progress):
+        if progress.phase == "parsing" and progress.cards_parsed and not wrote:
+            other = threading.Thread(target=write_elsewhere)
+            other.start()
+            other.join(timeout=5)
+            during_parse.append(bool(wrote))
+
+    ImportJob(db, path, on_progress=on_progress).start().result(timeout=30)
+    assert during_parse == [True] and _card_count(db) == 2000
+
+
+def test_cancel_while_parsing_rolls_back(db, tmp_path):
+    path = tmp_path / "big.md"
+    path.write_text(_deck_md(200, title="Big"))
+    ImportJob(db, path).start().result(timeout=30)
+
+    path.write_text(_deck_md(5000, "Changed"))
+
+    def cancel_midway(progress):
+        if progress.cards_parsed >= 1000:
+            job.cancel()
+
+    job = ImportJob(db, path, on_progress=cancel_midway).start()
+    with pytest.raises(ImportCancelled):
+        job.result(timeout=30)
+
+    assert _card_count(db) == 200
+    with db.reader() as conn:
+        card = card_repo.get_card_by_front(conn, deck_repo.get_by_title(conn, "Big")["id"], "TERM1")
+        assert card["back"] == "Back 1."
+    # The writer is usable again afterwards
+    with db.writer() as conn:
+        deck_repo.insert(conn, "After", "a.md")
+
+
+def test_cancel_inside_sql_interrupts_statement(db, tmp_path):
+    path = tmp_path / "big.md"
+    path.write_text(_deck_md(3000))
+
+    def cancel_while_writing(progress):
+        if progress.cards_written:
+            job.cancel()
+
+    job = ImportJob(db, path, on_progress=cancel_while_writing)
+    job.CHECK_EVERY = 100
+    job.start()
+    with pytest.raises(ImportCancelled):
+        job.result(timeout=30)
+    assert _card_count(db) is None
+
+
+def test_file_without_cards_fails(db, tmp_path):
+    empty = tmp_path / "empty.md"
+    empty.write_text("")
+    plain = tmp_path / "plain.md"
+    plain.write_text("# Title\n\nJust prose.\n")
+    for path in (empty, plain):
+        with pytest.raises(ValueError):
+            ImportJob(db, path).start().result(timeout=30)
+
+
+def test_directory_job_imports_in_batches_and_stops_on_cancel(db, tmp_path):
+    folder = tmp_path / "decks"
+    folder.mkdir()
+    for i in range(6):
+        (folder / f"d{i}.md").write_text(_deck_md(10, title=f"Deck {i}"))
+    (folder / "zz_broken.md").write_text("# Nothing\n")
+
+    events = []
+    job = DirectoryImportJob(db, folder, workers=1, batch_size=2, on_progress=events.append)
+    report = job.start().result(timeout=60)
+    assert len(report.imported) == 6 and report.cards == 60
+    assert list(report.errors) == [str(folder / "zz_broken.md")]
+    done = [e.files_done for e in events if e.phase == "importing"]
+    assert done == sorted(done) and done[-1] == 7
+    assert events[-1].phase == "done"
+
+    for i in range(6):
+        (folder / f"d{i}.md").write_text(_deck_md(20, title=f"Deck {i}"))
+
+    def cancel_after_first_batch(progress):
+        if progress.files_done:
+            job.cancel()
+
+    job = DirectoryImportJob(db, folder, workers=1, batch_size=2,
+                             on_progress=cancel_after_first_batch)
+    report = job.start().result(timeout=60)
+    assert job.cancelled and len(report.imported) == 2
+    assert [_card_count(db, f"Deck {i}") for i in range(6)] == [20, 20, 10, 10, 10, 10]
+    # The writer is free again
+    with db.writer() as conn:
+        deck_repo.insert(conn, "After", "a.md")
@@ -1,5 +1,8 @@
+import io
+
 import pytest
-from flashmd.parser.md_parser import parse, ParsedCard
+from flashmd.parser import rich
+from flashmd.parser.md_parser import parse, parse_path, parse_stream, ParsedCard
 
 
 SAMPLE_MD = """\
@@ -97,3 +100,130 @@ def test_card_without_category():
     md = "# Deck\n\n**1. FOO — Bar**\nDefinition.\n"
     deck = parse(md, "x.md")
     assert deck.cards[0].category is None
+
+
+# ── Streaming API ─────────────────────────────────────────────────────────────
+
+def test_parse_stream_matches_parse():
+    deck = parse(SAMPLE_MD, "test.md")
+    streamed = parse_stream(io.StringIO(SAMPLE_MD), "test.md")
+    assert streamed.title == deck.title
+    assert streamed.source_file == "test.md"
+    assert list(streamed.cards) == deck.cards
+
+
+def test_parse_stream_binary_matches_parse():
+    md = "**1. FOO — Bar**\nDéfinition.\r\n\r\n# Late Title\n**2. BAZ — Qux**\nx\n"
+    deck = parse(md, "b.md")
+    streamed = parse_stream(io.BytesIO(md.encode("utf-8")), "b.md")
+    assert streamed.title == "Late Title" == deck.title
+    assert list(streamed.cards) == deck.cards
+
+
+def test_parse_path_matches_parse(tmp_path):
+    path = tmp_path / "deck.md"
+    path.write_text(SAMPLE_MD, encoding="utf-8")
+    streamed = parse_path(path)
+    assert streamed.source_file == "deck.md"
+    assert streamed.title == "Test Deck"
+    assert list(streamed.cards) == parse(SAMPLE_MD, "deck.md").cards
+
+
+def test_parse_path_empty_file(tmp_path):
+    path = tmp_path / "empty.md"
+    path.write_bytes(b"")
+    streamed = parse_path(path)
+    assert streamed.title == "empty.md"
+    assert list(streamed.cards) == []
+
+
+# ── Line classification and pathological input ───────────────────────────────
+
+@pytest.mark.parametrize("line,is_front", [
+    ("**12. FOO — Foo**", True),
+    ("**1.\tFOO**", True),
+    ("**1. ***", True),
+    ("**1.FOO**", False),
+    ("**. FOO**", False),
+    ("**1. FOO", False),
+    ("**1. **", False),
+])
+def test_front_detection(line, is_front):
+    deck = parse(f"# Deck\n{line}\nBack.\n", "x.md")
+    assert (len(deck.cards) == 1) is is_front
+
+
+def test_non_heading_lines_become_back_text():
+    md = "# Deck\n**1. FOO — Foo**\n### Three\n#NoSpace\n# Second H1\n--\n-- -\n"
+    deck = parse(md, "x.md")
+    assert deck.cards[0].back == "### Three #NoSpace # Second H1 -- -- -"
+
+
+def test_rules_of_any_length_are_ignored():
+    deck = parse("# Deck\n**1. FOO — Foo**\nA\n---\n----------\nB\n", "x.md")
+    assert deck.cards[0].back == "A B"
+
+
+def test_huge_back_with_leading_blank_lines():
+    n = 200_000
+    md = "# Deck\n**1. FOO — Foo**\n" + "\n" * n + "word\n" * n + "\n" * n
+    deck = parse(md, "x.md")
+    assert deck.cards[0].back == " ".join(["word"] * n)
+
+
+def test_unclosed_bold_lines_are_back_text():
+    line = "**1. " + "x * " * 50_000
+    deck = parse(f"# Deck\n**1. FOO — Foo**\n{line}\n", "x.md")
+    assert len(deck.cards) == 1
+    assert deck.cards[0].back == line.strip()
+
+
+RICH_MD = """\
+# Rich
+**1. TERM — Term**
+Some *emphasis* and **bold _nested_** with `code`.
+continues here.
+
+- one
+- two
+  wrapped
+
+```
+if x:
+    return 1
+```
+> quoted
+"""
+
+
+def test_rich_back_keeps_lists_code_and_emphasis():
+    card = parse(RICH_MD).cards[0]
+    runs = rich.tokenize(RICH_MD.splitlines()[2:])
+    assert rich.decode(card.back_rich) == tuple(x for run in runs for x in run)
+    assert runs == [
+        ("Some ", ""), ("emphasis", "i"), (" and ", ""), ("bold ", "b"),
+        ("nested", "b i"), (" with ", ""), ("code", "code"),
+        (". continues here.\n\n", ""),
+        ("•  one", "li"), ("\n", ""), ("•  two wrapped", "li"), ("\n\n", ""),
+        ("if x:\n    return 1", "pre"), ("\n\n", ""), ("quoted", "quote"),
+    ]
+    # The plain back is unchanged: paragraphs joined, markup left in
+    assert card.back.startswith("Some *emphasis* and **bold _nested_** with `code`.")
+
+
+def test_rich_headings_drop_closing_hashes_and_whitespace():
+    runs = rich.tokenize(["### Title ##", "####\tDeeper", "###NoSpace", "## Two"])
+    assert runs == [
+        ("Title", "h"), ("\n\n", ""), ("Deeper", "h"), ("\n\n###NoSpace ## Two", ""),
+    ]
+
+
+def test_heading_with_long_whitespace_run():
+    line = "### a" + " " * 50_000 + "b"
+    assert rich.tokenize([line]) == [("a" + " " * 50_000 + "b", "h")]
+
+
+def test_back_without_markup_has_no_rich_form():
+    card = parse("**1. A — A**\nJust text,\nsnake_case and 2 * 3 * 4.\n").cards[0]
+    assert card.back_rich is None
+    assert rich.plain(rich.tokenize(["Just text,", "snake_case and 2 * 3 * 4."])) == card.back
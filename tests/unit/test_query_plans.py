@@ -0,0 +1,206 @@
+"""
+EXPLAIN QUERY PLAN checks for every repo query against a large synthetic DB.
+
+Each public repo function is exercised with SQL tracing on; every statement
+it runs is then explained and the test fails on any full scan of a table:
+a "SCAN <table>" step, with or without an index; only SEARCH steps read
+part of a table. Scans of the import staging tables are expected: they
+hold exactly the rows being imported.
+Whole-collection reads (get_schedule with no deck) scan card_progress on
+purpose and are exercised for one deck only. Calls listed in
+ALLOWED_CALL_SCANS read a whole small table by design.
+"""
+import inspect
+import sqlite3
+
+import pytest
+
+from flashmd.db import (
+    card_repo, deck_repo, import_service, params_repo, progress_repo, review_repo,
+    search_repo,
+)
+from flashmd.db.database import init_db
+from flashmd.db.timeutil import epoch_now, today
+from flashmd.parser.md_parser import parse
+from flashmd.sm2.algorithm import SM2Params
+
+
+N_DECKS = 100
+CARDS_PER_DECK = 100
+ALLOWED_SCANS = {"import_stage", "import_category"}
+ALLOWED_CALL_SCANS = {
+    # Listing or counting every deck walks deck (one row a deck) in title
+    # order. Plans name tables by their alias: d is deck.
+    "deck_repo.get_all": {"deck"},
+    "deck_repo.count_matching[all]": {"deck"},
+    "deck_repo.get_page[all]": {"d"},
+}
+
+
+def _deck_md(i: int, back: str = "Definition") -> str:
+    lines = [f"# Deck {i:04d}"]
+    for j in range(CARDS_PER_DECK):
+        if j % 20 == 0:
+            lines.append(f"## Category {j // 20}")
+        lines.append(f"**{j}. TERM {i}-{j}**")
+        lines.append(f"{back} {j}.")
+    return "\n".join(lines)
+
+
+@pytest.fixture(scope="module")
+def big_conn():
+    c = sqlite3.connect(":memory:")
+    c.row_factory = sqlite3.Row
+    c.execute("PRAGMA foreign_keys = ON")
+    init_db(c)
+    for i in range(N_DECKS):
+        import_service.import_deck(c, parse(_deck_md(i), f"deck{i}.md"), commit=False)
+    c.commit()
+    yield c
+    c.close()
+
+
+def _ids(conn):
+    deck = deck_repo.get_by_title(conn, "Deck 0001")
+    card = card_repo.get_cards(conn, deck["id"])[0]
+    return deck["id"], card["id"]
+
+
+# Every public function in the repo modules, mapped to a call that runs it.
+EXERCISED = {
+    "deck_repo.get_all": lambda c: deck_repo.get_all(c),
+    "deck_repo.count_matching": lambda c: deck_repo.count_matching(c, "deck 00"),
+    "deck_repo.count_matching[all]": lambda c: deck_repo.count_matching(c),
+    "deck_repo.get_page": lambda c: deck_repo.get_page(c, 20, 10, "Deck 0"),
+    "deck_repo.get_page[all]": lambda c: deck_repo.get_page(c, 50, 25),
+    "deck_repo.get_list_rows": lambda c: deck_repo.get_list_rows(c, [_ids(c)[0], 5, 7]),
+    "deck_repo.get_position": lambda c: deck_repo.get_position(c, _ids(c)[0], "deck"),
+    "deck_repo.get_by_id": lambda c: deck_repo.get_by_id(c, _ids(c)[0]),
+    "deck_repo.get_titles": lambda c: deck_repo.get_titles(c, [_ids(c)[0], 5, 7]),
+    "deck_repo.get_by_title": lambda c: deck_repo.get_by_title(c, "Deck 0002"),
+    "deck_repo.get_by_source_path": lambda c: deck_repo.get_by_source_path(c, "/x.md"),
+    "deck_repo.get_fingerprints": lambda c: deck_repo.get_fingerprints(c),
+    "deck_repo.insert": lambda c: deck_repo.insert(c, "New Deck", "new.md"),
+    "deck_repo.update_last_studied": lambda c: deck_repo.update_last_studied(c, _ids(c)[0]),
+    "deck_repo.set_fingerprint":
+        lambda c: deck_repo.set_fingerprint(c, _ids(c)[0], "/x.md", 1, 2, "h"),
+    "deck_repo.delete": lambda c: deck_repo.delete(c, deck_repo.get_by_title(c, "Deck 0099")["id"]),
+    "card_repo.insert_category":
+        lambda c: card_repo.insert_category(c, _ids(c)[0], "Extra", 99),
+    "card_repo.get_categories": lambda c: card_repo.get_categories(c, _ids(c)[0]),
+    "card_repo.get_category_names": lambda c: card_repo.get_category_names(c, [1, 2, 3]),
+    "card_repo.delete_categories":
+        lambda c: card_repo.delete_categories(c, deck_repo.get_by_title(c, "Deck 0098")["id"]),
+    "card_repo.insert_card":
+        lambda c: card_repo.insert_card(c, _ids(c)[0], None, "Extra card", "Back"),
+    "card_repo.get_cards": lambda c: card_repo.get_cards(c, _ids(c)[0]),
+    "card_repo.get_card_by_front":
+        lambda c: card_repo.get_card_by_front(c, _ids(c)[0], "TERM 1-5"),
+    "card_repo.get_rich_backs": lambda c: card_repo.get_rich_backs(c, [_ids(c)[1], 3]),
+    "card_repo.update_card_back": lambda c: card_repo.update_card_back(c, _ids(c)[1], "New"),
+    "card_repo.upsert_deck_contents": lambda c: card_repo.upsert_deck_contents(
+        c, _ids(c)[0], parse(_deck_md(1, "Changed"), "d.md").cards
+    ),
+    "progress_repo.init_progress": lambda c: progress_repo.init_progress(c, _ids(c)[1]),
+    "progress_repo.reset_progress": lambda c: progress_repo.reset_progress(c, _ids(c)[1]),
+    "progress_repo.init_missing_progress":
+        lambda c: progress_repo.init_missing_progress(c, _ids(c)[0]),
+    "progress_repo.reset_progress_many":
+        lambda c: progress_repo.reset_progress_many(c, [_ids(c)[1]]),
+    "progress_repo.get_due_page": lambda c: progress_repo.get_due_page(c, after=(0, 10)),
+    "progress_repo.get_due_page[deck]":
+        lambda c: progress_repo.get_due_page(c, _ids(c)[0], after=(0, 10)),
+    "progress_repo.iter_due_cards": lambda c: list(progress_repo.iter_due_cards(c, _ids(c)[0])),
+    "progress_repo.get_due_count": lambda c: progress_repo.get_due_count(c),
+    "progress_repo.flatten_due_days":
+        lambda c: progress_repo.flatten_due_days(c, 20, _ids(c)[0]),
+    "progress_repo.flatten_due_days[all]": lambda c: progress_repo.flatten_due_days(c, 500),
+    "progress_repo.get_schedule": lambda c: progress_repo.get_schedule(c, _ids(c)[0]),
+    "progress_repo.get_progress": lambda c: progress_repo.get_progress(c, _ids(c)[1]),
+    "progress_repo.apply_rating": lambda c: progress_repo.apply_rating(c, _ids(c)[1], 4),
+    "progress_repo.apply_ratings":
+        lambda c: progress_repo.apply_ratings(c, [(_ids(c)[1], 4, epoch_now(), 900)]),
+    "progress_repo.get_stats": lambda c: progress_repo.get_stats(c, _ids(c)[0]),
+    "progress_repo.get_due_histogram": lambda c: progress_repo.get_due_histogram(c, _ids(c)[0], 30),
+    "review_repo.insert_reviews": lambda c: review_repo.insert_reviews(
+        c, [(_ids(c)[1], _ids(c)[0], epoch_now(), today(), 4, 1, 6, 2.5, 900)]
+    ),
+    "review_repo.get_card_reviews": lambda c: review_repo.get_card_reviews(c, _ids(c)[1]),
+    "review_repo.get_rating_history": lambda c: review_repo.get_rating_history(c, _ids(c)[0]),
+    "review_repo.get_daily": lambda c: review_repo.get_daily(c, _ids(c)[0]),
+    "review_repo.get_history": lambda c: review_repo.get_history(c, _ids(c)[0]),
+    "params_repo.get_params": lambda c: params_repo.get_params(c, _ids(c)[0]),
+    "params_repo.set_params":
+        lambda c: params_repo.set_params(c, _ids(c)[0], SM2Params(interval_modifier=1.2)),
+    "params_repo.clear_params": lambda c: params_repo.clear_params(c, _ids(c)[0]),
+    "search_repo.search_cards": lambda c: search_repo.search_cards(c, "definition of"),
+    "import_service.import_deck":
+        lambda c: import_service.import_deck(c, parse(_deck_md(2, "Again"), "d.md"), commit=False),
+}
+
+
+def _public_functions(module) -> set[str]:
+    return {
+        f"{module.__name__.rsplit('.', 1)[1]}.{name}"
+        for name, fn in inspect.getmembers(module, inspect.isfunction)
+        if not name.startswith("_") and fn.__module__ == module.__name__
+    }
+
+
+def test_every_repo_function_is_exercised():
+    public = set()
+    for module in (deck_repo, card_repo, progress_repo, review_repo, search_repo, params_repo):
+        public |= _public_functions(module)
+    assert public - set(EXERCISED) == set()
+
+
+def _full_scans(conn, sql: str, allowed: set[str] = frozenset()) -> list[str]:
+    plan = conn.execute(f"EXPLAIN QUERY PLAN {sql}").fetchall()
+    subqueries = {
+        row["detail"].split()[1] for row in plan
+        if row["detail"].startswith(("MATERIALIZE ", "CO-ROUTINE "))
+    }
+    scans = []
+    for row in plan:
+        detail = row["detail"]
+        if not detail.startswith("SCAN "):
+            continue
+        table = detail.split()[1]
+        # Materialised subqueries and constant rows are not tables; a virtual
+        # table scan with an index number is answered by the module's index.
+        # SCAN ... USING [COVERING] INDEX still reads every row: only the
+        # order (or the columns read) comes from the index.
+        if table in ALLOWED_SCANS | allowed or table[0] == "(" \
+                or table == "CONSTANT" or table in subqueries \
+                or "VIRTUAL TABLE INDEX" in detail:
+            continue
+        scans.append(detail)
+    return scans
+
+
+def _explainable(sql: str) -> bool:
+    head = sql.lstrip().split(None, 1)[0].upper()
+    return head in {"SELECT", "UPDATE", "DELETE", "INSERT", "WITH"}
+
+
+@pytest.mark.parametrize("name", sorted(EXERCISED))
+def test_no_full_table_scans(big_conn, name):
+    statements: list[str] = []
+    big_conn.execute("SAVEPOINT plan_test")
+    big_conn.set_trace_callback(statements.append)
+    try:
+        EXERCISED[name](big_conn)
+    finally:
+        big_conn.set_trace_callback(None)
+
+    try:
+        problems = {
+            sql: scans
+            for sql in dict.fromkeys(statements)
+            if _explainable(sql)
+            and (scans := _full_scans(big_conn, sql, ALLOWED_CALL_SCANS.get(name, set())))
+        }
+    finally:
+        big_conn.execute("ROLLBACK TO plan_test")
+        big_conn.execute("RELEASE plan_test")
+    assert problems == {}
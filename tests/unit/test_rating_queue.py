@@ -0,0 +1,129 @@
+import sqlite3
+import time
+
+import pytest
+
+from flashmd.db import deck_repo, progress_repo, review_repo
+from flashmd.db.database import ConnectionManager, init_db
+from flashmd.db.import_service import import_deck
+from flashmd.db.rating_queue import RatingQueue
+
+
+@pytest.fixture
+def db(tmp_path, parsed_deck):
+    manager = ConnectionManager(tmp_path / "flashmd.db")
+    with manager.writer() as conn:
+        import_deck(conn, parsed_deck, commit=False)
+    yield manager
+    manager.close()
+
+
+def _deck_and_cards(db):
+    with db.reader() as conn:
+        deck = deck_repo.get_all(conn)[0]
+        cards = [r["card_id"] for r in conn.execute(
+            "SELECT card_id FROM card_progress ORDER BY card_id"
+        )]
+    return deck["id"], cards
+
+
+def _progress(db, card_id):
+    with db.reader() as conn:
+        return progress_repo.get_progress(conn, card_id)
+
+
+def test_record_is_deferred_until_flush(db):
+    deck_id, cards = _deck_and_cards(db)
+    q = RatingQueue(db, interval=60)
+    q.start()
+    try:
+        q.record(deck_id, cards[0], 5, duration_ms=1500)
+        assert q.pending == 1
+        assert _progress(db, cards[0])["last_rating"] is None
+
+        assert q.flush()
+        assert q.pending == 0
+        assert _progress(db, cards[0])["last_rating"] == 5
+        with db.reader() as conn:
+            assert review_repo.get_card_reviews(conn, cards[0])[0]["duration_ms"] == 1500
+        with db.reader() as conn:
+            assert deck_repo.get_by_id(conn, deck_id)["last_studied"] is not None
+    finally:
+        q.close()
+
+
+def test_batch_matches_sequential_apply_rating(db, parsed_deck):
+    deck_id, cards = _deck_and_cards(db)
+    ratings = [(cards[0], 1), (cards[1], 4), (cards[0], 4), (cards[0], 5)]
+
+    q = RatingQueue(db)
+    for card_id, rating in ratings:
+        q.record(deck_id, card_id, rating)
+    q.close()  # never started: writes synchronously
+
+    ref = sqlite3.connect(":memory:")
+    ref.row_factory = sqlite3.Row
+    init_db(ref)
+    import_deck(ref, parsed_deck)
+    for card_id, rating in ratings:
+        progress_repo.apply_rating(ref, card_id, rating)
+
+    for card_id in cards[:2]:
+        got, want = _progress(db, card_id), progress_repo.get_progress(ref, card_id)
+        for col in ("easiness", "interval", "repetitions", "due_day", "last_rating"):
+            assert got[col] == want[col]
+
+
+def test_timer_flushes_without_explicit_flush(db):
+    deck_id, cards = _deck_and_cards(db)
+    q = RatingQueue(db, interval=0.05)
+    q.start()
+    try:
+        q.record(deck_id, cards[0], 4)
+        deadline = time.monotonic() + 5
+        while q.pending and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert _progress(db, cards[0])["last_rating"] == 4
+    finally:
+        q.close()
+
+
+def test_close_writes_pending_ratings(db):
+    deck_id, cards = _deck_and_cards(db)
+    q = RatingQueue(db, interval=60)
+    q.start()
+    q.record(deck_id, cards[1], 3)
+    q.close()
+    assert _progress(db, cards[1])["last_rating"] == 3
+
+
+def test_ratings_for_deleted_cards_are_skipped(db):
+    deck_id, cards = _deck_and_cards(db)
+    q = RatingQueue(db)
+    q.record(deck_id, cards[0], 4)
+    q.record(deck_id, cards[1], 4)
+    with db.writer() as conn:
+        conn.execute("DELETE FROM card WHERE id = ?", (cards[0],))
+    assert q.flush()
+    assert _progress(db, cards[1])["last_rating"] == 4
+
+
+def test_failed_write_keeps_batch_in_order(db):
+    deck_id, cards = _deck_and_cards(db)
+    q = RatingQueue(db)
+    q.record(deck_id, cards[0], 1)
+    q.record(deck_id, cards[0], 5)
+
+    with db.writer() as conn:
+        conn.execute("PRAGMA busy_timeout = 0")
+    # Another process holding the write lock makes the flush fail
+    blocker = sqlite3.connect(db.path)
+    blocker.execute("BEGIN IMMEDIATE")
+    try:
+        assert not q.flush()
+        assert q.pending == 2
+    finally:
+        blocker.rollback()
+        blocker.close()
+    assert q.flush()
+    assert _progress(db, cards[0])["last_rating"] == 5
@@ -1,9 +1,18 @@
+import os
+import sqlite3
 import pytest
-from datetime import date, timedelta
 
-from flashmd.db import deck_repo, card_repo, progress_repo
-from flashmd.db.import_service import import_deck
-from flashmd.parser.md_parser import parse
+from flashmd.db import (
+    deck_repo, card_repo, import_service, params_repo, progress_repo, review_repo,
+    search_repo, tuning_service,
+)
+from flashmd.db.database import init_db
+from flashmd.db.import_service import (
+    import_deck, import_directory, import_file,
+)
+from flashmd.db.timeutil import FixedClock, epoch_now, today, use_clock
+from flashmd.parser.md_parser import parse, parse_path
+from flashmd.sm2.algorithm import DEFAULT_PARAMS, SM2Params, SM2Progress, calculate
 
 
 # ── Deck repo ─────────────────────────────────────────────────────────────────
@@ -38,6 +47,32 @@ def test_delete_deck_cascades(conn, parsed_deck):
     assert len(cards) == 0
 
 
+def test_deck_pages_filter_by_title_prefix_ignoring_case(conn, parsed_deck):
+    titles = ["beta", "Alpha", "alpine", "Gamma", "100%_done", "100 others"]
+    ids = {t: deck_repo.insert(conn, t, f"{t}.md") for t in titles}
+    sample = import_deck(conn, parsed_deck)
+
+    order = ["100 others", "100%_done", "Alpha", "alpine", "beta", "Gamma", "Sample Deck"]
+    assert deck_repo.count_matching(conn) == 7
+    assert [r["title"] for r in deck_repo.get_page(conn, 0, 3)] == order[:3]
+    assert [r["title"] for r in deck_repo.get_page(conn, 3, 10)] == order[3:]
+    assert [r["title"] for r in deck_repo.get_page(conn, 0, 10, "AL")] == ["Alpha", "alpine"]
+    assert deck_repo.count_matching(conn, "al") == 2
+    # LIKE wildcards in the filter are literal
+    assert [r["title"] for r in deck_repo.get_page(conn, 0, 10, "100%")] == ["100%_done"]
+    assert deck_repo.count_matching(conn, "1_0") == 0
+
+    row = deck_repo.get_page(conn, 0, 1, "sample")[0]
+    assert (row["id"], row["total"], row["due"]) == (sample, 3, 0)
+    assert deck_repo.get_position(conn, ids["beta"]) == 4
+    assert deck_repo.get_position(conn, ids["alpine"], "al") == 1
+    assert deck_repo.get_position(conn, ids["beta"], "al") is None
+
+    rows = deck_repo.get_list_rows(conn, [sample, ids["beta"], 999])
+    assert sorted(rows) == sorted([sample, ids["beta"]])
+    assert tuple(rows[sample]) == tuple(row)
+
+
 # ── Import service ────────────────────────────────────────────────────────────
 
 def test_import_creates_deck_and_cards(conn, parsed_deck):
@@ -59,10 +94,9 @@ def test_import_creates_progress_for_all_cards(conn, parsed_deck):
 def test_import_due_date_is_tomorrow(conn, parsed_deck):
     deck_id = import_deck(conn, parsed_deck)
     cards = card_repo.get_cards(conn, deck_id)
-    tomorrow = (date.today() + timedelta(days=1)).isoformat()
     for card in cards:
         prog = progress_repo.get_progress(conn, card["id"])
-        assert prog["due_date"] == tomorrow
+        assert prog["due_day"] == today() + 1
 
 
 def test_reimport_unchanged_preserves_progress(conn, parsed_deck):
@@ -97,6 +131,25 @@ def test_reimport_changed_back_resets_progress(conn):
     assert prog["easiness"] == 2.5
 
 
+def test_reimport_updates_rich_back_without_resetting_progress(conn):
+    md1 = "# Deck\n\n**1. FOO — Foo**\n```\nif x:\nreturn 1\n```\n\n**2. BAR — Bar**\nPlain.\n"
+    md2 = md1.replace("\nreturn 1", "\n    return 1")
+
+    deck_id = import_deck(conn, parse(md1, "d.md"))
+    foo, bar = (c["id"] for c in card_repo.get_cards(conn, deck_id))
+    progress_repo.apply_rating(conn, foo, 5)
+    conn.commit()
+
+    import_deck(conn, parse(md2, "d.md"))
+    backs = card_repo.get_rich_backs(conn, [foo, bar, 999])
+    assert backs[bar] == ("Plain.", None)
+    back, back_rich = backs[foo]
+    assert back == "```\nif x:\nreturn 1\n```".replace("\n", " ")
+    assert back_rich == '["if x:\\n    return 1","pre"]'
+    # Only the layout changed, not the text: the card keeps its progress
+    assert progress_repo.get_progress(conn, foo)["repetitions"] == 1
+
+
 def test_reimport_removes_deleted_cards(conn):
     md1 = "# Deck\n\n**1. FOO — Foo**\nFoo.\n\n**2. BAR — Bar**\nBar.\n"
     md2 = "# Deck\n\n**1. FOO — Foo**\nFoo.\n"
@@ -123,14 +176,553 @@ def test_apply_rating_updates_progress(conn, parsed_deck):
     assert prog["last_rating"] == 4
 
 
-def test_get_due_cards_empty_when_all_due_tomorrow(conn, parsed_deck):
+def test_get_due_page_empty_when_all_due_tomorrow(conn, parsed_deck):
     deck_id = import_deck(conn, parsed_deck)
-    due = progress_repo.get_due_cards(conn, deck_id)
+    due = progress_repo.get_due_page(conn, deck_id)
     assert len(due) == 0  # all set to tomorrow
 
 
+def test_due_pages_merge_decks_in_due_order(conn, parsed_deck):
+    first = import_deck(conn, parsed_deck)
+    second = import_deck(conn, parse(_numbered_deck(5, title="Second"), "s.md"))
+    deck_repo.insert(conn, "Empty", "e.md")
+    conn.execute("UPDATE card_progress SET due_day = ? - (card_id % 3)", (today(),))
+    expected = conn.execute(
+        "SELECT card_id FROM card_progress ORDER BY due_day, card_id"
+    ).fetchall()
+
+    pages, after = [], None
+    while page := progress_repo.get_due_page(conn, after=after, limit=3):
+        pages.append(page)
+        after = (page[-1]["due_day"], page[-1]["id"])
+    assert [len(p) for p in pages] == [3, 3, 2]
+    assert [r["id"] for p in pages for r in p] == [r[0] for r in expected]
+    assert {r["deck_id"] for p in pages for r in p} == {first, second}
+    assert progress_repo.get_due_count(conn) == 8
+
+    only_second = progress_repo.get_due_page(conn, second, limit=10)
+    assert {r["deck_id"] for r in only_second} == {second} and len(only_second) == 5
+    assert progress_repo.get_due_count(conn, second) == 5
+
+    assert "back" not in only_second[0].keys()
+    streamed = progress_repo.iter_due_cards(conn, page_size=3)
+    assert [r["id"] for r in streamed] == [r[0] for r in expected]
+
+    titles = deck_repo.get_titles(conn, [first, second, 999])
+    assert titles == {first: "Sample Deck", second: "Second"}
+    categories = card_repo.get_categories(conn, first)
+    assert card_repo.get_category_names(conn, [c["id"] for c in categories]) == {
+        c["id"]: c["name"] for c in categories
+    }
+
+
 def test_get_stats(conn, parsed_deck):
     deck_id = import_deck(conn, parsed_deck)
     stats = progress_repo.get_stats(conn, deck_id)
     assert stats["total"] == 3
     assert stats["due"] == 0
+
+
+# ── Streaming import ──────────────────────────────────────────────────────────
+
+def test_import_deck_streams_parse_path(conn, tmp_path):
+    md = "# Deck\n## A\n**1. FOO — Foo**\nFoo.\n## B\n**2. BAR — Bar**\nBar.\n"
+    path = tmp_path / "d.md"
+    path.write_text(md, encoding="utf-8")
+
+    deck_id = import_deck(conn, parse_path(path))
+    cards = card_repo.get_cards(conn, deck_id)
+    assert [(c["front"], c["back"]) for c in cards] == [
+        (c.front, c.back) for c in parse(md, "d.md").cards
+    ]
+    assert len(card_repo.get_categories(conn, deck_id)) == 2
+    for card in cards:
+        assert progress_repo.get_progress(conn, card["id"]) is not None
+
+
+def test_streamed_reimport_resets_changed_and_removes_deleted(conn, tmp_path):
+    path = tmp_path / "d.md"
+    path.write_text("# Deck\n\n**1. FOO — Foo**\nFoo.\n\n**2. BAR — Bar**\nBar.\n")
+    deck_id = import_deck(conn, parse_path(path))
+    foo_id = card_repo.get_card_by_front(conn, deck_id, "FOO — Foo")["id"]
+    progress_repo.apply_rating(conn, foo_id, 5)
+    conn.commit()
+
+    path.write_text("# Deck\n\n**1. FOO — Foo**\nFoo changed.\n")
+    assert import_deck(conn, parse_path(path)) == deck_id
+    cards = card_repo.get_cards(conn, deck_id)
+    assert [c["id"] for c in cards] == [foo_id]
+    assert progress_repo.get_progress(conn, foo_id)["repetitions"] == 0
+
+
+# ── Directory import ──────────────────────────────────────────────────────────
+
+def test_import_directory_imports_files_and_reports_errors(conn, tmp_path):
+    (tmp_path / "sub").mkdir()
+    (tmp_path / "a.md").write_text("# A\n\n**1. FOO — Foo**\nFoo.\n")
+    (tmp_path / "sub" / "b.md").write_text(
+        "# B\n\n**1. BAR — Bar**\nBar.\n\n**2. BAZ — Baz**\nBaz.\n"
+    )
+    (tmp_path / "empty.md").write_text("# Nothing here\n")
+    (tmp_path / "bad.md").write_bytes(b"# Bad\n\xff\xfe\n")
+    (tmp_path / "notes.txt").write_text("# Ignored\n\n**1. X — X**\nX.\n")
+
+    report = import_directory(conn, tmp_path, workers=2, batch_size=1)
+
+    assert sorted(report.imported) == [str(tmp_path / "a.md"), str(tmp_path / "sub" / "b.md")]
+    assert sorted(report.errors) == [str(tmp_path / "bad.md"), str(tmp_path / "empty.md")]
+    assert report.cards == 3
+    assert report.cards_per_second > 0
+    assert [d["title"] for d in deck_repo.get_all(conn)] == ["A", "B"]
+    deck_b = report.imported[str(tmp_path / "sub" / "b.md")]
+    assert len(card_repo.get_cards(conn, deck_b)) == 2
+
+
+def test_apply_parsed_file_rolls_back_on_any_exception(conn, tmp_path, monkeypatch):
+    path = tmp_path / "a.md"
+    path.write_text("# A\n\n**1. FOO — Foo**\nFoo.\n")
+    result = (parse(path.read_text()), import_service.file_fingerprint(path), None)
+
+    def interrupt(*args, **kwargs):
+        raise KeyboardInterrupt
+
+    monkeypatch.setattr(import_service, "record_fingerprint", interrupt)
+    report = import_service.DirectoryImportReport()
+    with pytest.raises(KeyboardInterrupt):
+        import_service.apply_parsed_file(conn, report, {}, str(path), result)
+    assert report.imported == {}
+    assert deck_repo.get_all(conn) == []
+
+    # The savepoint was released, so the file can be retried in the same transaction
+    monkeypatch.undo()
+    assert import_service.apply_parsed_file(conn, report, {}, str(path), result)
+    conn.commit()
+    assert [d["title"] for d in deck_repo.get_all(conn)] == ["A"]
+
+
+def test_import_directory_rolls_back_the_open_batch_on_interrupt(conn, tmp_path, monkeypatch):
+    (tmp_path / "a.md").write_text("# A\n\n**1. FOO — Foo**\nFoo.\n")
+    (tmp_path / "b.md").write_text("# B\n\n**1. BAR — Bar**\nBar.\n")
+    record = import_service.record_fingerprint
+
+    def interrupt_on_b(conn, deck_id, path, fp):
+        if path.endswith("b.md"):
+            raise KeyboardInterrupt
+        record(conn, deck_id, path, fp)
+
+    monkeypatch.setattr(import_service, "record_fingerprint", interrupt_on_b)
+    with pytest.raises(KeyboardInterrupt):
+        import_directory(conn, tmp_path, workers=1, batch_size=10)
+    assert not conn.in_transaction
+    assert deck_repo.get_all(conn) == []
+
+
+# ── Fingerprint fast path ─────────────────────────────────────────────────────
+
+def test_import_file_skips_unchanged_file(conn, tmp_path, monkeypatch):
+    path = tmp_path / "d.md"
+    path.write_text("# Deck\n\n**1. FOO — Foo**\nFoo.\n")
+    deck_id, skipped = import_file(conn, path)
+    assert not skipped
+
+    def fail(*args, **kwargs):
+        raise AssertionError("unchanged file was parsed")
+
+    monkeypatch.setattr(import_service, "mapped_file", fail)
+    assert import_file(conn, path) == (deck_id, True)
+
+
+def test_import_file_touched_but_identical_only_updates_mtime(conn, tmp_path, monkeypatch):
+    path = tmp_path / "d.md"
+    path.write_text("# Deck\n\n**1. FOO — Foo**\nFoo.\n")
+    deck_id, _ = import_file(conn, path)
+    st = path.stat()
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+
+    monkeypatch.setattr(import_service, "parse_stream", None)
+    assert import_file(conn, path) == (deck_id, True)
+    row = deck_repo.get_by_id(conn, deck_id)
+    assert row["source_mtime_ns"] == st.st_mtime_ns + 10**9
+
+
+def test_import_file_records_the_hash_of_the_content_it_imported(conn, tmp_path, monkeypatch):
+    path = tmp_path / "d.md"
+    path.write_text("# Deck\n\n**1. FOO — Foo**\nFoo.\n")
+    parse_stream = import_service.parse_stream
+
+    def save_during_import(stream, name):
+        # An editor saving over the file after it has been opened
+        new = tmp_path / "d.md.tmp"
+        new.write_text("# Deck\n\n**1. BAR — Bar**\nBar.\n")
+        st = path.stat()
+        os.utime(new, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+        os.replace(new, path)
+        return parse_stream(stream, name)
+
+    monkeypatch.setattr(import_service, "parse_stream", save_during_import)
+    deck_id, _ = import_file(conn, path)
+    assert [c["front"] for c in card_repo.get_cards(conn, deck_id)] == ["FOO — Foo"]
+
+    monkeypatch.undo()
+    assert import_file(conn, path) == (deck_id, False)
+    assert [c["front"] for c in card_repo.get_cards(conn, deck_id)] == ["BAR — Bar"]
+
+
+def test_import_file_reimports_changed_file(conn, tmp_path):
+    path = tmp_path / "d.md"
+    path.write_text("# Deck\n\n**1. FOO — Foo**\nFoo.\n")
+    deck_id, _ = import_file(conn, path)
+    path.write_text("# Deck\n\n**1. FOO — Foo**\nFoo.\n\n**2. BAR — Bar**\nBar.\n")
+    assert import_file(conn, path) == (deck_id, False)
+    assert len(card_repo.get_cards(conn, deck_id)) == 2
+
+
+def test_import_file_without_cards_raises(conn, tmp_path):
+    path = tmp_path / "d.md"
+    path.write_text("# Nothing\n")
+    with pytest.raises(ValueError):
+        import_file(conn, path)
+
+
+def test_import_directory_skips_unchanged_files(conn, tmp_path):
+    (tmp_path / "a.md").write_text("# A\n\n**1. FOO — Foo**\nFoo.\n")
+    (tmp_path / "b.md").write_text("# B\n\n**1. BAR — Bar**\nBar.\n")
+    first = import_directory(conn, tmp_path, workers=1)
+    assert len(first.imported) == 2
+
+    (tmp_path / "b.md").write_text("# B\n\n**1. BAR — Bar**\nBar changed.\n")
+    second = import_directory(conn, tmp_path, workers=1)
+    assert list(second.skipped) == [str(tmp_path / "a.md")]
+    assert list(second.imported) == [str(tmp_path / "b.md")]
+
+
+def test_init_db_adds_fingerprint_columns_to_old_schema():
+    c = sqlite3.connect(":memory:")
+    c.execute(
+        "CREATE TABLE deck (id TEXT PRIMARY KEY, title TEXT NOT NULL, "
+        "source_file TEXT NOT NULL, created_at TEXT NOT NULL, last_studied TEXT)"
+    )
+    init_db(c)
+    cols = {r[1] for r in c.execute("PRAGMA table_info(deck)")}
+    assert {"source_path", "source_size", "source_mtime_ns", "source_hash"} <= cols
+
+
+# ── Set-based upsert ──────────────────────────────────────────────────────────
+
+def _numbered_deck(n: int, back: str = "Back", title: str = "Big") -> str:
+    return f"# {title}\n\n" + "".join(
+        f"**{i}. TERM{i}**\n{back} {i}.\n\n" for i in range(n)
+    )
+
+
+def _count_statements(conn, fn):
+    statements = []
+    conn.set_trace_callback(statements.append)
+    try:
+        fn()
+    finally:
+        conn.set_trace_callback(None)
+    # Virtual tables trace their internal SQL as comments (except when FTS5
+    # reconnects after its content table was altered, e.g. by a migration);
+    # and each trigger step re-traces the statement that fired it, so drop repeats
+    statements = [
+        s for s in statements
+        if not s.startswith(("-- ", "PRAGMA 'main'.data_version")) and "'card_fts_" not in s
+    ]
+    statements = [s for i, s in enumerate(statements) if i == 0 or s != statements[i - 1]]
+    # executemany traces once per row; count those statements once
+    per_row = ("INSERT INTO import_stage", "UPDATE card_progress")
+    return len([s for s in statements if not s.startswith(per_row)]) + len(per_row)
+
+
+def test_import_runs_fixed_number_of_statements(conn):
+    counts = []
+    for n, title in ((10, "Small"), (2000, "Large")):
+        new = _count_statements(
+            conn, lambda: import_deck(conn, parse(_numbered_deck(n, title=title), "d.md"))
+        )
+        changed = _count_statements(
+            conn, lambda: import_deck(conn, parse(_numbered_deck(n, "New", title), "d.md"))
+        )
+        counts.append((new, changed))
+    assert counts[0] == counts[1]
+
+
+def test_reimport_large_deck_beyond_sqlite_variable_limit(conn):
+    deck_id = import_deck(conn, parse(_numbered_deck(40_000), "b.md"))
+    import_deck(conn, parse(_numbered_deck(39_999), "b.md"))
+    assert len(card_repo.get_cards(conn, deck_id)) == 39_999
+
+
+def test_reimport_moves_card_between_categories_and_keeps_progress(conn):
+    md1 = "# Deck\n## A\n**1. FOO — Foo**\nFoo.\n## B\n**2. BAR — Bar**\nBar.\n"
+    md2 = "# Deck\n## B\n**1. FOO — Foo**\nFoo.\n**2. BAR — Bar**\nBar.\n"
+    deck_id = import_deck(conn, parse(md1, "d.md"))
+    foo_id = card_repo.get_card_by_front(conn, deck_id, "FOO — Foo")["id"]
+    progress_repo.apply_rating(conn, foo_id, 5)
+    conn.commit()
+
+    import_deck(conn, parse(md2, "d.md"))
+    [cat] = card_repo.get_categories(conn, deck_id)
+    assert cat["name"] == "B"
+    assert {c["category_id"] for c in card_repo.get_cards(conn, deck_id)} == {cat["id"]}
+    assert progress_repo.get_progress(conn, foo_id)["repetitions"] == 1
+
+
+def test_duplicate_fronts_keep_last_back(conn):
+    md = "# Deck\n**1. FOO — Foo**\nFirst.\n**2. FOO — Foo**\nSecond.\n"
+    deck_id = import_deck(conn, parse(md, "d.md"))
+    [card] = card_repo.get_cards(conn, deck_id)
+    assert card["back"] == "Second."
+
+
+# ── Counter-backed stats ──────────────────────────────────────────────────────
+
+def _direct_stats(conn, deck_id):
+    total = conn.execute("SELECT COUNT(*) FROM card WHERE deck_id = ?", (deck_id,)).fetchone()[0]
+    due = conn.execute(
+        "SELECT COUNT(*) FROM card c JOIN card_progress cp ON cp.card_id = c.id "
+        "WHERE c.deck_id = ? AND cp.due_day <= ?",
+        (deck_id, today()),
+    ).fetchone()[0]
+    ratings = dict(conn.execute(
+        "SELECT cp.last_rating, COUNT(*) FROM card_progress cp JOIN card c ON c.id = cp.card_id "
+        "WHERE c.deck_id = ? AND cp.last_rating IS NOT NULL GROUP BY cp.last_rating",
+        (deck_id,),
+    ).fetchall())
+    return {"total": total, "due": due, "rating_counts": ratings}
+
+
+def _assert_counters_match(conn):
+    for deck in deck_repo.get_all(conn):
+        assert progress_repo.get_stats(conn, deck["id"]) == _direct_stats(conn, deck["id"])
+
+
+def test_counters_follow_imports_ratings_and_deletes(conn, parsed_deck):
+    deck_id = import_deck(conn, parsed_deck)
+    other_id = import_deck(conn, parse(_numbered_deck(30, title="Other"), "o.md"))
+    deck_repo.insert(conn, "Empty", "e.md")
+    _assert_counters_match(conn)
+
+    cards = card_repo.get_cards(conn, deck_id)
+    conn.execute("UPDATE card_progress SET due_day = ? WHERE card_id = ?",
+                 (today() - 1, cards[0]["id"]))
+    progress_repo.apply_rating(conn, cards[1]["id"], 4)
+    progress_repo.apply_rating(conn, cards[1]["id"], 2)
+    progress_repo.apply_rating(conn, cards[2]["id"], 2)
+    _assert_counters_match(conn)
+
+    import_deck(conn, parse(_numbered_deck(20, "Changed", title="Other"), "o.md"))
+    conn.execute("DELETE FROM card WHERE id = ?", (cards[2]["id"],))
+    _assert_counters_match(conn)
+
+    deck_repo.delete(conn, other_id)
+    _assert_counters_match(conn)
+    for table in ("deck_counter", "deck_due_counter", "deck_rating_counter"):
+        assert conn.execute(
+            f"SELECT COUNT(*) FROM {table} WHERE deck_id = ?", (other_id,)
+        ).fetchone()[0] == 0
+
+
+def test_due_histogram_buckets_by_day(conn, parsed_deck):
+    deck_id = import_deck(conn, parsed_deck)
+    ids = [c["id"] for c in card_repo.get_cards(conn, deck_id)]
+    assert len(ids) == 3
+    for card_id, due in zip(ids, (today() - 3, today() + 2, today() + 9)):
+        conn.execute("UPDATE card_progress SET due_day = ? WHERE card_id = ?", (due, card_id))
+
+    assert progress_repo.get_due_histogram(conn, deck_id, 5) == [1, 0, 1, 0, 0]
+
+
+def test_injected_clock_moves_due_queries_and_schedule(conn, parsed_deck):
+    deck_id = import_deck(conn, parsed_deck)
+    assert progress_repo.get_due_count(conn, deck_id) == 0
+
+    with use_clock(FixedClock.at_day(today() + 1)) as clock:
+        assert progress_repo.get_due_count(conn, deck_id) == 3
+        card_id = progress_repo.get_due_page(conn, deck_id)[0]["id"]
+        progress_repo.apply_rating(conn, card_id, 4)
+        assert progress_repo.get_progress(conn, card_id)["due_day"] == clock.today() + 1
+        clock.advance(days=1)
+        assert progress_repo.get_due_count(conn, deck_id) == 3
+    assert progress_repo.get_due_count(conn, deck_id) == 0
+
+    ef, interval, reps, due = progress_repo.get_schedule(conn, deck_id)
+    assert len(ef) == len(interval) == len(reps) == 3
+    assert sorted(due) == [today() + 1, today() + 1, today() + 2]
+    assert progress_repo.get_schedule(conn) == (ef, interval, reps, due)
+    assert progress_repo.get_schedule(conn, 999) == ([], [], [], [])
+
+
+def test_flatten_due_days_spreads_an_import_in_one_deck(conn, parsed_deck):
+    other = import_deck(conn, parsed_deck)
+    deck_id = import_deck(conn, parse(_numbered_deck(30), "big.md"))
+    conn.commit()
+
+    assert progress_repo.flatten_due_days(conn, 12, deck_id) == 21
+    # The other deck's 3 cards count towards tomorrow but stay put
+    with use_clock(FixedClock.at_day(today() + 1)):
+        assert progress_repo.get_due_histogram(conn, deck_id, 4) == [9, 12, 9, 0]
+        assert progress_repo.get_due_histogram(conn, other, 4) == [3, 0, 0, 0]
+    _assert_counters_match(conn)
+    assert progress_repo.flatten_due_days(conn, 12) == 0
+
+
+# ── Review log ────────────────────────────────────────────────────────────────
+
+def test_ratings_append_to_review_log_and_daily_rollup(conn, parsed_deck):
+    deck_id = import_deck(conn, parsed_deck)
+    foo, bar = [c["id"] for c in card_repo.get_cards(conn, deck_id)[:2]]
+    now = epoch_now()
+
+    progress_repo.apply_rating(conn, foo, 4, duration_ms=1200)   # learning
+    progress_repo.apply_ratings(conn, [
+        (foo, 5, now, 800),      # recall of a learned card, passed
+        (bar, 4, now, None),
+        (foo, 1, now, 1000),     # recall, failed
+    ])
+
+    log = review_repo.get_card_reviews(conn, foo)
+    assert [r["rating"] for r in log] == [4, 5, 1]
+    assert [r["prev_interval"] for r in log] == [0, 1, 6]
+
+    daily = review_repo.get_daily(conn, deck_id)
+    assert len(daily) == 1
+    assert (daily[0]["reviews"], daily[0]["correct"]) == (4, 3)
+    assert (daily[0]["recalls"], daily[0]["recalled"]) == (2, 1)
+    assert daily[0]["duration_ms"] == 3000
+
+    history = review_repo.get_history(conn, deck_id)
+    assert history == {"days": 1, "reviews": 4, "retention": 0.5, "duration_ms": 3000}
+
+
+def test_review_log_is_append_only_and_goes_with_its_deck(conn, parsed_deck):
+    deck_id = import_deck(conn, parsed_deck)
+    card_id = card_repo.get_cards(conn, deck_id)[0]["id"]
+    progress_repo.apply_rating(conn, card_id, 4)
+
+    with pytest.raises(sqlite3.IntegrityError):
+        conn.execute("UPDATE review_log SET rating = 5")
+
+    deck_repo.delete(conn, deck_id)
+    assert conn.execute("SELECT COUNT(*) FROM review_log").fetchone()[0] == 0
+    assert review_repo.get_daily(conn, deck_id) == []
+    assert review_repo.get_history(conn, deck_id)["retention"] is None
+
+
+# ── Per-deck parameters ───────────────────────────────────────────────────────
+
+def test_apply_rating_uses_the_decks_params(conn, parsed_deck):
+    deck_id = import_deck(conn, parsed_deck)
+    foo, bar = [c["id"] for c in card_repo.get_cards(conn, deck_id)[:2]]
+    assert params_repo.get_params(conn, deck_id) == DEFAULT_PARAMS
+
+    tuned = SM2Params(first_interval=3, min_easiness=1.5)
+    params_repo.set_params(conn, deck_id, tuned, loss=0.2, scored=500)
+    assert params_repo.get_params(conn, deck_id) == tuned
+    progress_repo.apply_rating(conn, foo, 4)
+    progress_repo.apply_ratings(conn, [(bar, 4, epoch_now(), None)])
+    assert progress_repo.get_progress(conn, foo)["interval"] == 3
+    assert progress_repo.get_progress(conn, bar)["interval"] == 3
+
+    params_repo.clear_params(conn, deck_id)
+    assert params_repo.get_params(conn, deck_id) == DEFAULT_PARAMS
+    params_repo.set_params(conn, deck_id, tuned)
+    deck_repo.delete(conn, deck_id)
+    assert conn.execute("SELECT COUNT(*) FROM deck_params").fetchone()[0] == 0
+
+
+def test_fit_deck_saves_longer_intervals_for_easy_material(conn, parsed_deck):
+    deck_id = import_deck(conn, parse(_numbered_deck(300), "big.md"))
+    card_ids = [c["id"] for c in card_repo.get_cards(conn, deck_id)]
+    # Every card recalled at every review, even at 1.5x its interval
+    reviews = []
+    for card_id in card_ids:
+        p, day = SM2Progress(), 0
+        for n in range(6):
+            day += p.interval * 3 // 2
+            reviews.append((card_id, deck_id, 0, day, 4, p.interval, 0, p.easiness, None))
+            p = calculate(p, 4)
+    review_repo.insert_reviews(conn, reviews)
+    assert len(review_repo.get_rating_history(conn, deck_id)) == len(reviews)
+
+    report = tuning_service.fit_deck(conn, deck_id, candidates=30, workers=1, seed=0)
+    assert report.saved and report.params != DEFAULT_PARAMS
+    assert report.best.loss < report.default.loss
+    assert report.best.mean_interval > report.default.mean_interval
+    assert params_repo.get_params(conn, deck_id) == report.params
+
+    other = import_deck(conn, parsed_deck)
+    assert not tuning_service.fit_deck(conn, other, candidates=5, workers=1).saved
+
+
+# ── Search ────────────────────────────────────────────────────────────────────
+
+def test_search_ranks_front_hits_and_marks_snippets(conn, parsed_deck):
+    deck_id = import_deck(conn, parsed_deck)
+    import_deck(conn, parse("# Other\n\n**1. QUX**\nNot about foo at all.\n", "o.md"))
+
+    results = search_repo.search_cards(conn, "foo", mark=("<", ">"))
+    assert [r["front"] for r in results] == ["FOO — Foo Term", "QUX"]
+    assert results[0]["deck_id"] == deck_id and results[0]["deck_title"] == "Sample Deck"
+    assert "<FOO>" in results[0]["snippet"] or "<Foo>" in results[0]["snippet"]
+
+    # Every word must match; the last one may be a prefix
+    assert {r["front"] for r in search_repo.search_cards(conn, "definition ba")} == {
+        "BAR — Bar Term", "BAZ — Baz Term",
+    }
+    assert search_repo.search_cards(conn, "definition ba ") == []
+    # FTS5 query syntax in user input is taken literally
+    assert [r["front"] for r in search_repo.search_cards(conn, '"foo" (term^')] == [
+        "FOO — Foo Term",
+    ]
+    assert search_repo.search_cards(conn, "  ") == []
+
+
+def test_broad_search_lists_newest_matches(conn, parsed_deck, monkeypatch):
+    import_deck(conn, parsed_deck)
+    monkeypatch.setattr(search_repo, "RANKED_MATCHES", 2)
+    results = search_repo.search_cards(conn, "definition", limit=2)
+    assert [r["front"] for r in results] == ["BAZ — Baz Term", "BAR — Bar Term"]
+
+
+def test_search_index_follows_reimport_and_delete(conn, parsed_deck):
+    deck_id = import_deck(conn, parsed_deck)
+    md = (
+        "# Sample Deck\n\n**2. BAR — Bar Term**\nDefinition of bar.\n\n"
+        "**3. BAZ — Baz Term**\nEntirely rewritten.\n"
+    )
+    import_deck(conn, parse(md, "sample.md"))
+
+    assert [r["front"] for r in search_repo.search_cards(conn, "rewritten")] == ["BAZ — Baz Term"]
+    assert search_repo.search_cards(conn, "baz definition") == []
+    assert search_repo.search_cards(conn, "foo") == []
+
+    deck_repo.delete(conn, deck_id)
+    assert search_repo.search_cards(conn, "definition") == []
+
+
+def test_unchanged_reimport_leaves_search_index_alone(conn):
+    md = _numbered_deck(1000)
+    import_deck(conn, parse(md, "d.md"))
+    statements = []
+    conn.set_trace_callback(statements.append)
+    try:
+        import_deck(conn, parse(md, "d.md"))
+    finally:
+        conn.set_trace_callback(None)
+    # FTS5 traces its writes to the shadow tables; only config reads may show
+    assert [s for s in statements if "'card_fts_" in s and "card_fts_config" not in s] == []
+    assert len(search_repo.search_cards(conn, "TERM999")) == 1
+
+
+def test_search_falls_back_to_like_without_fts(conn, parsed_deck):
+    import_deck(conn, parsed_deck)
+    for trigger in ("card_fts_ai", "card_fts_ad", "card_fts_au"):
+        conn.execute(f"DROP TRIGGER {trigger}")
+    conn.execute("DROP TABLE card_fts")
+
+    results = search_repo.search_cards(conn, "definition ba")
+    assert [r["front"] for r in results] == ["BAR — Bar Term", "BAZ — Baz Term"]
+    assert results[0]["snippet"].startswith("Definition of bar.")
+    assert search_repo.search_cards(conn, "100%") == []
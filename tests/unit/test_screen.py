@@ -0,0 +1,231 @@
+import gc
+import time
+import tracemalloc
+
+import pytest
+
+from flashmd.gui.screen import ScreenCache
+
+
+class FakeScreen:
+    def __init__(self):
+        self.destroyed = False
+
+    def destroy(self):
+        self.destroyed = True
+
+
+def test_screen_cache_evicts_and_destroys_least_recently_hidden():
+    cache = ScreenCache(2)
+    a, b, c = FakeScreen(), FakeScreen(), FakeScreen()
+    cache.put("a", a)
+    cache.put("b", b)
+    assert cache.take("a") is a        # shown again, so no longer cached
+    cache.put("a", a)
+    cache.put("c", c)
+
+    assert "b" not in cache and b.destroyed
+    assert not a.destroyed and not c.destroyed
+    assert len(cache) == 2
+    assert cache.take("b") is None
+
+
+def test_screen_cache_replacing_a_key_destroys_the_old_screen():
+    cache = ScreenCache(2)
+    old, new = FakeScreen(), FakeScreen()
+    cache.put("a", old)
+    cache.put("a", new)
+    assert old.destroyed and not new.destroyed
+    assert cache.take("a") is new
+
+    cache.put("a", new)
+    cache.clear()
+    assert new.destroyed and len(cache) == 0
+
+
+# ── Widgets in a bare Tcl interpreter; no display needed ─────────────────────
+
+# Just enough of Tk for widget constructors to run: each widget becomes a
+# command that accepts anything, and "invoke" runs the -command it was made with
+_FAKE_TK = """
+proc _widget {path args} {
+    set ::options($path) $args
+    proc $path {cmd args} "_call $path \\$cmd"
+    return $path
+}
+proc _call {path cmd} {
+    set i [lsearch -exact $::options($path) -command]
+    if {$cmd eq "invoke" && $i >= 0} {
+        uplevel #0 [lindex $::options($path) [expr {$i + 1}]]
+    }
+    return ""
+}
+foreach w {ttk::frame ttk::label ttk::button} { interp alias {} $w {} _widget }
+proc pack args {}
+proc grid args {}
+"""
+
+
+class BareRoot:
+    """Stands in for the Tk root as a widget master."""
+    _w = "."
+    _last_child_ids = None
+
+    def __init__(self):
+        tkinter = pytest.importorskip("tkinter")
+        self.tk = tkinter.Tcl().tk
+        self.tk.eval(_FAKE_TK)
+        self.children = {}
+
+
+class RecordingApp:
+    def __init__(self):
+        self.opened = []
+
+    def show_study_session(self, deck_id):
+        self.opened.append(("study", deck_id))
+
+    def show_deck_stats(self, deck_id):
+        self.opened.append(("stats", deck_id))
+
+
+def test_deck_row_buttons_open_the_deck_it_shows():
+    from flashmd.gui.deck_list import _DeckRow
+
+    app = RecordingApp()
+    row = _DeckRow(BareRoot(), app)
+    study, stats = row._buttons
+    study.invoke()                      # still empty: nothing to open
+    row.show(7, "Deck", "3 cards", highlight=False)
+    study.invoke()
+    row.show(9, "Other", "1 card", highlight=True)      # recycled for another deck
+    stats.invoke()
+    assert app.opened == [("study", 7), ("stats", 9)]
+
+
+# ── DB callbacks, polled without a window ────────────────────────────────────
+
+class PollingApp:
+    """The attributes App._poll_db uses."""
+
+    def __init__(self):
+        self._db_waiting = []
+        self._db_poll_job = None
+        self.scheduled = []
+        self.reported = []
+
+    def after(self, ms, fn):
+        self.scheduled.append(fn)
+        return "after#1"
+
+    def report_callback_exception(self, kind, error, tb):
+        self.reported.append(error)
+
+    def _poll_db(self):
+        from flashmd.gui.app import App
+        App._poll_db(self)
+
+
+def test_poll_db_keeps_pending_work_when_a_callback_raises():
+    from concurrent.futures import Future
+
+    def boom(result):
+        raise RuntimeError(result)
+
+    app = PollingApp()
+    done, pending, later = Future(), Future(), Future()
+    done.set_result("failed")
+    later.set_result("later")
+    filled = []
+    app._db_waiting = [(done, boom, None), (pending, filled.append, None),
+                       (later, filled.append, None)]
+
+    app._poll_db()
+    assert [str(e) for e in app.reported] == ["failed"]
+    assert filled == ["later"]
+    assert app._db_waiting == [(pending, filled.append, None)]
+    assert app._db_poll_job == "after#1"
+
+    pending.set_result("pending")
+    app._poll_db()
+    assert filled == ["later", "pending"] and not app._db_waiting
+
+
+# ── Navigation in a real window; skipped without a display ────────────────────
+
+@pytest.fixture
+def app(tmp_path, monkeypatch, parsed_deck):
+    tk = pytest.importorskip("tkinter")
+    monkeypatch.setenv("HOME", str(tmp_path))     # the app's database lives under ~
+    from flashmd.db.import_service import import_deck
+    from flashmd.gui.app import App
+
+    try:
+        app = App()
+    except tk.TclError as e:
+        pytest.skip(f"no display: {e}")
+    app.withdraw()
+    with app.db.writer() as conn:
+        app.deck_id = import_deck(conn, parsed_deck)
+    yield app
+    app.destroy()
+
+
+def _settle(app, timeout=5.0):
+    """Run the event loop until every queued DB callback has been delivered."""
+    deadline = time.monotonic() + timeout
+    app.update()
+    while app._db_waiting and time.monotonic() < deadline:
+        time.sleep(0.002)
+        app.update()
+
+
+def _navigate(app, times):
+    steps = [
+        app.show_deck_list,
+        lambda: app.show_deck_stats(app.deck_id),
+        lambda: app.show_study_session(app.deck_id),
+        lambda: app.show_session_summary(app.deck_id, {"reviewed": 0, "rating_counts": {}}),
+    ]
+    for i in range(times):
+        steps[i % len(steps)]()
+        _settle(app)
+
+
+def test_navigation_does_not_leak_screens_or_bindings(app):
+    from flashmd.gui.app import SCREEN_CACHE
+
+    _navigate(app, 100)         # warm caches: fonts, styles, the screen cache
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        _navigate(app, 1000)
+        gc.collect()
+        after = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+
+    assert after - before < 1024 * 1024
+    assert len(app.winfo_children()) <= SCREEN_CACHE + 1
+    app.show_deck_list()
+    assert not app.bind_all("<space>")     # study keys went with the session
+
+
+def test_deck_stats_drops_a_forecast_for_a_hidden_screen(app):
+    app.show_deck_stats(app.deck_id)
+    stats = app._current
+    app.show_deck_list()            # hidden before the forecast arrives
+    _settle(app)
+    assert stats._forecast is None
+
+    app.show_deck_stats(app.deck_id)
+    assert app._current is stats
+    _settle(app)
+    assert stats._forecast is not None
+
+    app.show_deck_list()
+    app.show_deck_stats(app.deck_id)
+    assert stats._forecast is None      # the last showing's forecast is cleared
+    _settle(app)
+    assert stats._forecast is not None
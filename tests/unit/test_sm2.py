@@ -1,5 +1,9 @@
+import random
+
 import pytest
-from flashmd.sm2.algorithm import SM2Progress, calculate
+from flashmd.sm2 import batch, forecast, load_balance, optimizer
+from flashmd.sm2.algorithm import DEFAULT_PARAMS, SM2Params, SM2Progress, calculate
+from flashmd.sm2.scheduler import SM2Scheduler
 
 
 @pytest.mark.parametrize("ef,interval,reps,rating,expected_interval,expected_ef", [
@@ -49,3 +53,252 @@ def test_invalid_rating_raises():
         calculate(p, 0)
     with pytest.raises(ValueError):
         calculate(p, 6)
+
+
+def test_scalar_classes_use_slots():
+    assert not hasattr(SM2Progress(), "__dict__")
+
+
+# ── Batch ─────────────────────────────────────────────────────────────────────
+
+def _random_states(n: int, seed: int = 0):
+    rng = random.Random(seed)
+    # EF just off a 6th decimal half exercises round(x, 6) ties
+    ef = [round(rng.uniform(1.3, 3.5), 6) + rng.choice([0, 5e-7, -5e-7]) for _ in range(n)]
+    interval = [rng.choice([0, 1, 6, rng.randrange(5000)]) for _ in range(n)]
+    reps = [rng.randrange(12) for _ in range(n)]
+    rating = [rng.randint(1, 5) for _ in range(n)]
+    return ef, interval, reps, rating
+
+
+BACKENDS = [
+    pytest.param(True, marks=pytest.mark.skipif(not batch.USING_NUMPY, reason="needs numpy")),
+    False,
+]
+
+
+@pytest.mark.parametrize("use_numpy", BACKENDS)
+def test_batch_matches_calculate_exactly(use_numpy):
+    ef, interval, reps, rating = _random_states(20_000)
+    result = batch.calculate_batch(ef, interval, reps, rating, use_numpy=use_numpy)
+    assert len(result) == 20_000
+    for i, args in enumerate(zip(ef, interval, reps)):
+        expected = calculate(SM2Progress(*args), rating[i])
+        assert (result.easiness[i], result.interval[i], result.repetitions[i]) == (
+            expected.easiness, expected.interval, expected.repetitions,
+        )
+
+
+@pytest.mark.parametrize("use_numpy", BACKENDS)
+def test_batch_rejects_bad_input(use_numpy):
+    with pytest.raises(ValueError):
+        batch.calculate_batch([2.5, 2.5], [0, 0], [0, 0], [4, 6], use_numpy=use_numpy)
+    with pytest.raises(ValueError):
+        batch.calculate_batch([2.5], [0, 0], [0], [4], use_numpy=use_numpy)
+    assert len(batch.calculate_batch([], [], [], [], use_numpy=use_numpy)) == 0
+
+
+# ── Forecast ──────────────────────────────────────────────────────────────────
+
+def _expected_reviews(state, start_offset, days):
+    """Review days of a card always rated 5, stepped with calculate()."""
+    p, d, seen = SM2Progress(*state), start_offset, []
+    while d < days:
+        seen.append(d)
+        p = calculate(p, 5)
+        d += p.interval
+    return seen
+
+
+@pytest.mark.parametrize("use_numpy", BACKENDS)
+def test_forecast_replays_sm2_when_ratings_are_fixed(use_numpy):
+    start, days = 20_000, 365
+    cards = [((2.5, 0, 0), start + 1), ((2.5, 10, 3), start - 5), ((1.8, 30, 4), start + 400)]
+    columns = [[s[0] for s, _ in cards], [s[1] for s, _ in cards],
+               [s[2] for s, _ in cards], [due for _, due in cards]]
+    f = forecast.simulate(*columns, start_day=start, days=days, ratings={5: 1},
+                          trials=3, use_numpy=use_numpy)
+
+    expected = [0] * days
+    for state, due in cards:
+        for d in _expected_reviews(state, max(due - start, 0), days):
+            expected[d] += 1
+    assert len(f) == days and f.start_day == start
+    assert f.mean == expected and f.low == expected and f.high == expected
+    assert f.mean[0] == 1  # overdue card reviewed on the first day
+    assert f.total() == sum(expected)
+
+
+@pytest.mark.parametrize("use_numpy", BACKENDS)
+def test_forecast_counts_same_day_relearning(use_numpy):
+    f = forecast.simulate([2.5], [6], [2], [0], start_day=0, days=3,
+                          ratings={1: 1}, use_numpy=use_numpy)
+    assert f.mean == [forecast.MAX_RELEARN] * 3
+
+
+@pytest.mark.parametrize("use_numpy", BACKENDS)
+def test_forecast_spread_and_backends_agree(use_numpy):
+    ef, interval, reps, _ = _random_states(300, seed=3)
+    interval = [min(i, 60) for i in interval]
+    due = [random.Random(i).randrange(-5, 30) for i in range(300)]
+    f = forecast.simulate(ef, interval, reps, due, start_day=0, days=60,
+                          trials=40, seed=1, use_numpy=use_numpy)
+    assert all(lo <= m <= hi for lo, m, hi in zip(f.low, f.mean, f.high))
+    reference = forecast.simulate(ef, interval, reps, due, start_day=0, days=60,
+                                  trials=40, seed=2, use_numpy=False)
+    assert f.total() == pytest.approx(reference.total(), rel=0.05)
+    day, peak = f.peak()
+    assert peak == max(f.mean) and f.mean[day] == peak
+
+
+def test_forecast_rejects_bad_input():
+    with pytest.raises(ValueError):
+        forecast.simulate([2.5], [0], [0], [0, 1], start_day=0)
+    with pytest.raises(ValueError):
+        forecast.simulate([2.5], [0], [0], [0], start_day=0, ratings={6: 1})
+    with pytest.raises(ValueError):
+        forecast.simulate([2.5], [0], [0], [0], start_day=0, ratings={3: 0})
+    empty = forecast.simulate([], [], [], [], start_day=0, days=5)
+    assert empty.mean == [0] * 5
+
+
+# ── Load balancing ────────────────────────────────────────────────────────────
+
+def _loads(moved, ids, due, extra=None):
+    days = dict(extra or {})
+    for card_id, d in zip(ids, due):
+        day = moved.get(card_id, d)
+        days[day] = days.get(day, 0) + 1
+    return days
+
+
+def test_spread_new_cards_over_new_window():
+    ids, due = list(range(100)), [11] * 100
+    moved = load_balance.spread_due_days(ids, [0] * 100, due, {11: 100}, 11, 20)
+    loads = _loads(moved, ids, due)
+    assert loads == {d: 20 for d in range(11, 16)}
+    assert len(moved) == 80
+
+
+def test_spread_stays_within_tolerance_and_respects_other_load():
+    ids = list(range(60))
+    due = [110] * 60
+    interval = [10] * 60  # window of one day either side
+    other = {109: 20, 111: 5}
+    load = {109: 20, 110: 60, 111: 5}
+    moved = load_balance.spread_due_days(ids, interval, due, load, 101, 25)
+    assert set(moved.values()) <= {109, 111}
+    loads = _loads(moved, ids, due, other)
+    # 85 cards over three days: as level as it gets
+    assert sorted(loads[d] for d in (109, 110, 111)) == [28, 28, 29]
+
+
+def test_spread_levels_what_it_cannot_fix_and_never_moves_before_first_day():
+    ids, due = list(range(30)), [5] * 30
+    moved = load_balance.spread_due_days(ids, [10] * 30, due, {5: 30}, 5, 2)
+    assert min(moved.values()) >= 5
+    assert sorted(_loads(moved, ids, due).values()) == [15, 15]
+
+    # A lone card on a day under the target never moves
+    assert load_balance.spread_due_days([1], [6], [9], {9: 1}, 0, 5) == {}
+    with pytest.raises(ValueError):
+        load_balance.spread_due_days([1], [6], [9, 10], {}, 0, 5)
+
+
+# ── Parameters and optimizer ──────────────────────────────────────────────────
+
+TUNED = SM2Params(first_interval=2, second_interval=4, ef_base=0.12, ef_linear=0.06,
+                  ef_quadratic=0.03, min_easiness=1.5, interval_modifier=1.4)
+
+
+@pytest.mark.parametrize("use_numpy", BACKENDS)
+def test_batch_matches_calculate_with_other_params(use_numpy):
+    ef, interval, reps, rating = _random_states(5_000, seed=7)
+    result = batch.calculate_batch(ef, interval, reps, rating, use_numpy=use_numpy, params=TUNED)
+    for i, args in enumerate(zip(ef, interval, reps)):
+        expected = calculate(SM2Progress(*args), rating[i], TUNED)
+        assert (result.easiness[i], result.interval[i], result.repetitions[i]) == (
+            expected.easiness, expected.interval, expected.repetitions,
+        )
+
+
+def test_default_params_are_published_sm2():
+    assert calculate(SM2Progress(2.5, 6, 2), 4, DEFAULT_PARAMS) == calculate(SM2Progress(2.5, 6, 2), 4)
+    result = calculate(SM2Progress(), 4, TUNED)
+    assert result.interval == 2 and result.easiness == pytest.approx(2.53)
+
+
+def _recorded_history(cards: int, stretch: float, seed: int = 0):
+    """
+    Reviews as SM-2 would log them on material remembered `stretch` times
+    longer than SM-2 assumes: a card seen g days into an I-day interval is
+    recalled with probability 0.9 ** (g / (stretch * I)).
+    """
+    rng = random.Random(seed)
+    rows = []
+    for card in range(cards):
+        p, day = SM2Progress(), 0
+        for n in range(rng.randrange(3, 12)):
+            if n:
+                gap = rng.choice([p.interval, p.interval, p.interval + 1, p.interval * 3 // 2])
+                day += gap
+                recalled = rng.random() < 0.9 ** (gap / (stretch * p.interval))
+            else:
+                recalled = rng.random() < 0.8
+            rating = rng.choice([3, 4, 4, 5]) if recalled else rng.choice([1, 2])
+            rows.append((card, day, rating))
+            p = calculate(p, rating)
+            if rating < 3:
+                rows.append((card, day, 4))  # shown again in the same session
+                p = calculate(p, 4)
+    return rows
+
+
+def test_review_history_columns():
+    rows = [(7, 0, 4), (7, 1, 5), (7, 7, 3), (9, 0, 1), (9, 0, 4), (11, 3, 4)]
+    h = optimizer.ReviewHistory.from_rows(rows)
+    assert h.cards == 3 and h.reviews == 6
+    assert [list(d) for d in h.days] == [[0, 0, 3], [1, 0], [7]]
+    assert [list(r) for r in h.ratings] == [[4, 1, 4], [5, 4], [3]]
+    assert optimizer.ReviewHistory.from_rows([]).reviews == 0
+
+
+class HalfIntervals:
+    """A scheduler that plugs in beside SM2Scheduler: SM-2 at half the interval."""
+
+    def calculate(self, progress, rating):
+        r = calculate(progress, rating)
+        return type(r)(r.easiness, max(1, r.interval // 2), r.repetitions)
+
+    def calculate_batch(self, easiness, interval, repetitions, rating):
+        out = batch.calculate_batch(easiness, interval, repetitions, rating, use_numpy=False)
+        return batch.SM2Batch(out.easiness, [max(1, i // 2) for i in out.interval],
+                              out.repetitions)
+
+
+@pytest.mark.parametrize("use_numpy", BACKENDS)
+def test_evaluate_scores_calibrated_intervals_best(use_numpy):
+    history = optimizer.ReviewHistory.from_rows(_recorded_history(400, stretch=2.0))
+    sm2 = optimizer.evaluate(SM2Scheduler(), history, use_numpy=use_numpy)
+    longer = optimizer.evaluate(SM2Scheduler(SM2Params(interval_modifier=2.0)), history,
+                                use_numpy=use_numpy)
+    shorter = optimizer.evaluate(HalfIntervals(), history, use_numpy=use_numpy)
+    assert sm2.scored == longer.scored == shorter.scored > 1000
+    assert shorter.loss > sm2.loss
+    assert shorter.mean_interval < sm2.mean_interval
+    reference = optimizer.evaluate(SM2Scheduler(), history, use_numpy=False)
+    assert sm2.loss == pytest.approx(reference.loss) and sm2.scored == reference.scored
+
+
+def test_optimize_ranks_candidates_the_same_in_a_process_pool():
+    history = optimizer.ReviewHistory.from_rows(_recorded_history(300, stretch=2.0, seed=1))
+    schedulers = optimizer.sm2_candidates(6, seed=3, include=[DEFAULT_PARAMS])
+    assert schedulers[0].params == DEFAULT_PARAMS and len(schedulers) == 7
+    local = optimizer.optimize(history, schedulers, workers=1)
+    pooled = optimizer.optimize(history, schedulers, workers=2)
+    assert [s for _, s in local] == [s for _, s in pooled]
+    assert [sc.loss for sc, _ in local] == pytest.approx([sc.loss for sc, _ in pooled])
+    assert local[0][0].loss <= min(sc.loss for sc, _ in local)
+    for p in optimizer.random_params(20, seed=4):
+        assert optimizer.BOUNDS["min_easiness"][0] <= p.min_easiness <= optimizer.BOUNDS["min_easiness"][1]
+        assert isinstance(p.second_interval, int)
@@ -0,0 +1,217 @@
+import os
+import threading
+
+import pytest
+
+from flashmd.db import card_repo, deck_repo
+from flashmd.db.database import ConnectionManager
+from flashmd.sync.watcher import FolderWatcher, _Ring
+
+
+DECK_A = "# A\n\n**1. FOO — Foo**\nFoo.\n"
+DECK_B = "# B\n\n**1. BAR — Bar**\nBar.\n"
+
+
+@pytest.fixture
+def db(tmp_path):
+    manager = ConnectionManager(tmp_path / "flashmd.db")
+    yield manager
+    manager.close()
+
+
+@pytest.fixture
+def deck_dir(tmp_path):
+    d = tmp_path / "decks"
+    d.mkdir()
+    (d / "a.md").write_text(DECK_A)
+    return d
+
+
+def _watcher(deck_dir, db, **kwargs):
+    kwargs.setdefault("debounce", 0)
+    return FolderWatcher(deck_dir, db, on_change=lambda ids: None, **kwargs)
+
+
+def _titles(db):
+    with db.reader() as conn:
+        return [d["title"] for d in deck_repo.get_all(conn)]
+
+
+def _settle(w):
+    # Discovery and imports are spread over ticks by the budget; poll until done
+    deck_ids = []
+    while True:
+        deck_ids += w.poll()
+        if not w._queue and not w._settling:
+            return deck_ids
+
+
+def _bump(path, text):
+    # Force a new mtime even on coarse-grained file systems
+    st = path.stat()
+    path.write_text(text)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+
+
+def test_first_poll_imports_and_second_is_quiet(deck_dir, db):
+    w = _watcher(deck_dir, db)
+    try:
+        assert len(w.poll()) == 1
+        assert w.poll() == []
+        assert _titles(db) == ["A"]
+    finally:
+        w.stop()
+
+
+def test_changes_are_debounced(deck_dir, db):
+    w = _watcher(deck_dir, db, debounce=5)
+    try:
+        # Files found by the first scan don't wait for the debounce
+        assert len(w.poll(now=0)) == 1
+
+        _bump(deck_dir / "a.md", DECK_A + "\n**2. BAZ — Baz**\nBaz.\n")
+        assert w.poll(now=10) == []
+        [deck_id] = w.poll(now=15)
+        with db.reader() as conn:
+            assert len(card_repo.get_cards(conn, deck_id)) == 2
+    finally:
+        w.stop()
+
+
+def test_new_and_deleted_files_are_picked_up(deck_dir, db):
+    w = _watcher(deck_dir, db)
+    try:
+        w.poll()
+        (deck_dir / "sub").mkdir()
+        (deck_dir / "sub" / "b.md").write_text(DECK_B)
+        (deck_dir / "notes.txt").write_text(DECK_B)
+        os.utime(deck_dir, ns=(0, deck_dir.stat().st_mtime_ns + 10**9))
+        assert len(w.poll()) == 1
+        assert _titles(db) == ["A", "B"]
+
+        (deck_dir / "sub" / "b.md").unlink()
+        w.poll()
+        assert str(deck_dir / "sub" / "b.md") not in w._files
+    finally:
+        w.stop()
+
+
+def test_in_place_edits_are_found_within_budget_ticks(deck_dir, db):
+    (deck_dir / "b.md").write_text(DECK_B)
+    (deck_dir / "c.md").write_text("# C\n\n**1. BAZ — Baz**\nBaz.\n")
+    w = _watcher(deck_dir, db, budget=1)
+    try:
+        assert len(_settle(w)) == 3
+        _bump(deck_dir / "b.md", DECK_B + "More.\n")
+        found = [w.poll() for _ in range(3)]
+        assert sum(len(ids) for ids in found) == 1
+    finally:
+        w.stop()
+
+
+def test_background_thread_reports_changes(deck_dir, db):
+    seen: list[str] = []
+    done = threading.Event()
+
+    def on_change(ids):
+        seen.extend(ids)
+        done.set()
+
+    w = FolderWatcher(deck_dir, db, on_change=on_change, interval=0.05, debounce=0)
+    w.start()
+    try:
+        assert done.wait(5)
+    finally:
+        w.stop()
+    assert len(seen) == 1
+
+
+def test_symlinked_directories_are_not_followed(deck_dir, db):
+    (deck_dir / "sub").mkdir()
+    (deck_dir / "sub" / "b.md").write_text(DECK_B)
+    (deck_dir / "sub" / "loop").symlink_to(deck_dir)
+    w = _watcher(deck_dir, db)
+    try:
+        assert len(w.poll()) == 2
+        assert sorted(w._dirs) == [str(deck_dir), str(deck_dir / "sub")]
+        assert sorted(w._files) == [str(deck_dir / "a.md"), str(deck_dir / "sub" / "b.md")]
+    finally:
+        w.stop()
+
+
+def test_quiet_tick_stats_at_most_budget_paths(deck_dir, db, monkeypatch):
+    for i in range(20):
+        (deck_dir / f"sub{i}").mkdir()
+        (deck_dir / f"sub{i}" / "b.md").write_text(DECK_B.replace("B", f"B{i}"))
+    w = _watcher(deck_dir, db, budget=5)
+    try:
+        _settle(w)
+        stats = []
+        real_stat = os.stat
+
+        def counting_stat(path, *args, **kwargs):
+            stats.append(path)
+            return real_stat(path, *args, **kwargs)
+
+        monkeypatch.setattr(os, "stat", counting_stat)
+        assert w.poll() == []
+        assert len(stats) == 5
+    finally:
+        w.stop()
+
+
+def test_discovery_is_spread_over_budgeted_ticks(deck_dir, db):
+    for i in range(20):
+        (deck_dir / f"sub{i}").mkdir()
+        (deck_dir / f"sub{i}" / "b.md").write_text(DECK_B.replace("B", f"B{i}"))
+    w = _watcher(deck_dir, db, budget=5)
+    try:
+        imported = w.poll()
+        # The root scan plus four of the subdirectories it queued
+        assert len(w._dirs) == 5
+        assert w._queue
+        imported += _settle(w)
+        assert len(imported) == 21
+        assert len(w._dirs) == 21
+    finally:
+        w.stop()
+
+
+def test_pending_files_are_restatted_within_the_budget(deck_dir, db, monkeypatch):
+    files = [deck_dir / f"d{i}.md" for i in range(20)]
+    for i, path in enumerate(files):
+        path.write_text(DECK_B.replace("B", f"B{i}"))
+    w = _watcher(deck_dir, db, budget=5, debounce=100)
+    try:
+        _settle(w)              # the first scan's files import without waiting
+        assert len(_titles(db)) == 21
+        for path in files:
+            _bump(path, path.read_text() + "More.\n")
+
+        stats = []
+        real_stat = os.stat
+
+        def counting_stat(path, *args, **kwargs):
+            stats.append(path)
+            return real_stat(path, *args, **kwargs)
+
+        monkeypatch.setattr(os, "stat", counting_stat)
+        for now in range(30):
+            stats.clear()
+            assert w.poll(now=now) == []
+            assert len(stats) <= 5
+        assert len(w._pending) == 20
+    finally:
+        w.stop()
+
+
+def test_ring_discard_keeps_every_other_path_in_rotation():
+    ring = _Ring()
+    for p in "abcdef":
+        ring.add(p)
+    assert ring.take(2) == ["a", "b"]
+    ring.discard("a")
+    ring.discard("zzz")
+    ring.discard("e")
+    assert len(ring) == 4
+    assert sorted(ring.take(4)) == ["b", "c", "d", "f"]